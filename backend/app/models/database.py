@@ -8,7 +8,7 @@ db_config = {
     'password': Config.MYSQL_PASSWORD,
     'database': Config.MYSQL_DB,
     'pool_name': 'mypool',
-    'pool_size': 5
+    'pool_size': Config.MYSQL_POOL_SIZE
 }
 
 connection_pool = pooling.MySQLConnectionPool(**db_config)
@@ -1,6 +1,7 @@
 from flask import Blueprint, request
 from app.services.cluster_service import ClusterService
 from app.utils.response import success_response, error_response
+from app.utils.cluster_import import parse_cluster_import
 import uuid
 
 cluster_bp = Blueprint('cluster', __name__)
@@ -23,6 +24,37 @@ def create_cluster():
     except Exception as e:
         return error_response(str(e))
 
+@cluster_bp.route('/clusterbulkimport', methods=['POST'])
+def bulk_import_clusters():
+    try:
+        # 支持上传文件（multipart）或 JSON 请求体，格式为 json、csv 或 kubeconfig
+        if request.files.get('file'):
+            content = request.files['file'].read().decode('utf-8')
+            options = request.form
+        else:
+            options = request.get_json()
+            content = options.get('content', options.get('clusters'))
+
+        import_format = options.get('format', 'json')
+        if import_format not in ('json', 'csv', 'kubeconfig'):
+            return error_response("Invalid format")
+        if not content:
+            return error_response("Missing content")
+
+        try:
+            entries = parse_cluster_import(content, import_format, {
+                'cluster_owner': options.get('cluster_owner', ''),
+                'business_name': options.get('business_name', ''),
+                'notes': options.get('notes', '')
+            })
+        except Exception as e:
+            return error_response(f"Failed to parse {import_format} content: {str(e)}")
+
+        result = cluster_service.bulk_import_clusters(entries)
+        return success_response(result, "Cluster import finished")
+    except Exception as e:
+        return error_response(str(e))
+
 @cluster_bp.route('/clusterupdate', methods=['POST'])
 def update_cluster():
     try:
@@ -44,6 +76,14 @@ def update_cluster():
             update_data['business_name'] = data['business_name']
         if 'notes' in data:
             update_data['notes'] = data['notes']
+        if 'max_concurrent_jobs' in data:
+            update_data['max_concurrent_jobs'] = data['max_concurrent_jobs']
+        if 'max_concurrent_jobs_per_pool' in data:
+            update_data['max_concurrent_jobs_per_pool'] = data['max_concurrent_jobs_per_pool']
+        if 'retention_keep_scans' in data:
+            update_data['retention_keep_scans'] = data['retention_keep_scans']
+        if 'retention_days' in data:
+            update_data['retention_days'] = data['retention_days']
         if 'access_token' in data and data['access_token']:
             update_data['access_token'] = data['access_token']
 
@@ -61,8 +101,8 @@ def delete_cluster():
         if 'cluster_id' not in data:
             return error_response("Missing cluster_id")
 
-        cluster_service.delete_cluster(data['cluster_id'])
-        return success_response(message="Cluster deleted successfully")
+        deletion_id = cluster_service.delete_cluster(data['cluster_id'])
+        return success_response({'deletion_id': deletion_id}, "Cluster deletion started")
     except Exception as e:
         return error_response(str(e))
 
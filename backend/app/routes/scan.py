@@ -1,10 +1,54 @@
-from flask import Blueprint, request, send_file
-from app.services.kubernetes_service import KubernetesService
+from flask import Blueprint, request, send_file, Response, stream_with_context
+from app.services.kubernetes_service import KubernetesService, MASTER_TARGETS
+from app.services.scan_scheduler import scan_scheduler
+from app.services.fleet_scan_service import FleetScanService
+from app.services.deletion_worker import deletion_worker
+from app.services.result_export import stream_export
+from app.utils.scan_result import parse_result_filter
+from app.services.check_search import search_checks
+from app.services.fleet_rollup import get_top_failing_checks, get_compliance_by_business
+from app.services.finding_matrix import get_finding_matrix, MATRIX_STATUS_COLUMNS
+from app.services.drift_detection import get_scan_diff, get_node_diff, DRIFT_CHANGE_TYPES
+from app.services.compliance_trend import get_compliance_trend, TREND_GRANULARITIES
+from datetime import datetime, timedelta
 from app.utils.response import success_response, error_response
 import uuid
+import re
 
 scan_bp = Blueprint('scan', __name__)
 k8s_service = KubernetesService()
+fleet_scan_service = FleetScanService(k8s_service)
+
+def parse_scan_options(data):
+    """校验并解析创建扫描任务的参数，返回 (参数, 错误信息)"""
+    scan_mode = data.get('scan_mode', 'full')
+    if scan_mode not in ('full', 'incremental', 'sample', 'fast'):
+        return None, "Invalid scan_mode"
+
+    executor = data.get('executor', 'job')
+    if executor not in ('job', 'daemonset'):
+        return None, "Invalid executor"
+
+    # 部分扫描：targets/checks 支持列表或逗号分隔的字符串
+    targets = data.get('targets') or []
+    checks = data.get('checks') or []
+    if isinstance(targets, str):
+        targets = [t.strip() for t in targets.split(',') if t.strip()]
+    if isinstance(checks, str):
+        checks = [c.strip() for c in checks.split(',') if c.strip()]
+    if any(target not in MASTER_TARGETS for target in targets):
+        return None, "Invalid targets"
+    if any(not re.match(r'^\d+(\.\d+)*$', check) for check in checks):
+        return None, "Invalid checks"
+
+    return {
+        'scan_mode': scan_mode,
+        'max_result_age': int(data['max_result_age']) if data.get('max_result_age') is not None else None,
+        'executor': executor,
+        'warmup': bool(data.get('warmup', False)),
+        'targets': targets or None,
+        'checks': checks or None
+    }, None
 
 @scan_bp.route('/scantaskcreate', methods=['POST'])
 def create_scan_task():
@@ -13,15 +57,110 @@ def create_scan_task():
         if 'cluster_id' not in data:
             return error_response("Missing cluster_id")
 
+        scan_options, error = parse_scan_options(data)
+        if error:
+            return error_response(error)
+
         # kube_bench_image = data.get('kube_bench_image', "registry.cn-zhangjiakou.aliyuncs.com/cloudnativesec/kube-bench-zh:latest")
         k8s_service = KubernetesService()
 
         main_task_id = str(uuid.uuid4())
-        result = k8s_service.create_scan_task(data['cluster_id'], main_task_id)
+        result = k8s_service.create_scan_task(
+            data['cluster_id'],
+            main_task_id,
+            **scan_options
+        )
         return success_response(result, "Scan task created successfully")
     except Exception as e:
         return error_response(str(e))
 
+@scan_bp.route('/fleetscancreate', methods=['POST'])
+def create_fleet_scan():
+    try:
+        data = request.get_json()
+        # 集群筛选条件：all 扫描全部集群，或按 business_name、cluster_owner、cluster_ids 筛选
+        filters = {
+            key: data[key] for key in ('business_name', 'cluster_owner', 'cluster_ids')
+            if data.get(key)
+        }
+        if not filters and not data.get('all'):
+            return error_response("Missing cluster filter")
+
+        scan_options, error = parse_scan_options(data)
+        if error:
+            return error_response(error)
+
+        result = fleet_scan_service.create_fleet_scan(filters, scan_options)
+        return success_response(result, "Fleet scan created successfully")
+    except Exception as e:
+        return error_response(str(e))
+
+@scan_bp.route('/fleetscanview', methods=['GET'])
+def view_fleet_scan():
+    try:
+        fleet_scan_id = request.args.get('fleet_scan_id')
+        if not fleet_scan_id:
+            return error_response("Missing fleet_scan_id")
+
+        result = fleet_scan_service.get_fleet_scan(fleet_scan_id)
+        if not result:
+            return error_response("Fleet scan not found", 404)
+        return success_response(result)
+    except Exception as e:
+        return error_response(str(e))
+
+@scan_bp.route('/scanschedulecreate', methods=['POST'])
+def create_scan_schedule():
+    try:
+        data = request.get_json()
+        if 'cron_expr' not in data or ('cluster_id' not in data and not data.get('apply_to_all')):
+            return error_response("Missing required fields")
+        if data.get('scan_mode', 'full') not in ('full', 'incremental', 'sample', 'fast'):
+            return error_response("Invalid scan_mode")
+        if int(data.get('jitter_seconds', 0)) < 0:
+            return error_response("Invalid jitter_seconds")
+
+        result = scan_scheduler.create_schedule(data)
+        return success_response(result, "Scan schedule created successfully")
+    except Exception as e:
+        return error_response(str(e))
+
+@scan_bp.route('/scanscheduleupdate', methods=['POST'])
+def update_scan_schedule():
+    try:
+        data = request.get_json()
+        if 'schedule_id' not in data:
+            return error_response("Missing schedule_id")
+        if data.get('scan_mode', 'full') not in ('full', 'incremental', 'sample', 'fast'):
+            return error_response("Invalid scan_mode")
+        if int(data.get('jitter_seconds', 0)) < 0:
+            return error_response("Invalid jitter_seconds")
+
+        scan_scheduler.update_schedule(data)
+        return success_response(message="Scan schedule updated successfully")
+    except Exception as e:
+        return error_response(str(e))
+
+@scan_bp.route('/scanscheduleview', methods=['GET'])
+def view_scan_schedules():
+    try:
+        schedules = scan_scheduler.get_schedules(request.args.get('cluster_id'))
+        return success_response(schedules)
+    except Exception as e:
+        return error_response(str(e))
+
+@scan_bp.route('/scanscheduledelete', methods=['POST'])
+def delete_scan_schedule():
+    try:
+        data = request.get_json()
+        if 'schedule_id' not in data:
+            return error_response("Missing schedule_id")
+
+        scan_scheduler.delete_schedule(data['schedule_id'])
+        return success_response(message="Scan schedule deleted successfully")
+    except Exception as e:
+        return error_response(str(e))
+
 @scan_bp.route('/scantaskview', methods=['GET'])
 def view_scan_tasks():
     try:
@@ -45,9 +184,11 @@ def search_node_scan_result():
         if not all(k in data for k in ['cluster_id', 'node_name']):
             return error_response("Missing required fields")
 
+        # 可选的服务端筛选和投影：status、control_id、section、check_prefix、fields、exclude_fields
         result = k8s_service.get_node_scan_result(
             data['cluster_id'], 
-            data['node_name']
+            data['node_name'],
+            result_filter=parse_result_filter(data)
         )
         return success_response(result)
     except Exception as e:
@@ -60,8 +201,168 @@ def delete_scan_task():
         if not all(k in data for k in ['cluster_id', 'main_task_id']):
             return error_response("Missing required fields")
 
-        k8s_service.delete_scan_task(data['cluster_id'], data['main_task_id'])
-        return success_response(message="Scan task deleted successfully")
+        deletion_id = k8s_service.delete_scan_task(data['cluster_id'], data['main_task_id'])
+        return success_response({'deletion_id': deletion_id}, "Scan task deletion started")
+    except Exception as e:
+        return error_response(str(e))
+
+@scan_bp.route('/resultexport', methods=['GET'])
+def export_results():
+    try:
+        filters = {
+            'cluster_id': request.args.get('cluster_id'),
+            'main_task_id': request.args.get('main_task_id')
+        }
+        # 时间范围使用 ISO 格式，例如 2024-01-01T00:00:00
+        for key in ('start_time', 'end_time'):
+            if request.args.get(key):
+                try:
+                    filters[key] = datetime.fromisoformat(request.args[key])
+                except ValueError:
+                    return error_response(f"Invalid {key}")
+        if not any(filters.values()):
+            return error_response("Missing cluster_id, main_task_id or time range")
+
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            return error_response("Invalid format")
+        compress = request.args.get('gzip', 'false').lower() in ('1', 'true')
+        include_archived = request.args.get('include_archived', 'true').lower() in ('1', 'true')
+
+        file_name = f"scan-results.{export_format}" + ('.gz' if compress else '')
+        mimetype = 'application/gzip' if compress else (
+            'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        )
+        return Response(
+            stream_with_context(stream_export(filters, export_format, compress, include_archived)),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={file_name}'}
+        )
+    except Exception as e:
+        return error_response(str(e))
+
+@scan_bp.route('/checksearch', methods=['GET'])
+def search_check_results():
+    try:
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            return error_response("Missing q")
+
+        statuses = [s.strip().upper() for s in request.args.get('status', '').split(',') if s.strip()]
+        limit = min(int(request.args.get('limit', 50)), 500)
+        result = search_checks(
+            query,
+            cluster_id=request.args.get('cluster_id'),
+            main_task_id=request.args.get('main_task_id'),
+            statuses=statuses or None,
+            phrase=request.args.get('phrase', 'false').lower() in ('1', 'true'),
+            limit=limit
+        )
+        return success_response(result)
+    except Exception as e:
+        return error_response(str(e))
+
+@scan_bp.route('/findingmatrix', methods=['GET'])
+def view_finding_matrix():
+    try:
+        cluster_id = request.args.get('cluster_id')
+        main_task_id = request.args.get('main_task_id')
+        status = (request.args.get('status') or 'FAIL').upper()
+        if not cluster_id or not main_task_id:
+            return error_response("Missing required parameters", 400)
+        if status not in MATRIX_STATUS_COLUMNS:
+            return error_response(f"status must be one of {', '.join(MATRIX_STATUS_COLUMNS)}", 400)
+
+        return success_response(get_finding_matrix(cluster_id, main_task_id, status))
+    except Exception as e:
+        return error_response(str(e))
+
+@scan_bp.route('/scandiff', methods=['GET'])
+def view_scan_diff():
+    try:
+        cluster_id = request.args.get('cluster_id')
+        main_task_id = request.args.get('main_task_id')
+        if not cluster_id or not main_task_id:
+            return error_response("Missing required parameters", 400)
+
+        change_types = [item.strip() for item in request.args.get('change_type', '').split(',') if item.strip()]
+        invalid = [item for item in change_types if item not in DRIFT_CHANGE_TYPES]
+        if invalid:
+            return error_response(f"Invalid change_type: {', '.join(invalid)}", 400)
+
+        return success_response(get_scan_diff(cluster_id, main_task_id, change_types))
+    except Exception as e:
+        return error_response(str(e))
+
+@scan_bp.route('/nodediff', methods=['GET'])
+def view_node_diff():
+    try:
+        cluster_id = request.args.get('cluster_id')
+        node_name = request.args.get('node_name')
+        if not cluster_id or not node_name:
+            return error_response("Missing required parameters", 400)
+
+        limit = min(int(request.args.get('limit', 20)), 100)
+        return success_response(get_node_diff(
+            cluster_id, node_name,
+            main_task_id=request.args.get('main_task_id'),
+            limit=limit
+        ))
+    except Exception as e:
+        return error_response(str(e))
+
+@scan_bp.route('/compliancetrend', methods=['GET'])
+def view_compliance_trend():
+    try:
+        cluster_id = request.args.get('cluster_id')
+        if not cluster_id:
+            return error_response("Missing required parameters", 400)
+
+        granularity = request.args.get('granularity')
+        if granularity and granularity not in TREND_GRANULARITIES:
+            return error_response(f"granularity must be one of {', '.join(TREND_GRANULARITIES)}", 400)
+
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else datetime.now()
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else end - timedelta(days=30)
+        if start >= end:
+            return error_response("start must be earlier than end", 400)
+
+        return success_response(get_compliance_trend(
+            cluster_id, start, end,
+            node_name=request.args.get('node_name'),
+            granularity=granularity
+        ))
+    except ValueError as e:
+        return error_response(f"Invalid time: {str(e)}", 400)
+    except Exception as e:
+        return error_response(str(e))
+
+@scan_bp.route('/fleetsummary', methods=['GET'])
+def view_fleet_summary():
+    try:
+        limit = min(int(request.args.get('limit', 20)), 200)
+        return success_response({
+            'topFailingChecks': get_top_failing_checks(
+                limit=limit,
+                business_name=request.args.get('business_name'),
+                cluster_id=request.args.get('cluster_id')
+            ),
+            'complianceByBusiness': get_compliance_by_business()
+        })
+    except Exception as e:
+        return error_response(str(e))
+
+@scan_bp.route('/deletionview', methods=['GET'])
+def view_deletion():
+    try:
+        deletion_id = request.args.get('deletion_id')
+        if not deletion_id:
+            return error_response("Missing deletion_id")
+
+        result = deletion_worker.get_deletion(deletion_id)
+        if not result:
+            return error_response("Deletion not found", 404)
+        return success_response(result)
     except Exception as e:
         return error_response(str(e))
 
@@ -0,0 +1,150 @@
+from app.models.database import get_connection
+from config import Config
+import hashlib
+import json
+
+# 同一基线版本和检查项在各节点、各次扫描中重复的文本字段，存入检查项目录后结果中只保留引用
+CATALOG_TEXT_FIELDS = ['test_desc', 'audit', 'AuditEnv', 'AuditConfig', 'type', 'remediation']
+
+# 结果中指向检查项目录的引用字段
+CATALOG_REF_FIELD = '_catalog'
+
+# 参与全文检索的目录字段
+CATALOG_SEARCH_FIELDS = ['test_desc', 'remediation']
+
+# 目录条目按内容寻址、写入后不再修改，各进程缓存已提交的条目
+_catalog_cache = {}
+
+
+def _cache_put(catalog_key, content):
+    if len(_catalog_cache) >= Config.CHECK_CATALOG_CACHE_SIZE:
+        _catalog_cache.clear()
+    _catalog_cache[catalog_key] = content
+
+
+def _catalog_key(benchmark_version, check_id, content):
+    digest_source = json.dumps([benchmark_version, check_id, content], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(digest_source.encode('utf-8')).hexdigest()
+
+
+def dehydrate_scan_result(cursor, scan_result):
+    """
+    将检查项的重复文本写入检查项目录，返回只保留状态、实际值、测试信息等节点相关字段的结果。
+    目录以基线版本、检查项编号和文本内容寻址，audit 中替换了节点配置路径等差异文本时会生成不同的条目
+    """
+    if 'Controls' not in scan_result:
+        return scan_result
+
+    new_entries = {}
+    controls = []
+    for control in scan_result.get('Controls', []):
+        benchmark_version = str(control.get('version') or '')
+        tests = []
+        for test in control.get('tests', []):
+            results = []
+            for result in test.get('results', []):
+                content = {field: result[field] for field in CATALOG_TEXT_FIELDS if field in result}
+                if not content:
+                    results.append(result)
+                    continue
+                check_id = str(result.get('test_number', ''))
+                catalog_key = _catalog_key(benchmark_version, check_id, content)
+                if catalog_key not in _catalog_cache:
+                    new_entries[catalog_key] = (benchmark_version, check_id, content)
+
+                # 引用放在第一个文本字段的位置，还原后字段顺序基本不变
+                dehydrated = {}
+                for field, value in result.items():
+                    if field not in content:
+                        dehydrated[field] = value
+                    elif CATALOG_REF_FIELD not in dehydrated:
+                        dehydrated[CATALOG_REF_FIELD] = catalog_key
+                results.append(dehydrated)
+            tests.append({**test, 'results': results})
+        controls.append({**control, 'tests': tests})
+
+    if new_entries:
+        # 先确认哪些条目已经存在，只写入新的文本；本事务写入的条目提交前不放入缓存
+        existing = _load_catalog_entries(cursor, list(new_entries), cache=False)
+        new_entries = {key: entry for key, entry in new_entries.items() if key not in existing}
+    if new_entries:
+        cursor.executemany("""
+        INSERT IGNORE INTO check_catalog (catalog_key, benchmark_version, check_id, content, search_text)
+        VALUES (%s, %s, %s, %s, %s)
+        """, [
+            (
+                catalog_key, benchmark_version, check_id, json.dumps(content, ensure_ascii=False),
+                '\n'.join(str(content.get(field) or '') for field in CATALOG_SEARCH_FIELDS)
+            )
+            for catalog_key, (benchmark_version, check_id, content) in new_entries.items()
+        ])
+
+    return {**scan_result, 'Controls': controls}
+
+
+def _iter_refs(scan_result):
+    for control in scan_result.get('Controls', []):
+        for test in control.get('tests', []):
+            for result in test.get('results', []):
+                if CATALOG_REF_FIELD in result:
+                    yield result
+
+
+def _load_catalog_entries(cursor, catalog_keys, cache=True):
+    entries = {}
+    for start in range(0, len(catalog_keys), 1000):
+        batch = catalog_keys[start:start + 1000]
+        placeholders = ', '.join(['%s'] * len(batch))
+        cursor.execute(f"""
+        SELECT catalog_key, content
+        FROM check_catalog
+        WHERE catalog_key IN ({placeholders})
+        """, batch)
+        for row in cursor.fetchall():
+            entries[row['catalog_key']] = json.loads(row['content'])
+            if cache:
+                _cache_put(row['catalog_key'], entries[row['catalog_key']])
+    return entries
+
+
+def rehydrate_scan_results(scan_results, cursor=None, cache=True):
+    """
+    用检查项目录中的文本还原结果（原地修改），未引用目录的旧结果保持不变。
+    不传 cursor 时使用单独的连接读取目录，适用于当前连接上有未读完的非缓冲结果集的场景；
+    在尚未提交的写入事务中读取时 cache 应为 False，避免缓存可能回滚的条目
+    """
+    results = [result for scan_result in scan_results if scan_result for result in _iter_refs(scan_result)]
+    if not results:
+        return scan_results
+
+    catalog_keys = {result[CATALOG_REF_FIELD] for result in results}
+    entries = {key: _catalog_cache[key] for key in catalog_keys if key in _catalog_cache}
+    missing = list(catalog_keys - set(entries))
+    if missing:
+        if cursor is None:
+            with get_connection() as conn:
+                entries.update(_load_catalog_entries(conn.cursor(dictionary=True), missing, cache))
+        else:
+            entries.update(_load_catalog_entries(cursor, missing, cache))
+
+    for result in results:
+        content = entries.get(result[CATALOG_REF_FIELD])
+        if content is None:
+            print(f"检查项目录中缺少条目 {result[CATALOG_REF_FIELD]}")
+            continue
+        rehydrated = {}
+        for field, value in result.items():
+            if field == CATALOG_REF_FIELD:
+                rehydrated.update(content)
+            else:
+                rehydrated[field] = value
+        result.clear()
+        result.update(rehydrated)
+    return scan_results
+
+
+def load_scan_result(raw_result, cursor=None):
+    """解析数据库中的 scan_result 并还原目录文本"""
+    scan_result = json.loads(raw_result)
+    rehydrate_scan_results([scan_result], cursor)
+    return scan_result
@@ -0,0 +1,123 @@
+from app.models.database import get_connection
+from app.services.result_ingest import register_ingest_hook, iter_check_results, INGEST_ORDER_CHECK_INDEX
+from app.services.check_catalog import dehydrate_scan_result, CATALOG_REF_FIELD
+
+
+@register_ingest_hook(INGEST_ORDER_CHECK_INDEX)
+def index_check_results(cursor, rows):
+    """
+    将每个节点结果展开为检查项记录写入 scan_check_results。只保存状态、测试信息等节点相关字段，
+    描述和修复建议通过 catalog_key 引用检查项目录，全文检索时与目录的索引合并
+    """
+    values = []
+    for row in rows:
+        # 取得各检查项的目录引用，旧结果缺少的目录条目会在这里补齐
+        dehydrated = dehydrate_scan_result(cursor, row['scan_result'])
+        for control, test, result in iter_check_results(dehydrated):
+            test_info = result.get('test_info') or []
+            values.append((
+                row['node_task_id'], row['cluster_id'], row['main_task_id'], row['node_name'],
+                str(control.get('id', '')), str(test.get('section', '')),
+                str(result.get('test_number', '')), result.get('status', ''),
+                result.get(CATALOG_REF_FIELD),
+                '\n'.join(test_info) if isinstance(test_info, list) else str(test_info),
+                row['inserted_at']
+            ))
+    if values:
+        cursor.executemany("""
+        INSERT INTO scan_check_results (
+            node_task_id, cluster_id, main_task_id, node_name, control_id, section,
+            check_id, status, catalog_key, test_info, inserted_at
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, values)
+
+
+def search_checks(query, cluster_id=None, main_task_id=None, statuses=None, phrase=False, limit=50):
+    """
+    在检查描述、测试信息和修复建议上做全文检索，按相关度排序，可按集群、扫描主任务和状态筛选。
+    phrase 为 True 时按整个短语匹配（例如 --anonymous-auth）
+    """
+    if phrase:
+        match_query = '"' + query.replace('"', ' ') + '"'
+        mode = 'IN BOOLEAN MODE'
+    else:
+        match_query = query
+        mode = 'IN NATURAL LANGUAGE MODE'
+    catalog_match = f"MATCH(search_text) AGAINST(%s {mode})"
+    info_match = f"MATCH(r.test_info) AGAINST(%s {mode})"
+
+    conditions = []
+    params = []
+    if cluster_id:
+        conditions.append("r.cluster_id = %s")
+        params.append(cluster_id)
+    if main_task_id:
+        conditions.append("r.main_task_id = %s")
+        params.append(main_task_id)
+    if statuses:
+        conditions.append(f"r.status IN ({', '.join(['%s'] * len(statuses))})")
+        params.extend(statuses)
+    filters = ''.join(f" AND {condition}" for condition in conditions)
+
+    # 描述和修复建议在检查项目录中只索引一次：第一路先在目录中匹配，再通过 idx_catalog_key 关联各节点的记录；
+    # 第二路在各节点的测试信息上匹配。两路各自使用索引并限制行数，最后按记录合并相关度
+    with get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"""
+        SELECT r.cluster_id, r.main_task_id, r.node_task_id, r.node_name, r.control_id, r.section,
+               r.check_id, r.status, r.inserted_at,
+               JSON_UNQUOTE(JSON_EXTRACT(c.content, '$.test_desc')) AS test_desc,
+               JSON_UNQUOTE(JSON_EXTRACT(c.content, '$.remediation')) AS remediation,
+               hits.score
+        FROM (
+            SELECT id, SUM(score) AS score
+            FROM (
+                (
+                    SELECT r.id, m.score
+                    FROM (
+                        SELECT catalog_key, {catalog_match} AS score
+                        FROM check_catalog
+                        WHERE {catalog_match}
+                    ) m
+                    JOIN scan_check_results r ON r.catalog_key = m.catalog_key
+                    WHERE 1 = 1{filters}
+                    ORDER BY m.score DESC, r.inserted_at DESC
+                    LIMIT %s
+                )
+                UNION ALL
+                (
+                    SELECT r.id, {info_match} AS score
+                    FROM scan_check_results r
+                    WHERE {info_match}{filters}
+                    ORDER BY score DESC
+                    LIMIT %s
+                )
+            ) matched
+            GROUP BY id
+            ORDER BY score DESC
+            LIMIT %s
+        ) hits
+        JOIN scan_check_results r ON r.id = hits.id
+        LEFT JOIN check_catalog c ON c.catalog_key = r.catalog_key
+        ORDER BY hits.score DESC, r.inserted_at DESC
+        """, (
+            [match_query, match_query] + params + [limit]
+            + [match_query, match_query] + params + [limit]
+            + [limit]
+        ))
+        rows = cursor.fetchall()
+
+    return [{
+        'clusterId': row['cluster_id'],
+        'mainTaskId': row['main_task_id'],
+        'nodeTaskId': row['node_task_id'],
+        'nodeName': row['node_name'],
+        'controlId': row['control_id'],
+        'section': row['section'],
+        'checkId': row['check_id'],
+        'status': row['status'],
+        'testDesc': row['test_desc'],
+        'remediation': row['remediation'],
+        'insertedAt': row['inserted_at'].isoformat() if row['inserted_at'] else None,
+        'score': float(row['score'])
+    } for row in rows]
@@ -0,0 +1,126 @@
+from app.models.database import get_connection
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+from config import Config
+from datetime import datetime, timedelta
+import threading
+import urllib3
+
+
+class ClusterUnreachableError(Exception):
+    """集群 API Server 不可达，本轮同步应中止而不是把任务标记为失败"""
+    pass
+
+
+def is_connectivity_error(error):
+    """判断异常是否由 API Server 不可达引起（连接失败、超时、5xx），而不是资源本身的错误"""
+    if isinstance(error, ClusterUnreachableError):
+        return True
+    if isinstance(error, ApiException):
+        return error.status == 0 or error.status is None or error.status >= 500
+    return isinstance(error, (urllib3.exceptions.HTTPError, ConnectionError, TimeoutError))
+
+
+class ClusterHealth:
+    """
+    按集群维护 API Server 健康状态的熔断器：连续失败达到阈值后断开（open），
+    按指数退避等待后放行一次探测（half-open），探测成功则恢复（closed）。
+    状态变化写入 cluster_info，供各进程计算 pending 超时和前端展示
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _get_state(self, cluster_id):
+        return self._states.setdefault(cluster_id, {
+            'state': self.CLOSED,
+            'failures': 0,
+            'open_count': 0,
+            'next_attempt_at': None
+        })
+
+    def is_closed(self, cluster_id):
+        with self._lock:
+            return self._get_state(cluster_id)['state'] == self.CLOSED
+
+    def allow_request(self, cluster_id):
+        """断开期间直接跳过；退避时间到达后只放行一次探测"""
+        with self._lock:
+            state = self._get_state(cluster_id)
+            if state['state'] == self.CLOSED:
+                return True
+            if state['state'] == self.OPEN and datetime.now() >= state['next_attempt_at']:
+                state['state'] = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self, cluster_id):
+        with self._lock:
+            state = self._get_state(cluster_id)
+            recovered = state['state'] != self.CLOSED
+            state.update({'state': self.CLOSED, 'failures': 0, 'open_count': 0, 'next_attempt_at': None})
+        if recovered:
+            print(f"集群 {cluster_id} API Server 已恢复")
+            self._persist(cluster_id, 'healthy')
+
+    def record_failure(self, cluster_id, error=None):
+        with self._lock:
+            state = self._get_state(cluster_id)
+            state['failures'] += 1
+            if state['state'] != self.HALF_OPEN and state['failures'] < Config.CLUSTER_FAILURE_THRESHOLD:
+                return
+            opened = state['state'] == self.CLOSED
+            state['open_count'] += 1
+            backoff = min(
+                Config.CLUSTER_BACKOFF_BASE * (2 ** (state['open_count'] - 1)),
+                Config.CLUSTER_BACKOFF_MAX
+            )
+            state['state'] = self.OPEN
+            state['next_attempt_at'] = datetime.now() + timedelta(seconds=backoff)
+        print(f"集群 {cluster_id} API Server 不可达，{backoff} 秒后重试: {str(error)}")
+        if opened:
+            self._persist(cluster_id, 'unreachable')
+
+    def available(self, cluster_id, api_client):
+        """熔断器闭合时直接返回可用，否则按退避时间探测"""
+        if self.is_closed(cluster_id):
+            return True
+        return self.probe(cluster_id, api_client)
+
+    def probe(self, cluster_id, api_client):
+        """
+        使用 /version 做一次轻量探测，返回集群当前是否可用。
+        断开且未到重试时间时不发起请求
+        """
+        if not self.allow_request(cluster_id):
+            return False
+        try:
+            client.VersionApi(api_client).get_code(
+                _request_timeout=(Config.K8S_CONNECT_TIMEOUT, Config.K8S_CONNECT_TIMEOUT)
+            )
+        except Exception as e:
+            self.record_failure(cluster_id, e)
+            return False
+        self.record_success(cluster_id)
+        return True
+
+    def _persist(self, cluster_id, api_status):
+        try:
+            with get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                UPDATE cluster_info
+                SET api_status = %s, api_status_changed_at = NOW(), updated_at = updated_at
+                WHERE cluster_id = %s
+                """, (api_status, cluster_id))
+                conn.commit()
+        except Exception as e:
+            print(f"Error saving api status for cluster {cluster_id}: {str(e)}")
+
+
+cluster_health = ClusterHealth()
@@ -1,5 +1,12 @@
 from app.models.database import get_connection
-from kubernetes import client
+from app.utils.kube_client import build_api_client
+from app.services.node_inventory import node_inventory, count_nodes
+from app.services.deletion_worker import deletion_worker
+from app.utils.cluster_import import CLUSTER_REQUIRED_FIELDS
+from config import Config
+import concurrent.futures
+import threading
+import uuid
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -7,17 +14,10 @@ class ClusterService:
     def create_cluster(self, cluster_id, data):
         try:
             # 配置 Kubernetes 客户端
-            configuration = client.Configuration()
-            configuration.host = data['api_server']
-            # configuration.api_key['authorization'] = data['access_token']
-            configuration.api_key = {"authorization": "Bearer " + data['access_token']}
-            configuration.verify_ssl = False
-            api_client = client.ApiClient(configuration)
-            v1 = client.CoreV1Api(api_client)
+            api_client = build_api_client(data)
             
-            # 获取节点数量
-            nodes = v1.list_node()
-            node_count = len(nodes.items)
+            # 获取节点数量（分页的 metadata-only 请求），完整的节点清单由后台同步
+            node_count = count_nodes(api_client)
             
             with get_connection() as conn:
                 cursor = conn.cursor(dictionary=True)
@@ -25,8 +25,9 @@ class ClusterService:
                 query = """
                 INSERT INTO cluster_info (
                     cluster_id, cluster_name, cluster_owner, api_server,
-                    business_name, access_token, node_count, notes
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    business_name, access_token, node_count, notes,
+                    max_concurrent_jobs, max_concurrent_jobs_per_pool
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """
                 
                 values = (
@@ -37,20 +38,129 @@ class ClusterService:
                     data['business_name'],
                     data['access_token'],
                     node_count,
-                    data.get('notes', '')
+                    data.get('notes', ''),
+                    data.get('max_concurrent_jobs'),
+                    data.get('max_concurrent_jobs_per_pool')
                 )
                 
                 cursor.execute(query, values)
                 conn.commit()
-                
-                return {
-                    'cluster_id': cluster_id,
-                    'node_count': node_count
-                }
+
+            threading.Thread(
+                target=node_inventory.sync_cluster,
+                args=(cluster_id, True),
+                daemon=True
+            ).start()
+
+            return {
+                'cluster_id': cluster_id,
+                'node_count': node_count
+            }
         except Exception as e:
             print(e)
             raise Exception(f"Failed to create cluster: {str(e)}")
 
+    def _probe_cluster(self, entry):
+        """探测集群连通性并获取节点数量"""
+        return count_nodes(build_api_client(entry))
+
+    def bulk_import_clusters(self, entries):
+        """
+        批量注册集群：并发探测连通性和节点数量，探测成功的集群分批写入数据库，
+        返回每个集群的处理结果。节点清单由后台同步线程补齐
+        """
+        report = []
+        to_probe = []
+
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT api_server FROM cluster_info")
+            existing_servers = {row['api_server'] for row in cursor.fetchall()}
+
+        seen_servers = set()
+        for index, entry in enumerate(entries):
+            item = {
+                'index': index,
+                'clusterName': entry.get('cluster_name'),
+                'apiServer': entry.get('api_server'),
+                'clusterId': None,
+                'nodeCount': None,
+                'status': None,
+                'error': None
+            }
+            report.append(item)
+            missing = [field for field in CLUSTER_REQUIRED_FIELDS if not entry.get(field)]
+            if missing:
+                item['status'] = 'invalid'
+                item['error'] = f"Missing fields: {', '.join(missing)}"
+            elif entry['api_server'] in existing_servers or entry['api_server'] in seen_servers:
+                item['status'] = 'exists'
+                item['error'] = 'Cluster with the same api_server already registered'
+            else:
+                seen_servers.add(entry['api_server'])
+                to_probe.append((item, entry))
+
+        # 有限并发地探测各集群
+        probed = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=Config.BULK_IMPORT_MAX_WORKERS) as executor:
+            future_to_item = {
+                executor.submit(self._probe_cluster, entry): (item, entry)
+                for item, entry in to_probe
+            }
+            for future in concurrent.futures.as_completed(future_to_item):
+                item, entry = future_to_item[future]
+                try:
+                    item['nodeCount'] = future.result()
+                    item['clusterId'] = str(uuid.uuid4())
+                    probed.append((item, entry))
+                except Exception as e:
+                    item['status'] = 'failed'
+                    item['error'] = f"Connectivity probe failed: {str(e)}"
+
+        # 分批插入探测成功的集群
+        batch_size = Config.BULK_IMPORT_BATCH_SIZE
+        for start in range(0, len(probed), batch_size):
+            batch = probed[start:start + batch_size]
+            values = [(
+                item['clusterId'],
+                entry['cluster_name'],
+                entry['cluster_owner'],
+                entry['api_server'],
+                entry['business_name'],
+                entry['access_token'],
+                item['nodeCount'],
+                entry.get('notes', ''),
+                entry.get('max_concurrent_jobs') or None,
+                entry.get('max_concurrent_jobs_per_pool') or None
+            ) for item, entry in batch]
+            try:
+                with get_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.executemany("""
+                    INSERT INTO cluster_info (
+                        cluster_id, cluster_name, cluster_owner, api_server,
+                        business_name, access_token, node_count, notes,
+                        max_concurrent_jobs, max_concurrent_jobs_per_pool
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """, values)
+                    conn.commit()
+                for item, _ in batch:
+                    item['status'] = 'created'
+            except Exception as e:
+                for item, _ in batch:
+                    item['status'] = 'failed'
+                    item['error'] = f"Failed to save cluster: {str(e)}"
+                    item['clusterId'] = None
+
+        summary = {}
+        for item in report:
+            summary[item['status']] = summary.get(item['status'], 0) + 1
+        print(f"批量注册集群完成: {summary}")
+        return {
+            'summary': summary,
+            'clusters': report
+        }
+
     def update_cluster(self, data):
         try:
             with get_connection() as conn:
@@ -65,7 +175,11 @@ class ClusterService:
                     'cluster_owner': 'cluster_owner',
                     'api_server': 'api_server',
                     'business_name': 'business_name',
-                    'notes': 'notes'
+                    'notes': 'notes',
+                    'max_concurrent_jobs': 'max_concurrent_jobs',
+                    'max_concurrent_jobs_per_pool': 'max_concurrent_jobs_per_pool',
+                    'retention_keep_scans': 'retention_keep_scans',
+                    'retention_days': 'retention_days'
                 }
                 
                 # 处理基本字段
@@ -99,12 +213,8 @@ class ClusterService:
 
     def delete_cluster(self, cluster_id):
         try:
-            with get_connection() as conn:
-                cursor = conn.cursor()
-                
-                query = "DELETE FROM cluster_info WHERE cluster_id = %s"
-                cursor.execute(query, (cluster_id,))
-                conn.commit()
+            # 集群及其扫描历史由后台删除任务分批清理，不依赖级联删除的大事务
+            return deletion_worker.enqueue('cluster', cluster_id)
         except Exception as e:
             raise Exception(f"Failed to delete cluster: {str(e)}")
 
@@ -116,8 +226,14 @@ class ClusterService:
                 query = """
                 SELECT cluster_id, cluster_name, cluster_owner, api_server,
                        business_name, node_count, notes, 
+                       max_concurrent_jobs, max_concurrent_jobs_per_pool,
+                       retention_keep_scans, retention_days, inventory_synced_at, api_status, api_status_changed_at,
                        created_at, updated_at
                 FROM cluster_info
+                WHERE cluster_id NOT IN (
+                    SELECT cluster_id FROM deletion_jobs
+                    WHERE target_type = 'cluster' AND status IN ('pending', 'running')
+                )
                 """
                 
                 cursor.execute(query)
@@ -135,6 +251,13 @@ class ClusterService:
                         'businessName': cluster['business_name'],
                         'nodeCount': cluster['node_count'],
                         'notes': cluster['notes'],
+                        'maxConcurrentJobs': cluster['max_concurrent_jobs'],
+                        'maxConcurrentJobsPerPool': cluster['max_concurrent_jobs_per_pool'],
+                        'retentionKeepScans': cluster['retention_keep_scans'],
+                        'retentionDays': cluster['retention_days'],
+                        'inventorySyncedAt': cluster['inventory_synced_at'].isoformat() if cluster['inventory_synced_at'] else None,
+                        'apiStatus': cluster['api_status'],
+                        'apiStatusChangedAt': cluster['api_status_changed_at'].isoformat() if cluster['api_status_changed_at'] else None,
                         'createdAt': cluster['created_at'].isoformat() if cluster['created_at'] else None,
                         'updatedAt': cluster['updated_at'].isoformat() if cluster['updated_at'] else None
                     }
@@ -154,6 +277,8 @@ class ClusterService:
                 query = """
                 SELECT cluster_id, cluster_name, cluster_owner, api_server,
                        business_name, node_count, notes, 
+                       max_concurrent_jobs, max_concurrent_jobs_per_pool,
+                       retention_keep_scans, retention_days, inventory_synced_at, api_status, api_status_changed_at,
                        created_at, updated_at
                 FROM cluster_info
                 WHERE cluster_id = %s
@@ -172,6 +297,13 @@ class ClusterService:
                         'businessName': cluster['business_name'],
                         'nodeCount': cluster['node_count'],
                         'notes': cluster['notes'],
+                        'maxConcurrentJobs': cluster['max_concurrent_jobs'],
+                        'maxConcurrentJobsPerPool': cluster['max_concurrent_jobs_per_pool'],
+                        'retentionKeepScans': cluster['retention_keep_scans'],
+                        'retentionDays': cluster['retention_days'],
+                        'inventorySyncedAt': cluster['inventory_synced_at'].isoformat() if cluster['inventory_synced_at'] else None,
+                        'apiStatus': cluster['api_status'],
+                        'apiStatusChangedAt': cluster['api_status_changed_at'].isoformat() if cluster['api_status_changed_at'] else None,
                         'createdAt': cluster['created_at'].isoformat(),
                         'updatedAt': cluster['updated_at'].isoformat()
                     }
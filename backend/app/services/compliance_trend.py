@@ -0,0 +1,169 @@
+from app.models.database import get_connection
+from app.services.result_ingest import register_ingest_hook, iter_check_results, INGEST_ORDER_COMPLIANCE_TREND
+from config import Config
+from datetime import timedelta
+
+# 下采样粒度及每个时间桶的长度
+TREND_GRANULARITIES = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1)
+}
+
+# 集群级别汇总使用的节点名称
+CLUSTER_LEVEL = ''
+
+
+def compliance_score(pass_count, fail_count, warn_count):
+    evaluated = pass_count + fail_count + warn_count
+    return round(pass_count / evaluated * 100, 2) if evaluated else None
+
+
+def bucket_start(timestamp, granularity):
+    """时间所在桶的起始时间，周以周一为起点"""
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return day
+    return day - timedelta(days=day.weekday())
+
+
+def _apply_to_rollups(cursor, samples, sign):
+    """将样本按小时、天、周累加到节点级和集群级的汇总中，sign 为 -1 时扣除"""
+    values = []
+    for sample in samples:
+        score = sample['score']
+        for granularity in TREND_GRANULARITIES:
+            start = bucket_start(sample['sampled_at'], granularity)
+            for node_name in (sample['node_name'], CLUSTER_LEVEL):
+                values.append((
+                    sample['cluster_id'], node_name, granularity, start, sign,
+                    sign * sample['pass_count'], sign * sample['fail_count'],
+                    sign * sample['warn_count'], sign * sample['info_count'],
+                    sign if score is not None else 0, sign * (score or 0)
+                ))
+    if values:
+        cursor.executemany("""
+        INSERT INTO compliance_rollups (
+            cluster_id, node_name, granularity, bucket_start, sample_count,
+            pass_sum, fail_sum, warn_sum, info_sum, scored_count, score_sum
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            sample_count = sample_count + VALUES(sample_count),
+            pass_sum = pass_sum + VALUES(pass_sum),
+            fail_sum = fail_sum + VALUES(fail_sum),
+            warn_sum = warn_sum + VALUES(warn_sum),
+            info_sum = info_sum + VALUES(info_sum),
+            scored_count = scored_count + VALUES(scored_count),
+            score_sum = score_sum + VALUES(score_sum)
+        """, values)
+
+
+@register_ingest_hook(INGEST_ORDER_COMPLIANCE_TREND)
+def record_compliance_samples(cursor, rows):
+    """入库时写入每个节点结果的统计样本，并增量更新各粒度的下采样汇总"""
+    samples = []
+    for row in rows:
+        cursor.execute("""
+        SELECT 1 FROM compliance_samples WHERE node_task_id = %s
+        """, (row['node_task_id'],))
+        if cursor.fetchone():
+            continue
+
+        counts = {'PASS': 0, 'FAIL': 0, 'WARN': 0, 'INFO': 0}
+        for _, _, result in iter_check_results(row['scan_result']):
+            if result.get('status') in counts:
+                counts[result['status']] += 1
+        samples.append({
+            'cluster_id': row['cluster_id'],
+            'node_name': row['node_name'],
+            'main_task_id': row['main_task_id'],
+            'node_task_id': row['node_task_id'],
+            'sampled_at': row['inserted_at'],
+            'pass_count': counts['PASS'],
+            'fail_count': counts['FAIL'],
+            'warn_count': counts['WARN'],
+            'info_count': counts['INFO'],
+            'score': compliance_score(counts['PASS'], counts['FAIL'], counts['WARN'])
+        })
+
+    if not samples:
+        return
+    cursor.executemany("""
+    INSERT INTO compliance_samples (
+        cluster_id, node_name, main_task_id, node_task_id, sampled_at,
+        pass_count, fail_count, warn_count, info_count, score
+    ) VALUES (
+        %(cluster_id)s, %(node_name)s, %(main_task_id)s, %(node_task_id)s, %(sampled_at)s,
+        %(pass_count)s, %(fail_count)s, %(warn_count)s, %(info_count)s, %(score)s
+    )
+    """, samples)
+    _apply_to_rollups(cursor, samples, 1)
+
+
+def remove_scan_task_samples(cluster_id, main_task_id):
+    """删除扫描主任务前调用：从汇总中扣除该主任务的样本并删除样本，在同一事务中完成，重复调用不会重复扣除"""
+    with get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+        SELECT cluster_id, node_name, sampled_at, pass_count, fail_count, warn_count, info_count, score
+        FROM compliance_samples
+        WHERE cluster_id = %s AND main_task_id = %s
+        FOR UPDATE
+        """, (cluster_id, main_task_id))
+        samples = cursor.fetchall()
+        if not samples:
+            conn.rollback()
+            return
+        for sample in samples:
+            sample['score'] = float(sample['score']) if sample['score'] is not None else None
+        _apply_to_rollups(cursor, samples, -1)
+        cursor.execute("""
+        DELETE FROM compliance_samples
+        WHERE cluster_id = %s AND main_task_id = %s
+        """, (cluster_id, main_task_id))
+        cursor.execute("""
+        DELETE FROM compliance_rollups
+        WHERE cluster_id = %s AND sample_count <= 0
+        """, (cluster_id,))
+        conn.commit()
+
+
+def choose_granularity(start, end):
+    """选择使点数不超过 TREND_MAX_POINTS 的最细粒度"""
+    span = end - start
+    for granularity, step in TREND_GRANULARITIES.items():
+        if span / step <= Config.TREND_MAX_POINTS:
+            return granularity
+    return 'week'
+
+
+def get_compliance_trend(cluster_id, start, end, node_name=None, granularity=None):
+    """读取集群或节点在时间范围内的合规趋势，每个点为一个时间桶内样本的平均值"""
+    granularity = granularity or choose_granularity(start, end)
+    with get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+        SELECT bucket_start, sample_count, pass_sum, fail_sum, warn_sum, info_sum, scored_count, score_sum
+        FROM compliance_rollups
+        WHERE cluster_id = %s AND node_name = %s AND granularity = %s
+        AND bucket_start >= %s AND bucket_start < %s AND sample_count > 0
+        ORDER BY bucket_start
+        """, (cluster_id, node_name or CLUSTER_LEVEL, granularity, bucket_start(start, granularity), end))
+        rows = cursor.fetchall()
+
+    return {
+        'clusterId': cluster_id,
+        'nodeName': node_name,
+        'granularity': granularity,
+        'points': [{
+            'time': row['bucket_start'].isoformat(),
+            'samples': row['sample_count'],
+            'pass': round(row['pass_sum'] / row['sample_count'], 2),
+            'fail': round(row['fail_sum'] / row['sample_count'], 2),
+            'warn': round(row['warn_sum'] / row['sample_count'], 2),
+            'info': round(row['info_sum'] / row['sample_count'], 2),
+            'score': round(float(row['score_sum']) / row['scored_count'], 2) if row['scored_count'] else None
+        } for row in rows]
+    }
@@ -0,0 +1,310 @@
+from app.models.database import get_connection
+from app.utils.kube_client import build_api_client
+from app.services.cluster_health import cluster_health
+from app.services.job_reaper import delete_jobs_rate_limited
+from app.services.result_archive import result_archive
+from app.services.fleet_rollup import remove_scan_task_from_rollup
+from app.services.compliance_trend import remove_scan_task_samples
+from kubernetes import client
+from config import Config
+import threading
+import time
+import uuid
+
+# 删除扫描主任务时需要清理的表（按顺序分批删除），后续新增的按主任务存储的表需要加入这里
+SCAN_TASK_DEPENDENT_TABLES = [
+    'scan_drift',
+    'scan_finding_matrix',
+    'scan_matrix_nodes',
+    'scan_matrix',
+    'scan_check_results',
+    'cluster_scan_results',
+    'scan_result_archive_index',
+    'cluster_node_tasks',
+]
+
+# 删除扫描主任务的记录之前调用的处理函数，签名为 hook(cluster_id, main_task_id)，用于回退汇总统计等派生数据
+SCAN_TASK_DELETE_HOOKS = [
+    remove_scan_task_from_rollup,
+    remove_scan_task_samples,
+]
+
+# 删除集群时需要清理的表（按顺序分批删除），最后删除 cluster_info 中的集群记录
+CLUSTER_DEPENDENT_TABLES = [
+    'scan_schedules',
+    'fleet_scan_clusters',
+    'check_status_rollup',
+    'node_latest_result',
+    'compliance_samples',
+    'compliance_rollups',
+    'scan_drift',
+    'scan_finding_matrix',
+    'scan_matrix_nodes',
+    'scan_matrix',
+    'scan_check_results',
+    'cluster_scan_results',
+    'scan_result_archive_index',
+    'cluster_node_tasks',
+    'cluster_node_inventory',
+    'scan_duration_stats',
+]
+
+
+def deletion_pending(cursor, cluster_id, main_task_id=None, lock=False):
+    """
+    集群或扫描主任务是否有未完成的删除任务。lock 为 True 时对查询范围加共享锁，
+    当前事务提交前无法登记新的删除任务，用于保证写入不会落在删除之后
+    """
+    cursor.execute(f"""
+    SELECT deletion_id
+    FROM deletion_jobs
+    WHERE cluster_id = %s AND status IN ('pending', 'running')
+    AND (target_type = 'cluster' OR main_task_id = %s)
+    LIMIT 1{' FOR SHARE' if lock else ''}
+    """, (cluster_id, main_task_id))
+    return cursor.fetchone() is not None
+
+
+class DeletionWorker:
+    """
+    后台删除：扫描主任务和集群的删除请求记录为删除任务，由后台线程分批提交删除数据库记录，
+    并发限速删除 Kubernetes Job，避免长事务持有 InnoDB 锁阻塞监控线程的写入
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            print("Deletion worker started")
+
+    def _run(self):
+        while True:
+            try:
+                while self.process_next():
+                    pass
+            except Exception as e:
+                print(f"Error in deletion worker: {str(e)}")
+            self._wakeup.wait(Config.DELETION_POLL_INTERVAL)
+            self._wakeup.clear()
+
+    def enqueue(self, target_type, cluster_id, main_task_id=None):
+        """记录删除任务，返回删除任务ID"""
+        deletion_id = str(uuid.uuid4())
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT INTO deletion_jobs (deletion_id, target_type, cluster_id, main_task_id, status)
+            VALUES (%s, %s, %s, %s, 'pending')
+            """, (deletion_id, target_type, cluster_id, main_task_id))
+            conn.commit()
+        self._wakeup.set()
+        return deletion_id
+
+    def _claim_next(self):
+        """领取一个待处理的删除任务；运行中但长时间没有进展的任务（进程退出）可以被重新领取"""
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT deletion_id, target_type, cluster_id, main_task_id
+            FROM deletion_jobs
+            WHERE status = 'pending'
+            OR (status = 'running' AND updated_at < NOW() - INTERVAL %s SECOND)
+            ORDER BY created_at
+            LIMIT 1
+            """, (Config.DELETION_STALE_TIMEOUT,))
+            deletion = cursor.fetchone()
+            if not deletion:
+                return None
+
+            cursor.execute("""
+            UPDATE deletion_jobs
+            SET status = 'running', updated_at = NOW()
+            WHERE deletion_id = %s
+            AND (status = 'pending' OR (status = 'running' AND updated_at < NOW() - INTERVAL %s SECOND))
+            """, (deletion['deletion_id'], Config.DELETION_STALE_TIMEOUT))
+            conn.commit()
+            return deletion if cursor.rowcount == 1 else None
+
+    def process_next(self):
+        deletion = self._claim_next()
+        if not deletion:
+            return False
+
+        print(f"开始处理删除任务 {deletion['deletion_id']} ({deletion['target_type']})")
+        try:
+            if deletion['target_type'] == 'scan_task':
+                conditions = {'cluster_id': deletion['cluster_id'], 'main_task_id': deletion['main_task_id']}
+                tables = SCAN_TASK_DEPENDENT_TABLES
+            else:
+                conditions = {'cluster_id': deletion['cluster_id']}
+                tables = CLUSTER_DEPENDENT_TABLES
+
+            self._stop_active_tasks(conditions)
+            self._delete_kubernetes_resources(deletion['deletion_id'], conditions)
+            archive_files = []
+            if deletion['target_type'] == 'scan_task':
+                for hook in SCAN_TASK_DELETE_HOOKS:
+                    hook(deletion['cluster_id'], deletion['main_task_id'])
+                archive_files = result_archive.get_scan_task_archive_files(
+                    deletion['cluster_id'], deletion['main_task_id']
+                )
+            for table in tables:
+                self._delete_rows_in_chunks(deletion['deletion_id'], table, conditions)
+            if deletion['target_type'] == 'scan_task':
+                result_archive.delete_scan_task_archives(
+                    deletion['cluster_id'], deletion['main_task_id'], archive_files
+                )
+            if deletion['target_type'] == 'cluster':
+                self._delete_rows_in_chunks(deletion['deletion_id'], 'cluster_info', conditions)
+                result_archive.delete_cluster_archives(deletion['cluster_id'])
+
+            self._update_progress(deletion['deletion_id'], status='done', finished=True)
+            print(f"删除任务 {deletion['deletion_id']} 完成")
+        except Exception as e:
+            print(f"Error processing deletion {deletion['deletion_id']}: {str(e)}")
+            self._update_progress(deletion['deletion_id'], status='failed', error=str(e), finished=True)
+        return True
+
+    def _update_progress(self, deletion_id, status=None, jobs_total=None, jobs_deleted=0,
+                         rows_deleted=0, error=None, finished=False):
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            UPDATE deletion_jobs
+            SET status = COALESCE(%s, status),
+                jobs_total = COALESCE(%s, jobs_total),
+                jobs_deleted = jobs_deleted + %s,
+                rows_deleted = rows_deleted + %s,
+                error = COALESCE(%s, error),
+                finished_at = IF(%s, NOW(), finished_at),
+                updated_at = NOW()
+            WHERE deletion_id = %s
+            """, (status, jobs_total, jobs_deleted, rows_deleted, error, finished, deletion_id))
+            conn.commit()
+
+    def _stop_active_tasks(self, conditions):
+        """
+        删除记录之前结束未完成的节点任务，监控线程不再放行新的 Job；
+        已放行任务的结果由 store_scan_result 根据删除任务丢弃，避免写回已清理的表
+        """
+        where = ' AND '.join(f"{column} = %s" for column in conditions)
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+            UPDATE cluster_node_tasks
+            SET scan_status = 'failed', finished_at = NOW()
+            WHERE {where} AND scan_status IN ('queued', 'pending', 'running')
+            """, list(conditions.values()))
+            conn.commit()
+
+    def _delete_kubernetes_resources(self, deletion_id, conditions):
+        """并发限速删除尚未回收的 kube-bench Job 以及 DaemonSet 模式创建的 DaemonSet"""
+        where = ' AND '.join(f"{column} = %s" for column in conditions)
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"""
+            SELECT DISTINCT kube_bench_job, scan_executor
+            FROM cluster_node_tasks
+            WHERE {where} AND kube_bench_job != '' AND job_reaped = 0
+            AND scan_executor IN ('job', 'daemonset')
+            """, list(conditions.values()))
+            resources = cursor.fetchall()
+
+            cursor.execute("""
+            SELECT api_server, access_token
+            FROM cluster_info
+            WHERE cluster_id = %s
+            """, (conditions['cluster_id'],))
+            cluster_config = cursor.fetchone()
+
+        job_names = [row['kube_bench_job'] for row in resources if row['scan_executor'] == 'job']
+        daemonset_names = [row['kube_bench_job'] for row in resources if row['scan_executor'] == 'daemonset']
+        self._update_progress(deletion_id, jobs_total=len(job_names))
+        if not resources or not cluster_config:
+            return
+
+        api_client = build_api_client(cluster_config)
+        # 集群不可达时只清理数据库记录，遗留的 Job 由 ttlSecondsAfterFinished 回收
+        if not cluster_health.available(conditions['cluster_id'], api_client):
+            print(f"集群 {conditions['cluster_id']} 不可达，跳过 Kubernetes 资源清理")
+            return
+
+        apps_v1 = client.AppsV1Api(api_client)
+        for daemonset_name in daemonset_names:
+            try:
+                apps_v1.delete_namespaced_daemon_set(
+                    name=daemonset_name,
+                    namespace='default',
+                    body=client.V1DeleteOptions(propagation_policy='Background')
+                )
+            except Exception as e:
+                print(f"Error deleting daemonset {daemonset_name}: {str(e)}")
+
+        batch_v1 = client.BatchV1Api(api_client)
+        batch_size = Config.DELETION_CHUNK_SIZE
+        for start in range(0, len(job_names), batch_size):
+            deleted = delete_jobs_rate_limited(
+                batch_v1,
+                job_names[start:start + batch_size],
+                max_workers=Config.DELETION_JOB_WORKERS
+            )
+            self._update_progress(deletion_id, jobs_deleted=len(deleted))
+
+    def _delete_rows_in_chunks(self, deletion_id, table, conditions):
+        """每次删除一小批记录并立即提交，批次之间短暂停顿，让出锁给其他写入"""
+        where = ' AND '.join(f"{column} = %s" for column in conditions)
+        while True:
+            with get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                DELETE FROM {table}
+                WHERE {where}
+                LIMIT %s
+                """, list(conditions.values()) + [Config.DELETION_CHUNK_SIZE])
+                deleted = cursor.rowcount
+                conn.commit()
+
+            if deleted:
+                self._update_progress(deletion_id, rows_deleted=deleted)
+            if deleted < Config.DELETION_CHUNK_SIZE:
+                return
+            time.sleep(Config.DELETION_CHUNK_PAUSE)
+
+    def get_deletion(self, deletion_id):
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT deletion_id, target_type, cluster_id, main_task_id, status,
+                   jobs_total, jobs_deleted, rows_deleted, error,
+                   created_at, updated_at, finished_at
+            FROM deletion_jobs
+            WHERE deletion_id = %s
+            """, (deletion_id,))
+            deletion = cursor.fetchone()
+
+        if not deletion:
+            return None
+        return {
+            'deletionId': deletion['deletion_id'],
+            'targetType': deletion['target_type'],
+            'clusterId': deletion['cluster_id'],
+            'mainTaskId': deletion['main_task_id'],
+            'status': deletion['status'],
+            'jobsTotal': deletion['jobs_total'],
+            'jobsDeleted': deletion['jobs_deleted'],
+            'rowsDeleted': deletion['rows_deleted'],
+            'error': deletion['error'],
+            'createdAt': deletion['created_at'].isoformat() if deletion['created_at'] else None,
+            'updatedAt': deletion['updated_at'].isoformat() if deletion['updated_at'] else None,
+            'finishedAt': deletion['finished_at'].isoformat() if deletion['finished_at'] else None
+        }
+
+
+deletion_worker = DeletionWorker()
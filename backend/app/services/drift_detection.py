@@ -0,0 +1,165 @@
+from app.models.database import get_connection
+from app.services.result_ingest import register_ingest_hook, iter_check_results, INGEST_ORDER_DRIFT
+
+DRIFT_CHANGE_TYPES = ['new_failure', 'fixed', 'status_changed', 'added', 'removed']
+
+
+def _classify_change(previous_status, current_status):
+    if previous_status == current_status:
+        return None
+    if previous_status is None:
+        return 'new_failure' if current_status == 'FAIL' else 'added'
+    if current_status is None:
+        return 'removed'
+    if current_status == 'FAIL':
+        return 'new_failure'
+    if previous_status == 'FAIL':
+        return 'fixed'
+    return 'status_changed'
+
+
+@register_ingest_hook(INGEST_ORDER_DRIFT)
+def record_drift(cursor, rows):
+    """
+    入库时与该节点上一次扫描的结果对比，记录新增失败、已修复和其他状态变化。
+    上一次结果的检查项状态从 scan_check_results 读取，不需要重新解析 JSON
+    """
+    for row in rows:
+        cursor.execute("""
+        DELETE FROM scan_drift
+        WHERE node_task_id = %s
+        """, (row['node_task_id'],))
+
+        cursor.execute("""
+        SELECT node_task_id, main_task_id
+        FROM scan_check_results
+        WHERE cluster_id = %s AND node_name = %s
+        AND main_task_id != %s AND inserted_at <= %s
+        ORDER BY inserted_at DESC, id DESC
+        LIMIT 1
+        """, (row['cluster_id'], row['node_name'], row['main_task_id'], row['inserted_at']))
+        previous = cursor.fetchone()
+        if not previous:
+            continue
+
+        cursor.execute("""
+        SELECT check_id, status
+        FROM scan_check_results
+        WHERE node_task_id = %s
+        """, (previous['node_task_id'],))
+        previous_statuses = {item['check_id']: item['status'] for item in cursor.fetchall()}
+        current_statuses = {
+            str(result.get('test_number', '')): result.get('status')
+            for _, _, result in iter_check_results(row['scan_result'])
+        }
+
+        values = []
+        for check_id in sorted(set(previous_statuses) | set(current_statuses)):
+            previous_status = previous_statuses.get(check_id)
+            current_status = current_statuses.get(check_id)
+            change_type = _classify_change(previous_status, current_status)
+            if change_type:
+                values.append((
+                    row['cluster_id'], row['main_task_id'], row['node_task_id'], row['node_name'],
+                    previous['main_task_id'], previous['node_task_id'],
+                    check_id, change_type, previous_status, current_status, row['inserted_at']
+                ))
+        if values:
+            cursor.executemany("""
+            INSERT INTO scan_drift (
+                cluster_id, main_task_id, node_task_id, node_name,
+                previous_main_task_id, previous_node_task_id,
+                check_id, change_type, previous_status, current_status, inserted_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, values)
+
+
+def _format_change(row):
+    return {
+        'checkId': row['check_id'],
+        'changeType': row['change_type'],
+        'previousStatus': row['previous_status'],
+        'currentStatus': row['current_status']
+    }
+
+
+def get_scan_diff(cluster_id, main_task_id, change_types=None):
+    """扫描主任务与各节点上一次扫描之间的差异"""
+    conditions = ["cluster_id = %s", "main_task_id = %s"]
+    params = [cluster_id, main_task_id]
+    if change_types:
+        conditions.append(f"change_type IN ({', '.join(['%s'] * len(change_types))})")
+        params.extend(change_types)
+
+    with get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"""
+        SELECT node_name, node_task_id, previous_main_task_id, previous_node_task_id,
+               check_id, change_type, previous_status, current_status
+        FROM scan_drift
+        WHERE {' AND '.join(conditions)}
+        ORDER BY node_name, check_id
+        """, params)
+        rows = cursor.fetchall()
+
+    summary = dict.fromkeys(DRIFT_CHANGE_TYPES, 0)
+    nodes = {}
+    for row in rows:
+        summary[row['change_type']] += 1
+        node = nodes.setdefault(row['node_task_id'], {
+            'nodeName': row['node_name'],
+            'nodeTaskId': row['node_task_id'],
+            'previousMainTaskId': row['previous_main_task_id'],
+            'previousNodeTaskId': row['previous_node_task_id'],
+            'changes': []
+        })
+        node['changes'].append(_format_change(row))
+
+    return {
+        'mainTaskId': main_task_id,
+        'summary': summary,
+        'nodes': list(nodes.values())
+    }
+
+
+def get_node_diff(cluster_id, node_name, main_task_id=None, limit=20):
+    """节点在连续扫描之间的差异；指定主任务时只返回该次扫描的差异，否则按时间倒序返回最近的若干次"""
+    with get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        if main_task_id:
+            cursor.execute("""
+            SELECT DISTINCT node_task_id, main_task_id, previous_main_task_id, previous_node_task_id, inserted_at
+            FROM scan_drift
+            WHERE cluster_id = %s AND node_name = %s AND main_task_id = %s
+            """, (cluster_id, node_name, main_task_id))
+        else:
+            cursor.execute("""
+            SELECT DISTINCT node_task_id, main_task_id, previous_main_task_id, previous_node_task_id, inserted_at
+            FROM scan_drift
+            WHERE cluster_id = %s AND node_name = %s
+            ORDER BY inserted_at DESC
+            LIMIT %s
+            """, (cluster_id, node_name, limit))
+        scans = cursor.fetchall()
+        if not scans:
+            return []
+
+        placeholders = ', '.join(['%s'] * len(scans))
+        cursor.execute(f"""
+        SELECT node_task_id, check_id, change_type, previous_status, current_status
+        FROM scan_drift
+        WHERE node_task_id IN ({placeholders})
+        ORDER BY check_id
+        """, [scan['node_task_id'] for scan in scans])
+        changes_by_task = {}
+        for row in cursor.fetchall():
+            changes_by_task.setdefault(row['node_task_id'], []).append(_format_change(row))
+
+    return [{
+        'nodeTaskId': scan['node_task_id'],
+        'mainTaskId': scan['main_task_id'],
+        'previousMainTaskId': scan['previous_main_task_id'],
+        'previousNodeTaskId': scan['previous_node_task_id'],
+        'insertedAt': scan['inserted_at'].isoformat(),
+        'changes': changes_by_task.get(scan['node_task_id'], [])
+    } for scan in scans]
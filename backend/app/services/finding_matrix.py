@@ -0,0 +1,195 @@
+from app.models.database import get_connection
+from app.services.result_ingest import register_ingest_hook, iter_check_results, INGEST_ORDER_FINDING_MATRIX
+
+# 矩阵中记录的检查状态及对应的位图字段
+MATRIX_STATUS_COLUMNS = {
+    'FAIL': 'fail_bits',
+    'WARN': 'warn_bits'
+}
+
+
+def _assign_node_index(cursor, cluster_id, main_task_id, node_name):
+    """
+    返回节点在矩阵中的下标，首次入库的节点取当前最大下标加一。
+    增量扫描和快速扫描会在主任务的全部节点任务创建之前入库，因此下标按入库顺序逐个分配；
+    调用方已锁定主任务的矩阵记录，并发入库不会分配到相同的下标
+    """
+    cursor.execute("""
+    SELECT node_index, node_task_id
+    FROM scan_matrix_nodes
+    WHERE main_task_id = %s AND node_name = %s
+    """, (main_task_id, node_name))
+    node = cursor.fetchone()
+    if node:
+        return node
+
+    cursor.execute("""
+    SELECT COALESCE(MAX(node_index) + 1, 0) AS next_index
+    FROM scan_matrix_nodes
+    WHERE main_task_id = %s
+    """, (main_task_id,))
+    node_index = cursor.fetchone()['next_index']
+    cursor.execute("""
+    INSERT INTO scan_matrix_nodes (cluster_id, main_task_id, node_index, node_name)
+    VALUES (%s, %s, %s, %s)
+    """, (cluster_id, main_task_id, node_index, node_name))
+    return {'node_index': node_index, 'node_task_id': None}
+
+
+def set_bit(bits, index, value):
+    """设置或清除位图中的一位，位图长度不足时在末尾补零，已有节点的下标不受影响"""
+    bits = bytearray(bits or b'')
+    if len(bits) <= index // 8:
+        if not value:
+            return bytes(bits)
+        bits.extend(bytes(index // 8 + 1 - len(bits)))
+    if value:
+        bits[index // 8] |= 1 << (index % 8)
+    else:
+        bits[index // 8] &= ~(1 << (index % 8)) & 0xFF
+    return bytes(bits)
+
+
+@register_ingest_hook(INGEST_ORDER_FINDING_MATRIX)
+def update_finding_matrix(cursor, rows):
+    """
+    入库时把节点的 FAIL/WARN 检查项写入主任务的检查项×节点矩阵。
+    每个检查项保存一个按节点下标编码的位图，随节点增加变长；更新时先锁定主任务的矩阵记录，
+    在内存中修改对应的位后写回
+    """
+    for row in rows:
+        cursor.execute("""
+        INSERT IGNORE INTO scan_matrix (cluster_id, main_task_id)
+        VALUES (%s, %s)
+        """, (row['cluster_id'], row['main_task_id']))
+        cursor.execute("""
+        SELECT main_task_id
+        FROM scan_matrix
+        WHERE main_task_id = %s
+        FOR UPDATE
+        """, (row['main_task_id'],))
+        cursor.fetchone()
+
+        node = _assign_node_index(cursor, row['cluster_id'], row['main_task_id'], row['node_name'])
+        node_index = node['node_index']
+
+        findings = {}
+        for _, _, result in iter_check_results(row['scan_result']):
+            status = result.get('status')
+            if status in MATRIX_STATUS_COLUMNS:
+                findings.setdefault(str(result.get('test_number', '')), set()).add(status)
+
+        if node['node_task_id']:
+            # 同一主任务中节点的结果被替换（例如重试），原结果命中的检查项也需要清除该节点的位
+            cursor.execute("""
+            SELECT check_id, fail_bits, warn_bits
+            FROM scan_finding_matrix
+            WHERE main_task_id = %s
+            """, (row['main_task_id'],))
+            matrix = {item['check_id']: item for item in cursor.fetchall()}
+        elif findings:
+            check_ids = sorted(findings)
+            cursor.execute(f"""
+            SELECT check_id, fail_bits, warn_bits
+            FROM scan_finding_matrix
+            WHERE main_task_id = %s AND check_id IN ({', '.join(['%s'] * len(check_ids))})
+            """, [row['main_task_id']] + check_ids)
+            matrix = {item['check_id']: item for item in cursor.fetchall()}
+        else:
+            matrix = {}
+
+        values = []
+        for check_id in sorted(set(matrix) | set(findings)):
+            current = matrix.get(check_id) or {'fail_bits': b'', 'warn_bits': b''}
+            statuses = findings.get(check_id, set())
+            fail_bits = set_bit(current['fail_bits'], node_index, 'FAIL' in statuses)
+            warn_bits = set_bit(current['warn_bits'], node_index, 'WARN' in statuses)
+            if check_id in matrix and fail_bits == bytes(current['fail_bits']) and warn_bits == bytes(current['warn_bits']):
+                continue
+            values.append((row['cluster_id'], row['main_task_id'], check_id, fail_bits, warn_bits))
+        if values:
+            cursor.executemany("""
+            INSERT INTO scan_finding_matrix (cluster_id, main_task_id, check_id, fail_bits, warn_bits)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                fail_bits = VALUES(fail_bits),
+                warn_bits = VALUES(warn_bits)
+            """, values)
+
+        cursor.execute("""
+        UPDATE scan_matrix_nodes
+        SET node_task_id = %s
+        WHERE main_task_id = %s AND node_name = %s
+        """, (row['node_task_id'], row['main_task_id'], row['node_name']))
+
+
+def _bit_indexes(bits):
+    """返回位图中被置位的节点下标"""
+    value = int.from_bytes(bits or b'', 'little')
+    indexes = []
+    while value:
+        low_bit = value & -value
+        indexes.append(low_bit.bit_length() - 1)
+        value ^= low_bit
+    return indexes
+
+
+def get_finding_matrix(cluster_id, main_task_id, status='FAIL'):
+    """
+    读取主任务的检查项×节点矩阵：每个检查项命中的节点、每个节点命中的检查项，
+    以及按命中检查项集合完全相同的节点分组
+    """
+    column = MATRIX_STATUS_COLUMNS[status]
+    with get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+        SELECT node_index, node_name
+        FROM scan_matrix_nodes
+        WHERE cluster_id = %s AND main_task_id = %s
+        ORDER BY node_index
+        """, (cluster_id, main_task_id))
+        node_names = {row['node_index']: row['node_name'] for row in cursor.fetchall()}
+
+        cursor.execute(f"""
+        SELECT check_id, {column} AS bits
+        FROM scan_finding_matrix
+        WHERE cluster_id = %s AND main_task_id = %s
+        ORDER BY check_id
+        """, (cluster_id, main_task_id))
+        check_rows = cursor.fetchall()
+
+    checks = []
+    checks_by_node = {index: [] for index in node_names}
+    for row in check_rows:
+        indexes = [index for index in _bit_indexes(row['bits']) if index in node_names]
+        if not indexes:
+            continue
+        checks.append({
+            'checkId': row['check_id'],
+            'nodeCount': len(indexes),
+            'nodes': [node_names[index] for index in indexes]
+        })
+        for index in indexes:
+            checks_by_node[index].append(row['check_id'])
+
+    profiles = {}
+    for index, check_ids in checks_by_node.items():
+        if check_ids:
+            profiles.setdefault(tuple(check_ids), []).append(node_names[index])
+
+    return {
+        'status': status,
+        'nodeCount': len(node_names),
+        'checks': sorted(checks, key=lambda check: (-check['nodeCount'], check['checkId'])),
+        'nodes': [
+            {'nodeName': node_names[index], 'checks': check_ids}
+            for index, check_ids in checks_by_node.items()
+        ],
+        'profiles': sorted(
+            [
+                {'checks': list(check_ids), 'nodeCount': len(nodes), 'nodes': nodes}
+                for check_ids, nodes in profiles.items()
+            ],
+            key=lambda profile: (-profile['nodeCount'], -len(profile['checks']))
+        )
+    }
@@ -0,0 +1,270 @@
+from app.models.database import get_connection
+from app.services.check_catalog import load_scan_result
+from app.services.result_archive import result_archive
+from app.services.result_ingest import register_ingest_hook, iter_check_results, INGEST_ORDER_FLEET_ROLLUP
+
+STATUS_COLUMNS = {
+    'PASS': 'pass_nodes',
+    'FAIL': 'fail_nodes',
+    'WARN': 'warn_nodes',
+    'INFO': 'info_nodes'
+}
+
+
+def _status_counts(scan_result):
+    counts = {'PASS': 0, 'FAIL': 0, 'WARN': 0, 'INFO': 0}
+    for _, _, result in iter_check_results(scan_result):
+        if result.get('status') in counts:
+            counts[result['status']] += 1
+    return counts
+
+
+def _check_statuses_from_result(scan_result):
+    return {
+        (str(result.get('test_number', '')), result.get('status'))
+        for _, _, result in iter_check_results(scan_result)
+        if result.get('status') in STATUS_COLUMNS
+    }
+
+
+def _check_statuses_from_index(cursor, node_task_id):
+    cursor.execute("""
+    SELECT DISTINCT check_id, status
+    FROM scan_check_results
+    WHERE node_task_id = %s
+    """, (node_task_id,))
+    return {
+        (row['check_id'], row['status'])
+        for row in cursor.fetchall()
+        if row['status'] in STATUS_COLUMNS
+    }
+
+
+def _apply_check_delta(cursor, cluster_id, removed, added):
+    """按检查项和状态增减节点计数"""
+    deltas = {}
+    for check_id, status in removed:
+        deltas.setdefault(check_id, dict.fromkeys(STATUS_COLUMNS, 0))[status] -= 1
+    for check_id, status in added:
+        deltas.setdefault(check_id, dict.fromkeys(STATUS_COLUMNS, 0))[status] += 1
+    values = [
+        (cluster_id, check_id, delta['PASS'], delta['FAIL'], delta['WARN'], delta['INFO'])
+        for check_id, delta in deltas.items() if any(delta.values())
+    ]
+    if values:
+        cursor.executemany("""
+        INSERT INTO check_status_rollup (cluster_id, check_id, pass_nodes, fail_nodes, warn_nodes, info_nodes)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            pass_nodes = pass_nodes + VALUES(pass_nodes),
+            fail_nodes = fail_nodes + VALUES(fail_nodes),
+            warn_nodes = warn_nodes + VALUES(warn_nodes),
+            info_nodes = info_nodes + VALUES(info_nodes)
+        """, values)
+
+
+@register_ingest_hook(INGEST_ORDER_FLEET_ROLLUP)
+def update_fleet_rollup(cursor, rows):
+    """
+    入库时增量维护节点最新结果和检查项汇总：节点的最新结果变化时，
+    扣除旧结果各检查项的计数并加上新结果的计数
+    """
+    for row in rows:
+        counts = _status_counts(row['scan_result'])
+        cursor.execute("""
+        INSERT IGNORE INTO node_latest_result (
+            cluster_id, node_name, node_task_id, main_task_id, inserted_at,
+            pass_count, fail_count, warn_count, info_count
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (
+            row['cluster_id'], row['node_name'], row['node_task_id'], row['main_task_id'],
+            row['inserted_at'], counts['PASS'], counts['FAIL'], counts['WARN'], counts['INFO']
+        ))
+        if cursor.rowcount == 1:
+            _apply_check_delta(cursor, row['cluster_id'], set(), _check_statuses_from_result(row['scan_result']))
+            continue
+
+        cursor.execute("""
+        SELECT node_task_id, inserted_at
+        FROM node_latest_result
+        WHERE cluster_id = %s AND node_name = %s
+        FOR UPDATE
+        """, (row['cluster_id'], row['node_name']))
+        current = cursor.fetchone()
+        if current['node_task_id'] == row['node_task_id'] or current['inserted_at'] > row['inserted_at']:
+            continue
+
+        _apply_check_delta(
+            cursor, row['cluster_id'],
+            _check_statuses_from_index(cursor, current['node_task_id']),
+            _check_statuses_from_result(row['scan_result'])
+        )
+        cursor.execute("""
+        UPDATE node_latest_result
+        SET node_task_id = %s, main_task_id = %s, inserted_at = %s,
+            pass_count = %s, fail_count = %s, warn_count = %s, info_count = %s
+        WHERE cluster_id = %s AND node_name = %s
+        """, (
+            row['node_task_id'], row['main_task_id'], row['inserted_at'],
+            counts['PASS'], counts['FAIL'], counts['WARN'], counts['INFO'],
+            row['cluster_id'], row['node_name']
+        ))
+
+
+def _load_previous_result(cursor, cluster_id, node_name, main_task_id):
+    """
+    查找节点在其他扫描主任务中最近一次有效的结果（包括已归档的结果），返回 (结果记录, 检查项状态, 状态计数)。
+    状态优先取自 scan_check_results，没有索引记录时读取结果内容，解析失败的原始输出跳过
+    """
+    cursor.execute("""
+    SELECT node_task_id, main_task_id, inserted_at, archived
+    FROM (
+        SELECT node_task_id, main_task_id, inserted_at, 0 AS archived
+        FROM cluster_scan_results
+        WHERE cluster_id = %s AND node_name = %s AND main_task_id != %s
+        UNION ALL
+        SELECT node_task_id, main_task_id, inserted_at, 1 AS archived
+        FROM scan_result_archive_index
+        WHERE cluster_id = %s AND node_name = %s AND main_task_id != %s
+    ) previous
+    ORDER BY inserted_at DESC
+    """, (cluster_id, node_name, main_task_id) * 2)
+    candidates = cursor.fetchall()
+
+    for candidate in candidates:
+        cursor.execute("""
+        SELECT check_id, status
+        FROM scan_check_results
+        WHERE node_task_id = %s
+        """, (candidate['node_task_id'],))
+        check_rows = cursor.fetchall()
+        if check_rows:
+            counts = dict.fromkeys(STATUS_COLUMNS, 0)
+            for row in check_rows:
+                if row['status'] in counts:
+                    counts[row['status']] += 1
+            statuses = {(row['check_id'], row['status']) for row in check_rows if row['status'] in STATUS_COLUMNS}
+            return candidate, statuses, counts
+
+        if candidate['archived']:
+            record = result_archive.load_archived_result(candidate['node_task_id'])
+            scan_result = record['scan_result'] if record else {}
+        else:
+            cursor.execute("""
+            SELECT scan_result
+            FROM cluster_scan_results
+            WHERE node_task_id = %s
+            """, (candidate['node_task_id'],))
+            row = cursor.fetchone()
+            scan_result = load_scan_result(row['scan_result'], cursor) if row else {}
+        if 'Controls' in scan_result:
+            return candidate, _check_statuses_from_result(scan_result), _status_counts(scan_result)
+
+    return None, set(), None
+
+
+def remove_scan_task_from_rollup(cluster_id, main_task_id):
+    """
+    删除扫描主任务前调用：最新结果来自该主任务的节点回退到之前的结果（包括已归档的结果），
+    没有更早结果的节点从汇总中移除
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+        SELECT node_name, node_task_id
+        FROM node_latest_result
+        WHERE cluster_id = %s AND main_task_id = %s
+        FOR UPDATE
+        """, (cluster_id, main_task_id))
+        affected = cursor.fetchall()
+
+        for node in affected:
+            removed = _check_statuses_from_index(cursor, node['node_task_id'])
+            previous, added, counts = _load_previous_result(cursor, cluster_id, node['node_name'], main_task_id)
+
+            if previous:
+                _apply_check_delta(cursor, cluster_id, removed, added)
+                cursor.execute("""
+                UPDATE node_latest_result
+                SET node_task_id = %s, main_task_id = %s, inserted_at = %s,
+                    pass_count = %s, fail_count = %s, warn_count = %s, info_count = %s
+                WHERE cluster_id = %s AND node_name = %s
+                """, (
+                    previous['node_task_id'], previous['main_task_id'], previous['inserted_at'],
+                    counts['PASS'], counts['FAIL'], counts['WARN'], counts['INFO'],
+                    cluster_id, node['node_name']
+                ))
+            else:
+                _apply_check_delta(cursor, cluster_id, removed, set())
+                cursor.execute("""
+                DELETE FROM node_latest_result
+                WHERE cluster_id = %s AND node_name = %s
+                """, (cluster_id, node['node_name']))
+        conn.commit()
+
+
+def get_top_failing_checks(limit=20, business_name=None, cluster_id=None):
+    """失败节点数最多的检查项"""
+    conditions = ["r.fail_nodes > 0"]
+    params = []
+    if business_name:
+        conditions.append("c.business_name = %s")
+        params.append(business_name)
+    if cluster_id:
+        conditions.append("r.cluster_id = %s")
+        params.append(cluster_id)
+
+    with get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"""
+        SELECT r.check_id,
+               SUM(r.fail_nodes) AS fail_nodes,
+               SUM(r.pass_nodes + r.fail_nodes + r.warn_nodes + r.info_nodes) AS total_nodes,
+               COUNT(DISTINCT CASE WHEN r.fail_nodes > 0 THEN r.cluster_id END) AS failing_clusters
+        FROM check_status_rollup r
+        JOIN cluster_info c ON c.cluster_id = r.cluster_id
+        WHERE {' AND '.join(conditions)}
+        GROUP BY r.check_id
+        ORDER BY fail_nodes DESC, r.check_id
+        LIMIT %s
+        """, params + [limit])
+        return [{
+            'checkId': row['check_id'],
+            'failNodes': int(row['fail_nodes']),
+            'totalNodes': int(row['total_nodes']),
+            'failingClusters': int(row['failing_clusters'])
+        } for row in cursor.fetchall()]
+
+
+def get_compliance_by_business():
+    """按业务统计合规率：各节点最新结果中 PASS 检查项占 PASS/FAIL/WARN 总数的比例"""
+    with get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+        SELECT c.business_name,
+               COUNT(DISTINCT n.cluster_id) AS cluster_count,
+               COUNT(*) AS node_count,
+               SUM(n.pass_count) AS pass_count,
+               SUM(n.fail_count) AS fail_count,
+               SUM(n.warn_count) AS warn_count
+        FROM node_latest_result n
+        JOIN cluster_info c ON c.cluster_id = n.cluster_id
+        GROUP BY c.business_name
+        ORDER BY c.business_name
+        """)
+        rows = cursor.fetchall()
+
+    result = []
+    for row in rows:
+        pass_count = int(row['pass_count'] or 0)
+        evaluated = pass_count + int(row['fail_count'] or 0) + int(row['warn_count'] or 0)
+        result.append({
+            'businessName': row['business_name'],
+            'clusterCount': row['cluster_count'],
+            'nodeCount': row['node_count'],
+            'passCount': pass_count,
+            'failCount': int(row['fail_count'] or 0),
+            'warnCount': int(row['warn_count'] or 0),
+            'compliance': round(pass_count / evaluated * 100, 2) if evaluated else None
+        })
+    return result
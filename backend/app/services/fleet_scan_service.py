@@ -0,0 +1,217 @@
+from app.models.database import get_connection
+from config import Config
+import threading
+import json
+import time
+import uuid
+
+
+class FleetScanService:
+    """
+    批量扫描：按条件选择多个集群，各集群的子任务先记录为等待状态，由后台放行线程按数据库中
+    子任务的实际扫描状态放行，同时扫描的集群数量不超过上限，进程重启后等待中的子任务继续放行
+    """
+
+    LOCK_NAME = 'kube_bench_fleet_admission'
+
+    def __init__(self, scan_service):
+        self.scan_service = scan_service
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            print("Fleet scan admission started")
+
+    def _run(self):
+        while True:
+            try:
+                self.admit_pending_clusters()
+            except Exception as e:
+                print(f"Error in fleet scan admission: {str(e)}")
+            self._wakeup.wait(Config.FLEET_SCAN_ADMISSION_INTERVAL)
+            self._wakeup.clear()
+
+    def _select_clusters(self, cursor, filters):
+        query = "SELECT cluster_id, cluster_name FROM cluster_info"
+        conditions = []
+        params = []
+        if filters.get('business_name'):
+            conditions.append("business_name = %s")
+            params.append(filters['business_name'])
+        if filters.get('cluster_owner'):
+            conditions.append("cluster_owner = %s")
+            params.append(filters['cluster_owner'])
+        if filters.get('cluster_ids'):
+            conditions.append(f"cluster_id IN ({', '.join(['%s'] * len(filters['cluster_ids']))})")
+            params.extend(filters['cluster_ids'])
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+    def create_fleet_scan(self, filters, scan_options):
+        """记录批量扫描及其包含的集群后立即返回，各集群的扫描任务由后台放行线程创建"""
+        fleet_scan_id = str(uuid.uuid4())
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            clusters = self._select_clusters(cursor, filters)
+            if not clusters:
+                raise Exception("No clusters matched the filter")
+
+            cursor.execute("""
+            INSERT INTO fleet_scans (fleet_scan_id, filters, scan_options, cluster_count)
+            VALUES (%s, %s, %s, %s)
+            """, (fleet_scan_id, json.dumps(filters), json.dumps(scan_options), len(clusters)))
+            cursor.executemany("""
+            INSERT INTO fleet_scan_clusters (fleet_scan_id, cluster_id, main_task_id, status)
+            VALUES (%s, %s, %s, 'pending')
+            """, [(fleet_scan_id, cluster['cluster_id'], str(uuid.uuid4())) for cluster in clusters])
+            conn.commit()
+
+        self._wakeup.set()
+        print(f"批量扫描 {fleet_scan_id} 已创建，共 {len(clusters)} 个集群")
+        return {
+            'fleet_scan_id': fleet_scan_id,
+            'cluster_count': len(clusters)
+        }
+
+    def admit_pending_clusters(self):
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            # 多个进程都运行放行线程，通过数据库命名锁保证同一时间只有一个进程放行
+            cursor.execute("SELECT GET_LOCK(%s, 0) AS locked", (self.LOCK_NAME,))
+            if not cursor.fetchone()['locked']:
+                return
+            try:
+                self._finish_completed_clusters(conn, cursor)
+                self._admit_pending_clusters(conn, cursor)
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (self.LOCK_NAME,))
+                cursor.fetchall()
+
+    def _finish_completed_clusters(self, conn, cursor):
+        """扫描中的子任务在其所有节点任务都到达终态后标记为完成，释放并发名额"""
+        cursor.execute("""
+        UPDATE fleet_scan_clusters f
+        SET f.status = 'done', f.finished_at = NOW()
+        WHERE f.status = 'running'
+          AND NOT EXISTS (
+              SELECT 1
+              FROM cluster_node_tasks t
+              WHERE t.cluster_id = f.cluster_id
+                AND t.main_task_id = f.main_task_id
+                AND t.scan_status IN ('queued', 'pending', 'running')
+          )
+        """)
+        conn.commit()
+
+    def _admit_pending_clusters(self, conn, cursor):
+        cursor.execute("SELECT COUNT(*) AS running FROM fleet_scan_clusters WHERE status = 'running'")
+        available = Config.FLEET_SCAN_MAX_CONCURRENT_CLUSTERS - cursor.fetchone()['running']
+        if available <= 0:
+            return
+
+        cursor.execute("""
+        SELECT f.fleet_scan_id, f.cluster_id, f.main_task_id, s.scan_options
+        FROM fleet_scan_clusters f
+        JOIN fleet_scans s ON s.fleet_scan_id = f.fleet_scan_id
+        WHERE f.status = 'pending'
+        ORDER BY s.created_at, f.cluster_id
+        LIMIT %s
+        """, (available,))
+        children = cursor.fetchall()
+
+        for child in children:
+            # 集群内的 Job 并发仍由各集群的放行上限控制
+            try:
+                self.scan_service.create_scan_task(
+                    child['cluster_id'], child['main_task_id'], **json.loads(child['scan_options'])
+                )
+                status, error = 'running', None
+            except Exception as e:
+                print(f"批量扫描 {child['fleet_scan_id']} 创建集群 {child['cluster_id']} 的扫描任务失败: {str(e)}")
+                status, error = 'failed', str(e)
+
+            cursor.execute("""
+            UPDATE fleet_scan_clusters
+            SET status = %s, error = %s, admitted_at = NOW()
+            WHERE fleet_scan_id = %s AND cluster_id = %s
+            """, (status, error, child['fleet_scan_id'], child['cluster_id']))
+            conn.commit()
+
+    def get_fleet_scan(self, fleet_scan_id):
+        """汇总批量扫描下各集群子任务的进度"""
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT fleet_scan_id, filters, scan_options, cluster_count, created_at
+            FROM fleet_scans
+            WHERE fleet_scan_id = %s
+            """, (fleet_scan_id,))
+            fleet_scan = cursor.fetchone()
+            if not fleet_scan:
+                return None
+
+            cursor.execute("""
+            SELECT f.cluster_id, c.cluster_name, f.main_task_id, f.status, f.error,
+                   f.admitted_at, f.finished_at,
+                   COUNT(t.node_task_id) AS total,
+                   SUM(CASE WHEN t.scan_status = 'done' THEN 1 ELSE 0 END) AS done,
+                   SUM(CASE WHEN t.scan_status = 'failed' THEN 1 ELSE 0 END) AS failed
+            FROM fleet_scan_clusters f
+            JOIN cluster_info c ON c.cluster_id = f.cluster_id
+            LEFT JOIN cluster_node_tasks t
+                ON t.cluster_id = f.cluster_id AND t.main_task_id = f.main_task_id
+            WHERE f.fleet_scan_id = %s
+            GROUP BY f.cluster_id, c.cluster_name, f.main_task_id, f.status, f.error,
+                     f.admitted_at, f.finished_at
+            ORDER BY c.cluster_name
+            """, (fleet_scan_id,))
+            rows = cursor.fetchall()
+
+        clusters = []
+        totals = {'total': 0, 'done': 0, 'failed': 0}
+        clusters_completed = 0
+        for row in rows:
+            total = int(row['total'] or 0)
+            done = int(row['done'] or 0)
+            failed = int(row['failed'] or 0)
+            completed = row['status'] in ('done', 'failed')
+            clusters_completed += 1 if completed else 0
+            totals['total'] += total
+            totals['done'] += done
+            totals['failed'] += failed
+            clusters.append({
+                'clusterId': row['cluster_id'],
+                'clusterName': row['cluster_name'],
+                'mainTaskId': row['main_task_id'],
+                'status': row['status'],
+                'error': row['error'],
+                'admittedAt': row['admitted_at'].isoformat() if row['admitted_at'] else None,
+                'finishedAt': row['finished_at'].isoformat() if row['finished_at'] else None,
+                'totalNodes': total,
+                'doneNodes': done,
+                'failedNodes': failed,
+                'completed': completed
+            })
+
+        return {
+            'fleetScanId': fleet_scan['fleet_scan_id'],
+            'filters': json.loads(fleet_scan['filters']),
+            'scanOptions': json.loads(fleet_scan['scan_options']),
+            'clusterCount': fleet_scan['cluster_count'],
+            'clustersCompleted': clusters_completed,
+            'allCompleted': clusters_completed == len(clusters),
+            'totalNodes': totals['total'],
+            'doneNodes': totals['done'],
+            'failedNodes': totals['failed'],
+            'progress': round((totals['done'] + totals['failed']) / totals['total'] * 100, 2) if totals['total'] else 0,
+            'createdAt': fleet_scan['created_at'].isoformat() if fleet_scan['created_at'] else None,
+            'clusters': clusters
+        }
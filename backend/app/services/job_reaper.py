@@ -0,0 +1,155 @@
+from app.models.database import get_connection
+from app.utils.kube_client import build_api_client
+from app.services.cluster_health import cluster_health
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+from config import Config
+import concurrent.futures
+import threading
+import time
+
+
+def _delete_job(batch_v1, job_name):
+    """删除单个 Job，已删除（或已不存在）时返回 True"""
+    try:
+        batch_v1.delete_namespaced_job(
+            name=job_name,
+            namespace='default',
+            body=client.V1DeleteOptions(propagation_policy='Background')
+        )
+        return True
+    except ApiException as e:
+        if e.status == 404:
+            return True
+        print(f"Error deleting job {job_name}: {str(e)}")
+    except Exception as e:
+        print(f"Error deleting job {job_name}: {str(e)}")
+    return False
+
+
+def delete_jobs_rate_limited(batch_v1, job_names, qps=None, max_workers=1):
+    """
+    按限速删除 Job，返回已删除（或已不存在）的 Job 名称。
+    max_workers 大于 1 时按限速提交、并发执行，单个请求较慢时不会拖慢整体速度
+    """
+    qps = qps or Config.REAPER_DELETE_QPS
+    if max_workers <= 1:
+        deleted = []
+        for job_name in job_names:
+            if _delete_job(batch_v1, job_name):
+                deleted.append(job_name)
+            time.sleep(1.0 / qps)
+        return deleted
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for job_name in job_names:
+            futures[executor.submit(_delete_job, batch_v1, job_name)] = job_name
+            time.sleep(1.0 / qps)
+        return [futures[future] for future in concurrent.futures.as_completed(futures) if future.result()]
+
+
+class JobReaper:
+    """后台回收结果已入库的 kube-bench Job 及其 Pod，按集群分批并限速删除"""
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            print("Job reaper started")
+
+    def _run(self):
+        while True:
+            try:
+                self.reap_once()
+            except Exception as e:
+                print(f"Error in job reaper: {str(e)}")
+            time.sleep(Config.REAPER_INTERVAL)
+
+    def reap_once(self):
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT DISTINCT cluster_id
+            FROM cluster_node_tasks
+            WHERE job_reaped = 0 AND scan_executor = 'job' AND kube_bench_job != ''
+            AND scan_status IN ('done', 'failed')
+            """)
+            cluster_ids = [row['cluster_id'] for row in cursor.fetchall()]
+
+        for cluster_id in cluster_ids:
+            try:
+                self.reap_cluster(cluster_id)
+            except Exception as e:
+                print(f"Error reaping jobs for cluster {cluster_id}: {str(e)}")
+
+    def _get_reapable_jobs(self, cluster_id):
+        """结果已入库或已失败的任务可以回收；已完成但结果缺失的任务超过 TTL 后同样回收"""
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT t.node_task_id, t.kube_bench_job
+            FROM cluster_node_tasks t
+            LEFT JOIN cluster_scan_results r ON r.node_task_id = t.node_task_id
+            WHERE t.cluster_id = %s AND t.job_reaped = 0
+            AND t.scan_executor = 'job' AND t.kube_bench_job != ''
+            AND (
+                t.scan_status = 'failed'
+                OR (t.scan_status = 'done' AND (
+                    r.node_task_id IS NOT NULL
+                    OR t.task_created_at < NOW() - INTERVAL %s SECOND
+                ))
+            )
+            LIMIT %s
+            """, (cluster_id, Config.JOB_TTL_SECONDS_AFTER_FINISHED, Config.REAPER_BATCH_SIZE))
+            return cursor.fetchall()
+
+    def reap_cluster(self, cluster_id):
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT api_server, access_token
+            FROM cluster_info
+            WHERE cluster_id = %s
+            """, (cluster_id,))
+            cluster_config = cursor.fetchone()
+        if not cluster_config:
+            return
+
+        api_client = build_api_client(cluster_config)
+        # 集群 API Server 不可达时跳过，等待熔断器恢复
+        if not cluster_health.available(cluster_id, api_client):
+            return
+
+        batch_v1 = client.BatchV1Api(api_client)
+        while True:
+            jobs = self._get_reapable_jobs(cluster_id)
+            if not jobs:
+                break
+
+            deleted = set(delete_jobs_rate_limited(batch_v1, [job['kube_bench_job'] for job in jobs]))
+            reaped_task_ids = [job['node_task_id'] for job in jobs if job['kube_bench_job'] in deleted]
+            if reaped_task_ids:
+                with get_connection() as conn:
+                    cursor = conn.cursor()
+                    placeholders = ', '.join(['%s'] * len(reaped_task_ids))
+                    cursor.execute(f"""
+                    UPDATE cluster_node_tasks
+                    SET job_reaped = 1
+                    WHERE node_task_id IN ({placeholders})
+                    """, reaped_task_ids)
+                    conn.commit()
+                print(f"集群 {cluster_id} 回收 {len(reaped_task_ids)} 个 kube-bench Job")
+
+            # 本批存在删除失败时等待下一轮，避免对异常的 API Server 持续重试
+            if len(reaped_task_ids) < len(jobs):
+                break
+
+
+job_reaper = JobReaper()
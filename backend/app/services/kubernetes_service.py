@@ -3,8 +3,7 @@ from kubernetes import client
 import uuid
 import json
 import time
-from datetime import datetime
-import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -19,8 +18,28 @@ from reportlab.graphics.charts.piecharts import Pie
 from reportlab.graphics.charts.legends import Legend
 import concurrent.futures
 import threading
-from config import KUBE_BENCH_MASTER_JOB, KUBE_BENCH_WORKER_JOB
+from config import Config, KUBE_BENCH_MASTER_JOB, KUBE_BENCH_WORKER_JOB
 import yaml
+from app.utils.scan_result import merge_partial_result, filter_scan_result
+from app.utils.kube_bench_output import parse_kube_bench_output
+from app.utils.kubelet_checks import evaluate_kubelet_config
+from app.utils.kube_client import build_api_client
+from app.services.node_inventory import node_inventory
+from app.services.cluster_health import cluster_health, ClusterUnreachableError, is_connectivity_error
+from app.services.scan_timing import record_scan_duration, next_poll_interval, estimate_eta
+from app.services.deletion_worker import deletion_worker, deletion_pending
+from app.services.result_archive import result_archive
+from app.services.result_ingest import on_results_stored
+from app.services import check_search  # 注册全文索引的入库处理函数
+from app.services import fleet_rollup  # 注册汇总统计的入库处理函数
+from app.services import finding_matrix  # 注册检查项×节点矩阵的入库处理函数
+from app.services import drift_detection  # 注册扫描差异的入库处理函数
+from app.services import compliance_trend  # 注册合规趋势的入库处理函数
+from app.services.check_catalog import dehydrate_scan_result, rehydrate_scan_results, load_scan_result
+
+# 各节点角色可运行的 kube-bench targets，与 Job 模板中的默认值一致
+MASTER_TARGETS = ['master', 'node', 'controlplane', 'etcd', 'policies']
+WORKER_TARGETS = ['node', 'policies']
 
 class KubernetesService:
     def __init__(self):
@@ -66,14 +85,32 @@ class KubernetesService:
         with get_connection() as conn:
             cursor = conn.cursor(dictionary=True)
             query = """
-            SELECT api_server, access_token, cluster_name
+            SELECT api_server, access_token, cluster_name, api_status, api_status_changed_at
             FROM cluster_info
             WHERE cluster_id = %s
             """
             cursor.execute(query, (cluster_id,))
             return cursor.fetchone()
 
-    def create_scan_task(self, cluster_id, main_task_id):
+    def _cluster_available(self, cluster_id):
+        """熔断器断开期间跳过本轮同步，退避时间到达后用一次轻量请求探测是否恢复"""
+        if cluster_health.is_closed(cluster_id):
+            return True
+        cluster_config = self.get_cluster_config(cluster_id)
+        if not cluster_config:
+            return False
+        return cluster_health.available(cluster_id, build_api_client(cluster_config))
+
+    def _pending_since(self, task, cluster_config):
+        """pending 超时的计时起点：任务放行时间，API Server 中途恢复时从恢复时间重新计时"""
+        pending_since = task['admitted_at'] or task['task_created_at']
+        recovered_at = cluster_config.get('api_status_changed_at')
+        if cluster_config.get('api_status') == 'healthy' and recovered_at and recovered_at > pending_since:
+            return recovered_at
+        return pending_since
+
+    def create_scan_task(self, cluster_id, main_task_id, scan_mode='full', max_result_age=None,
+                         executor='job', warmup=False, targets=None, checks=None):
         try:
             # 获取集群配置
             cluster_config = self.get_cluster_config(cluster_id)
@@ -81,43 +118,75 @@ class KubernetesService:
                 raise Exception("Cluster not found")
 
             # 配置 Kubernetes 客户端
-            configuration = client.Configuration()
-            configuration.host = cluster_config['api_server']
-            configuration.verify_ssl = False
-            configuration.api_key = {"authorization": "Bearer " + cluster_config['access_token']}
-            api_client = client.ApiClient(configuration)
+            api_client = build_api_client(cluster_config)
             
-            # 获取所有节点
+            # 从节点清单获取所有节点，不再每次扫描都列出完整的节点对象
             v1 = client.CoreV1Api(api_client)
-            nodes = v1.list_node()
-
-            # 使用线程池并发创建任务
-            successful_tasks = []
-            with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-                future_to_node = {
-                    executor.submit(
-                        self._create_single_node_task,
-                        cluster_id,
-                        cluster_config,
-                        node,
-                        main_task_id,
-                        v1
-                    ): node 
-                    for node in nodes.items
-                }
-                
-                for future in concurrent.futures.as_completed(future_to_node):
-                    node = future_to_node[future]
+            node_infos = node_inventory.get_nodes(cluster_id)
+
+            # 部分扫描：只保留至少有一个可运行 target 的节点
+            if targets or checks:
+                for node_info in node_infos:
+                    role_targets = MASTER_TARGETS if node_info['node_role'] == 'master' else WORKER_TARGETS
+                    node_targets = [target for target in role_targets if not targets or target in targets]
+                    node_info['scan_targets'] = ','.join(node_targets)
+                    node_info['scan_checks'] = ','.join(checks) if checks else None
+                node_infos = [node_info for node_info in node_infos if node_info['scan_targets']]
+
+            # 增量模式：指纹未变化且结果未过期的节点沿用上次结果
+            carried_tasks = []
+            if scan_mode == 'incremental':
+                if max_result_age is None:
+                    max_result_age = Config.INCREMENTAL_MAX_RESULT_AGE
+                node_infos, carried_tasks = self._carry_forward_unchanged_nodes(
+                    cluster_id, cluster_config, node_infos, main_task_id, max_result_age
+                )
+                print(f"增量扫描: {len(carried_tasks)} 个节点沿用上次结果, {len(node_infos)} 个节点需要扫描")
+
+            # 抽样模式：每个节点池只扫描代表节点，其余节点沿用代表节点的结果
+            sampled_nodes = []
+            if scan_mode == 'sample':
+                node_infos, sampled_nodes = self._select_pool_representatives(cluster_id, node_infos)
+                print(f"抽样扫描: {len(node_infos)} 个代表节点需要扫描, {len(sampled_nodes)} 个节点沿用代表节点结果")
+
+            # 快速扫描：通过 API Server 节点代理读取 kubelet 配置评估可判定的检查项，
+            # 其余节点回退为完整 Job 扫描
+            fast_tasks = []
+            if scan_mode == 'fast':
+                node_infos, fast_tasks = self._run_fast_scan(v1, cluster_id, cluster_config, node_infos, main_task_id)
+                print(f"快速扫描: {len(fast_tasks)} 个节点通过 kubelet 配置完成, {len(node_infos)} 个节点回退为完整扫描")
+
+            if executor == 'daemonset':
+                # DaemonSet 模式：每个节点角色一个 DaemonSet，不经过分批放行
+                successful_tasks = self._create_daemonset_scan(
+                    v1, cluster_id, cluster_config, node_infos, main_task_id
+                )
+            else:
+                # 所有节点任务先进入排队状态，由调度按并发上限分批放行
+                successful_tasks = self._queue_node_tasks(
+                    cluster_id, cluster_config, node_infos, main_task_id, image_ready=not warmup
+                )
+                if warmup and successful_tasks:
+                    # 预热阶段：镜像在节点上就绪后，该节点的任务才会被放行
                     try:
-                        task_result = future.result()
-                        if task_result:
-                            successful_tasks.append(task_result)
+                        self._start_image_warmup(v1, main_task_id, [task['node_name'] for task in successful_tasks])
                     except Exception as e:
-                        print(f"创建节点 {node.metadata.name} 的扫描任务失败: {str(e)}")
+                        print(f"创建镜像预拉取 DaemonSet 失败，跳过预热: {str(e)}")
+                        self._skip_image_warmup(main_task_id)
 
-            if not successful_tasks:
+            if not successful_tasks and not carried_tasks and not fast_tasks:
                 raise Exception("Failed to create any scan tasks")
 
+            if executor != 'daemonset':
+                # 放行第一批任务，后续批次由监控线程在前一批完成后放行
+                self.admit_queued_tasks(cluster_id, main_task_id, v1)
+
+            sampled_tasks = []
+            if sampled_nodes:
+                sampled_tasks = self._create_sampled_task_records(
+                    cluster_id, cluster_config, sampled_nodes, successful_tasks, main_task_id
+                )
+
             # 初始化监控
             self.stop_monitoring[main_task_id] = False
             monitor_thread = threading.Thread(
@@ -130,87 +199,755 @@ class KubernetesService:
 
             return {
                 'main_task_id': main_task_id,
-                'tasks': successful_tasks
+                'tasks': successful_tasks + carried_tasks + sampled_tasks + fast_tasks
             }
 
         except Exception as e:
             raise Exception(f"Failed to create scan task: {str(e)}")
 
-    def _create_single_node_task(self, cluster_id, cluster_config, node, main_task_id, v1):
-        """为单个节点创建扫描任务"""
-        try:
-            node_name = node.metadata.name
-            node_ip = node.status.addresses[0].address
-            node_role = "master" if any(label in node.metadata.labels for label in ["node-role.kubernetes.io/master", "node-role.kubernetes.io/control-plane"]) else "worker"
+    def get_latest_scanned_results(self, cluster_id):
+        """获取集群内每个节点最近一次实际扫描（非沿用）的结果信息"""
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            query = """
+            SELECT t.node_name, t.node_task_id, t.node_fingerprint, r.inserted_at
+            FROM cluster_node_tasks t
+            JOIN cluster_scan_results r ON r.node_task_id = t.node_task_id
+            JOIN (
+                SELECT t2.node_name, MAX(r2.inserted_at) AS inserted_at
+                FROM cluster_node_tasks t2
+                JOIN cluster_scan_results r2 ON r2.node_task_id = t2.node_task_id
+                WHERE t2.cluster_id = %s AND t2.scan_source = 'scanned'
+                GROUP BY t2.node_name
+            ) latest ON latest.node_name = t.node_name AND latest.inserted_at = r.inserted_at
+            WHERE t.cluster_id = %s AND t.scan_source = 'scanned'
+            """
+            cursor.execute(query, (cluster_id, cluster_id))
+            return {row['node_name']: row for row in cursor.fetchall()}
 
-            node_task_id = str(uuid.uuid4())
-            job_name = f'kube-bench-{node_name}-{node_task_id[:8]}'
-            
-            
-            # 创建 kube-bench Job
-            batch_v1 = client.BatchV1Api(v1.api_client)
-            job_manifest = self.create_kube_bench_job(
-                node_role,
-                node_name,
-                job_name
-            )
-            batch_v1.create_namespaced_job(
-                body=job_manifest,
-                namespace='default'
-            )
+    def _carry_forward_unchanged_nodes(self, cluster_id, cluster_config, node_infos, main_task_id, max_result_age):
+        """沿用指纹未变化节点的上次结果，返回仍需扫描的节点和沿用的任务"""
+        latest_results = self.get_latest_scanned_results(cluster_id)
+        current_time = datetime.now()
 
-            # 等待并获取 Pod 名称
-            time.sleep(2)
-            pod_name = self.get_pod_name_by_job(v1, job_name)
-            
-            if not pod_name:
-                raise Exception(f"Failed to get pod name for job {job_name}")
-
-            # 创建数据库记录
-            with self._lock:
-                self.create_node_task_record(
-                    cluster_id,
-                    cluster_config['cluster_name'],
-                    node_name,
-                    node_role,
-                    node_ip,
-                    main_task_id,
-                    node_task_id,
-                    pod_name,
-                    job_name
+        nodes_to_scan = []
+        carried_tasks = []
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            for node_info in node_infos:
+                fingerprint = node_info['node_fingerprint']
+                previous = latest_results.get(node_info['node_name'])
+
+                if (not previous
+                        or previous['node_fingerprint'] != fingerprint
+                        or (current_time - previous['inserted_at']).total_seconds() > max_result_age):
+                    nodes_to_scan.append(node_info)
+                    continue
+
+                node_task_id = str(uuid.uuid4())
+                cursor.execute("""
+                INSERT INTO cluster_node_tasks (
+                    cluster_id, cluster_name, node_name, node_role, node_ip,
+                    scan_status, main_task_id, node_task_id, scanner, kube_bench_job,
+                    node_fingerprint, node_pool, scan_source, source_node_task_id
+                ) VALUES (%s, %s, %s, %s, %s, 'done', %s, %s, '', '', %s, %s, 'carried', %s)
+                """, (
+                    cluster_id, cluster_config['cluster_name'], node_info['node_name'],
+                    node_info['node_role'], node_info['node_ip'], main_task_id, node_task_id,
+                    fingerprint, node_info['node_pool'], previous['node_task_id']
+                ))
+                cursor.execute("""
+                INSERT INTO cluster_scan_results (
+                    cluster_id, cluster_name, node_name, node_ip,
+                    scan_result, main_task_id, node_task_id
                 )
+                SELECT cluster_id, cluster_name, node_name, %s, scan_result, %s, %s
+                FROM cluster_scan_results
+                WHERE node_task_id = %s
+                """, (node_info['node_ip'], main_task_id, node_task_id, previous['node_task_id']))
 
-            return {
+                on_results_stored(conn, [node_task_id])
+
+                carried_tasks.append({
+                    'node_name': node_info['node_name'],
+                    'node_task_id': node_task_id,
+                    'node_ip': node_info['node_ip'],
+                    'node_role': node_info['node_role'],
+                    'carried_from': previous['node_task_id']
+                })
+            conn.commit()
+
+        return nodes_to_scan, carried_tasks
+
+    def _read_kubelet_config(self, v1, node_name):
+        """通过 API Server 的节点代理读取 kubelet 运行时配置"""
+        response = v1.connect_get_node_proxy_with_path(
+            name=node_name,
+            path='configz',
+            _preload_content=False
+        )
+        return json.loads(response.data.decode('utf-8'))['kubeletconfig']
+
+    def _run_fast_scan(self, v1, cluster_id, cluster_config, node_infos, main_task_id):
+        """
+        快速扫描：并发读取各节点的 kubelet 配置，评估可由配置判定的检查项并合并到该节点上一次的完整结果中。
+        返回需要回退为完整 Job 扫描的节点（无法读取配置或没有历史完整结果）和已完成的快速扫描任务
+        """
+        node_names = [node_info['node_name'] for node_info in node_infos]
+        base_results = {}
+        if node_names:
+            with get_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                placeholders = ', '.join(['%s'] * len(node_names))
+                cursor.execute(f"""
+                SELECT r.node_name, r.scan_result
+                FROM cluster_scan_results r
+                JOIN (
+                    SELECT node_name, MAX(inserted_at) AS inserted_at
+                    FROM cluster_scan_results
+                    WHERE cluster_id = %s AND node_name IN ({placeholders})
+                    GROUP BY node_name
+                ) latest ON latest.node_name = r.node_name AND latest.inserted_at = r.inserted_at
+                WHERE r.cluster_id = %s
+                """, [cluster_id] + node_names + [cluster_id])
+                for row in cursor.fetchall():
+                    base_result = load_scan_result(row['scan_result'], cursor)
+                    if 'Controls' in base_result:
+                        base_results[row['node_name']] = base_result
+
+        # 只对有历史完整结果的节点读取配置，读取过程不占用数据库连接
+        kubelet_configs = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=Config.FAST_SCAN_MAX_WORKERS) as executor:
+            future_to_node = {
+                executor.submit(self._read_kubelet_config, v1, node_name): node_name
+                for node_name in node_names if node_name in base_results
+            }
+            for future in concurrent.futures.as_completed(future_to_node):
+                node_name = future_to_node[future]
+                try:
+                    kubelet_configs[node_name] = future.result()
+                except Exception as e:
+                    print(f"读取节点 {node_name} 的 kubelet 配置失败，回退为完整扫描: {str(e)}")
+
+        fallback_nodes = []
+        fast_tasks = []
+        for node_info in node_infos:
+            node_name = node_info['node_name']
+            if node_name not in kubelet_configs:
+                fallback_nodes.append(node_info)
+                continue
+
+            partial_result, evaluated = evaluate_kubelet_config(kubelet_configs[node_name], base_results[node_name])
+            if not evaluated:
+                fallback_nodes.append(node_info)
+                continue
+
+            node_task_id = str(uuid.uuid4())
+            with get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                INSERT INTO cluster_node_tasks (
+                    cluster_id, cluster_name, node_name, node_role, node_ip,
+                    scan_status, main_task_id, node_task_id, scanner, kube_bench_job,
+                    node_fingerprint, node_pool, scan_executor, admitted_at, scan_targets, scan_checks
+                ) VALUES (%s, %s, %s, %s, %s, 'done', %s, %s, '', '', %s, %s, 'configz', NOW(), 'node', %s)
+                """, (
+                    cluster_id, cluster_config['cluster_name'], node_name, node_info['node_role'],
+                    node_info['node_ip'], main_task_id, node_task_id, node_info['node_fingerprint'],
+                    node_info['node_pool'], ','.join(evaluated)
+                ))
+                conn.commit()
+            self.store_scan_result(cluster_id, main_task_id, node_task_id, json.dumps(partial_result))
+
+            fast_tasks.append({
                 'node_name': node_name,
                 'node_task_id': node_task_id,
-                'node_ip': node_ip,
-                'node_role': node_role
-            }
+                'node_ip': node_info['node_ip'],
+                'node_role': node_info['node_role'],
+                'evaluated_checks': evaluated
+            })
 
-        except Exception as e:
-            print(f"Error creating task for node {node.metadata.name}: {str(e)}")
-            return None
+        return fallback_nodes, fast_tasks
 
-    def create_node_task_record(self, cluster_id, cluster_name, node_name, 
-                              node_role, node_ip, main_task_id, node_task_id, pod_name, job_name):
+    def _select_pool_representatives(self, cluster_id, node_infos):
+        """
+        按节点池挑选代表节点。优先选择最久未实际扫描的节点，使每次抽样轮换覆盖池内节点；
+        超过 SAMPLE_FULL_COVERAGE_AGE 未实际扫描的节点无论是否为代表都会被扫描。
+        返回需要扫描的节点和沿用结果的节点
+        """
+        latest_results = self.get_latest_scanned_results(cluster_id)
+        current_time = datetime.now()
+
+        pools = {}
+        for node_info in node_infos:
+            pools.setdefault(node_info['node_pool'], []).append(node_info)
+
+        nodes_to_scan = []
+        sampled_nodes = []
+        for pool_nodes in pools.values():
+            # 从未扫描过的节点排在最前，其次按上次扫描时间升序
+            pool_nodes.sort(key=lambda n: (
+                n['node_name'] in latest_results,
+                latest_results[n['node_name']]['inserted_at'] if n['node_name'] in latest_results else datetime.min
+            ))
+            for index, node_info in enumerate(pool_nodes):
+                previous = latest_results.get(node_info['node_name'])
+                stale = (not previous or
+                         (current_time - previous['inserted_at']).total_seconds() > Config.SAMPLE_FULL_COVERAGE_AGE)
+                if index < Config.SAMPLE_REPRESENTATIVES_PER_POOL or stale:
+                    nodes_to_scan.append(node_info)
+                else:
+                    sampled_nodes.append(node_info)
+
+        return nodes_to_scan, sampled_nodes
+
+    def _create_sampled_task_records(self, cluster_id, cluster_config, sampled_nodes, scanned_tasks, main_task_id):
+        """为沿用代表节点结果的节点创建任务记录，并记录结果来源"""
+        representatives = {}
+        for task in scanned_tasks:
+            representatives.setdefault(task['node_pool'], []).append(task['node_task_id'])
+
+        sampled_tasks = []
         with get_connection() as conn:
             cursor = conn.cursor()
-            query = """
-            INSERT INTO cluster_node_tasks (
-                cluster_id, cluster_name, node_name, node_role, node_ip,
-                scan_status, main_task_id, node_task_id, scanner, kube_bench_job
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            values = (
-                cluster_id, cluster_name, node_name, node_role, node_ip,
-                'pending', main_task_id, node_task_id, pod_name, job_name
+            for index, node_info in enumerate(sampled_nodes):
+                pool_representatives = representatives.get(node_info['node_pool'])
+                node_task_id = str(uuid.uuid4())
+                # 代表节点的任务全部创建失败时，该节点同样标记为失败
+                source_node_task_id = (
+                    pool_representatives[index % len(pool_representatives)] if pool_representatives else None
+                )
+                cursor.execute("""
+                INSERT INTO cluster_node_tasks (
+                    cluster_id, cluster_name, node_name, node_role, node_ip,
+                    scan_status, main_task_id, node_task_id, scanner, kube_bench_job,
+                    node_fingerprint, node_pool, scan_source, source_node_task_id
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, '', '', %s, %s, 'sampled', %s)
+                """, (
+                    cluster_id, cluster_config['cluster_name'], node_info['node_name'],
+                    node_info['node_role'], node_info['node_ip'],
+                    'pending' if source_node_task_id else 'failed',
+                    main_task_id, node_task_id, node_info['node_fingerprint'],
+                    node_info['node_pool'], source_node_task_id
+                ))
+                sampled_tasks.append({
+                    'node_name': node_info['node_name'],
+                    'node_task_id': node_task_id,
+                    'node_ip': node_info['node_ip'],
+                    'node_role': node_info['node_role'],
+                    'sampled_from': source_node_task_id
+                })
+            conn.commit()
+
+        return sampled_tasks
+
+    def _attribute_sampled_results(self, conn, cursor, node_task_id):
+        """将代表节点的扫描结果归属到沿用其结果的节点"""
+        cursor.execute("""
+        SELECT node_task_id
+        FROM cluster_node_tasks
+        WHERE source_node_task_id = %s AND scan_source = 'sampled' AND scan_status = 'pending'
+        """, (node_task_id,))
+        sampled_task_ids = [row['node_task_id'] for row in cursor.fetchall()]
+        if not sampled_task_ids:
+            return
+
+        cursor.execute("""
+        INSERT INTO cluster_scan_results (
+            cluster_id, cluster_name, node_name, node_ip,
+            scan_result, main_task_id, node_task_id
+        )
+        SELECT d.cluster_id, d.cluster_name, d.node_name, d.node_ip, r.scan_result, d.main_task_id, d.node_task_id
+        FROM cluster_node_tasks d
+        JOIN cluster_scan_results r ON r.node_task_id = d.source_node_task_id
+        WHERE d.source_node_task_id = %s AND d.scan_source = 'sampled' AND d.scan_status = 'pending'
+        """, (node_task_id,))
+        cursor.execute("""
+        UPDATE cluster_node_tasks
+        SET scan_status = 'done'
+        WHERE source_node_task_id = %s AND scan_source = 'sampled' AND scan_status = 'pending'
+        """, (node_task_id,))
+        on_results_stored(conn, sampled_task_ids)
+
+    def _queue_node_tasks(self, cluster_id, cluster_config, node_infos, main_task_id, image_ready=True):
+        """为需要扫描的节点创建排队中的任务记录"""
+        queued_tasks = []
+        values = []
+        for node_info in node_infos:
+            node_task_id = str(uuid.uuid4())
+            job_name = f'kube-bench-{node_info["node_name"]}-{node_task_id[:8]}'
+            values.append((
+                cluster_id, cluster_config['cluster_name'], node_info['node_name'],
+                node_info['node_role'], node_info['node_ip'], 'queued', main_task_id,
+                node_task_id, '', job_name, node_info['node_fingerprint'], node_info['node_pool'],
+                1 if image_ready else 0, node_info.get('scan_targets'), node_info.get('scan_checks')
+            ))
+            queued_tasks.append({
+                'node_name': node_info['node_name'],
+                'node_task_id': node_task_id,
+                'node_ip': node_info['node_ip'],
+                'node_role': node_info['node_role'],
+                'node_pool': node_info['node_pool']
+            })
+
+        if values:
+            with get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany("""
+                INSERT INTO cluster_node_tasks (
+                    cluster_id, cluster_name, node_name, node_role, node_ip,
+                    scan_status, main_task_id, node_task_id, scanner, kube_bench_job,
+                    node_fingerprint, node_pool, image_ready, scan_targets, scan_checks
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, values)
+                conn.commit()
+
+        return queued_tasks
+
+    def _skip_image_warmup(self, main_task_id):
+        """预热无法进行时直接将主任务下的节点标记为镜像就绪"""
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            UPDATE cluster_node_tasks
+            SET image_ready = 1
+            WHERE main_task_id = %s AND image_ready = 0
+            """, (main_task_id,))
+            conn.commit()
+
+    def _start_image_warmup(self, v1, main_task_id, node_names):
+        """创建短期存在的预拉取 DaemonSet，在目标节点上提前缓存 kube-bench 镜像"""
+        daemonset_name = f'kube-bench-prepull-{main_task_id[:8]}'
+        labels = {'app': 'kube-bench-prepull', 'kube-bench-prepull': main_task_id}
+        manifest = {
+            'apiVersion': 'apps/v1',
+            'kind': 'DaemonSet',
+            'metadata': {'name': daemonset_name, 'labels': labels},
+            'spec': {
+                'selector': {'matchLabels': labels},
+                'template': {
+                    'metadata': {'labels': labels},
+                    'spec': {
+                        'tolerations': [{'key': '', 'operator': 'Exists'}],
+                        'terminationGracePeriodSeconds': 0,
+                        'affinity': {
+                            'nodeAffinity': {
+                                'requiredDuringSchedulingIgnoredDuringExecution': {
+                                    'nodeSelectorTerms': [{
+                                        'matchExpressions': [{
+                                            'key': 'kubernetes.io/hostname',
+                                            'operator': 'In',
+                                            'values': node_names
+                                        }]
+                                    }]
+                                }
+                            }
+                        },
+                        'containers': [{
+                            'name': 'prepull',
+                            'image': self.kube_bench_image,
+                            'command': ['sh', '-c', 'while true; do sleep 3600; done'],
+                            'resources': {'requests': {'cpu': '1m', 'memory': '8Mi'}}
+                        }]
+                    }
+                }
+            }
+        }
+        client.AppsV1Api(v1.api_client).create_namespaced_daemon_set(
+            body=manifest,
+            namespace='default'
+        )
+        print(f"已创建镜像预拉取 DaemonSet {daemonset_name}, 目标节点 {len(node_names)} 个")
+
+    def update_image_warmup(self, cluster_id, main_task_id):
+        """
+        根据预拉取 Pod 的状态逐节点标记镜像就绪；全部就绪或预热超时后删除预拉取 DaemonSet
+        """
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT node_task_id, node_name, task_created_at
+            FROM cluster_node_tasks
+            WHERE cluster_id = %s AND main_task_id = %s AND image_ready = 0
+            """, (cluster_id, main_task_id))
+            waiting_tasks = cursor.fetchall()
+            if not waiting_tasks:
+                return
+
+            cluster_config = self.get_cluster_config(cluster_id)
+            v1 = client.CoreV1Api(build_api_client(cluster_config))
+
+            pods = v1.list_namespaced_pod(
+                namespace='default',
+                label_selector=f'kube-bench-prepull={main_task_id}'
             )
-            cursor.execute(query, values)
+            # 预拉取容器启动即说明镜像已缓存到该节点
+            ready_nodes = {
+                pod.spec.node_name for pod in pods.items
+                if any(status.state.running for status in (pod.status.container_statuses or []))
+            }
+
+            current_time = datetime.now()
+            ready_task_ids = []
+            for task in waiting_tasks:
+                timed_out = (current_time - task['task_created_at']).total_seconds() > Config.WARMUP_TIMEOUT
+                if task['node_name'] in ready_nodes or timed_out:
+                    ready_task_ids.append(task['node_task_id'])
+
+            if ready_task_ids:
+                placeholders = ', '.join(['%s'] * len(ready_task_ids))
+                cursor.execute(f"""
+                UPDATE cluster_node_tasks
+                SET image_ready = 1
+                WHERE node_task_id IN ({placeholders})
+                """, ready_task_ids)
+                conn.commit()
+                print(f"镜像预热: {len(ready_task_ids)}/{len(waiting_tasks)} 个节点已就绪 (主任务 {main_task_id})")
+
+        if len(ready_task_ids) == len(waiting_tasks):
+            try:
+                client.AppsV1Api(v1.api_client).delete_namespaced_daemon_set(
+                    name=f'kube-bench-prepull-{main_task_id[:8]}',
+                    namespace='default',
+                    body=client.V1DeleteOptions(propagation_policy='Background')
+                )
+            except Exception as e:
+                print(f"Error deleting prepull daemonset for {main_task_id}: {str(e)}")
+
+    def admit_queued_tasks(self, cluster_id, main_task_id, v1=None):
+        """
+        按集群和节点池的并发上限放行排队中的节点任务并创建 Job。
+        同一集群下所有主任务共享并发上限，已结束的任务会释放名额给下一批
+        """
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+
+            # 锁定集群记录，串行化同一集群的放行操作
+            cursor.execute("""
+            SELECT max_concurrent_jobs, max_concurrent_jobs_per_pool
+            FROM cluster_info
+            WHERE cluster_id = %s
+            FOR UPDATE
+            """, (cluster_id,))
+            limits = cursor.fetchone()
+            # 集群或主任务正在删除时不再放行
+            if not limits or deletion_pending(cursor, cluster_id, main_task_id):
+                conn.rollback()
+                return []
+            cluster_limit = limits['max_concurrent_jobs'] or Config.ROLLOUT_MAX_CONCURRENT_JOBS
+            pool_limit = limits['max_concurrent_jobs_per_pool'] or Config.ROLLOUT_MAX_CONCURRENT_JOBS_PER_POOL
+
+            cursor.execute("""
+            SELECT node_pool, COUNT(*) AS count
+            FROM cluster_node_tasks
+            WHERE cluster_id = %s AND scan_source = 'scanned'
+            AND scan_status IN ('pending', 'running')
+            GROUP BY node_pool
+            """, (cluster_id,))
+            in_flight_by_pool = {row['node_pool']: row['count'] for row in cursor.fetchall()}
+            in_flight = sum(in_flight_by_pool.values())
+            if in_flight >= cluster_limit:
+                conn.rollback()
+                return []
+
+            cursor.execute("""
+            SELECT node_task_id, node_name, node_role, node_pool, kube_bench_job,
+                   scan_targets, scan_checks
+            FROM cluster_node_tasks
+            WHERE cluster_id = %s AND main_task_id = %s AND scan_status = 'queued'
+            AND image_ready = 1
+            ORDER BY task_created_at, node_name
+            """, (cluster_id, main_task_id))
+
+            admitted = []
+            for task in cursor.fetchall():
+                if in_flight >= cluster_limit:
+                    break
+                if in_flight_by_pool.get(task['node_pool'], 0) >= pool_limit:
+                    continue
+                admitted.append(task)
+                in_flight += 1
+                in_flight_by_pool[task['node_pool']] = in_flight_by_pool.get(task['node_pool'], 0) + 1
+
+            if not admitted:
+                conn.rollback()
+                return []
+
+            placeholders = ', '.join(['%s'] * len(admitted))
+            cursor.execute(f"""
+            UPDATE cluster_node_tasks
+            SET scan_status = 'pending', admitted_at = NOW()
+            WHERE node_task_id IN ({placeholders})
+            """, [task['node_task_id'] for task in admitted])
+            conn.commit()
+
+        print(f"集群 {cluster_id} 放行 {len(admitted)} 个节点任务 (主任务 {main_task_id})")
+
+        if v1 is None:
+            cluster_config = self.get_cluster_config(cluster_id)
+            v1 = client.CoreV1Api(build_api_client(cluster_config))
+
+        # 使用线程池并发创建 Job
+        failed_task_ids = []
+        requeue_task_ids = []
+        connectivity_error = None
+        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+            future_to_task = {
+                executor.submit(self._create_node_job, v1, task): task
+                for task in admitted
+            }
+            for future in concurrent.futures.as_completed(future_to_task):
+                task = future_to_task[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"创建节点 {task['node_name']} 的扫描任务失败: {str(e)}")
+                    # API Server 不可达时放回队列，等集群恢复后重新放行
+                    if is_connectivity_error(e):
+                        requeue_task_ids.append(task['node_task_id'])
+                        connectivity_error = e
+                    else:
+                        failed_task_ids.append(task['node_task_id'])
+
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            if failed_task_ids:
+                placeholders = ', '.join(['%s'] * len(failed_task_ids))
+                cursor.execute(f"""
+                UPDATE cluster_node_tasks
+                SET scan_status = 'failed'
+                WHERE node_task_id IN ({placeholders})
+                """, failed_task_ids)
+            if requeue_task_ids:
+                placeholders = ', '.join(['%s'] * len(requeue_task_ids))
+                cursor.execute(f"""
+                UPDATE cluster_node_tasks
+                SET scan_status = 'queued', admitted_at = NULL
+                WHERE node_task_id IN ({placeholders})
+                """, requeue_task_ids)
             conn.commit()
 
-    def create_kube_bench_job(self, node_role: str, node_name: str, job_name: str) -> dict:
+        if connectivity_error is not None:
+            raise ClusterUnreachableError(str(connectivity_error))
+
+        return admitted
+
+    def _create_node_job(self, v1, task):
+        """为已放行的节点任务创建 kube-bench Job，Pod 名称由监控线程解析"""
+        batch_v1 = client.BatchV1Api(v1.api_client)
+        job_manifest = self.create_kube_bench_job(
+            task['node_role'],
+            task['node_name'],
+            task['kube_bench_job'],
+            targets=task['scan_targets'].split(',') if task['scan_targets'] else None,
+            checks=task['scan_checks'].split(',') if task['scan_checks'] else None
+        )
+        batch_v1.create_namespaced_job(
+            body=job_manifest,
+            namespace='default'
+        )
+
+    def _create_daemonset_scan(self, v1, cluster_id, cluster_config, node_infos, main_task_id):
+        """DaemonSet 模式：按节点角色为主任务创建 DaemonSet，替代逐节点创建 Job"""
+        nodes_by_role = {}
+        for node_info in node_infos:
+            nodes_by_role.setdefault(node_info['node_role'], []).append(node_info)
+
+        apps_v1 = client.AppsV1Api(v1.api_client)
+        created_tasks = []
+        values = []
+        for node_role, role_nodes in nodes_by_role.items():
+            daemonset_name = f'kube-bench-{node_role}-{main_task_id[:8]}'
+            scan_targets = role_nodes[0].get('scan_targets')
+            scan_checks = role_nodes[0].get('scan_checks')
+            manifest = self.create_kube_bench_daemonset(
+                node_role,
+                [node_info['node_name'] for node_info in role_nodes],
+                daemonset_name,
+                main_task_id,
+                targets=scan_targets.split(',') if scan_targets else None,
+                checks=scan_checks.split(',') if scan_checks else None
+            )
+            try:
+                apps_v1.create_namespaced_daemon_set(
+                    body=manifest,
+                    namespace='default'
+                )
+            except Exception as e:
+                print(f"创建 DaemonSet {daemonset_name} 失败: {str(e)}")
+                continue
+
+            for node_info in role_nodes:
+                node_task_id = str(uuid.uuid4())
+                values.append((
+                    cluster_id, cluster_config['cluster_name'], node_info['node_name'],
+                    node_info['node_role'], node_info['node_ip'], main_task_id, node_task_id,
+                    daemonset_name, node_info['node_fingerprint'], node_info['node_pool'],
+                    scan_targets, scan_checks
+                ))
+                created_tasks.append({
+                    'node_name': node_info['node_name'],
+                    'node_task_id': node_task_id,
+                    'node_ip': node_info['node_ip'],
+                    'node_role': node_info['node_role'],
+                    'node_pool': node_info['node_pool']
+                })
+
+        if values:
+            with get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany("""
+                INSERT INTO cluster_node_tasks (
+                    cluster_id, cluster_name, node_name, node_role, node_ip,
+                    scan_status, main_task_id, node_task_id, scanner, kube_bench_job,
+                    node_fingerprint, node_pool, scan_executor, admitted_at, scan_targets, scan_checks
+                ) VALUES (%s, %s, %s, %s, %s, 'pending', %s, %s, '', %s, %s, %s, 'daemonset', NOW(), %s, %s)
+                """, values)
+                conn.commit()
+
+        return created_tasks
+
+    def create_kube_bench_daemonset(self, node_role, node_names, daemonset_name, main_task_id,
+                                    targets=None, checks=None):
+        """
+        基于 Job 模板中的 Pod 定义生成 DaemonSet。kube-bench 以 initContainer 的形式在每个节点运行一次，
+        主容器只负责让 Pod 保持存活，扫描结果从 initContainer 日志读取
+        """
+        job_dict = self.create_kube_bench_job(node_role, node_names[0], daemonset_name, targets, checks)
+        pod_spec = job_dict['spec']['template']['spec']
+        pod_spec.pop('nodeSelector', None)
+
+        pod_spec['initContainers'] = [pod_spec['containers'][0]]
+        pod_spec['containers'] = [{
+            'name': 'hold',
+            'image': self.kube_bench_image,
+            'command': ['sh', '-c', 'while true; do sleep 3600; done'],
+            'resources': {'requests': {'cpu': '1m', 'memory': '8Mi'}}
+        }]
+        pod_spec['restartPolicy'] = 'Always'
+
+        # 仅调度到本次需要扫描的对应角色节点
+        pod_spec['affinity'] = {
+            'nodeAffinity': {
+                'requiredDuringSchedulingIgnoredDuringExecution': {
+                    'nodeSelectorTerms': [{
+                        'matchExpressions': [{
+                            'key': 'kubernetes.io/hostname',
+                            'operator': 'In',
+                            'values': node_names
+                        }]
+                    }]
+                }
+            }
+        }
+
+        labels = {
+            'app': 'kube-bench',
+            'kube-bench-main-task': main_task_id,
+            'kube-bench-role': node_role
+        }
+        return {
+            'apiVersion': 'apps/v1',
+            'kind': 'DaemonSet',
+            'metadata': {'name': daemonset_name, 'labels': labels},
+            'spec': {
+                'selector': {'matchLabels': labels},
+                'template': {
+                    'metadata': {'labels': labels},
+                    'spec': pod_spec
+                }
+            }
+        }
+
+    def _get_daemonset_pod_scan_status(self, pod):
+        """根据 kube-bench initContainer 的状态映射节点任务状态"""
+        container_status = next(
+            (status for status in (pod.status.init_container_statuses or []) if status.name == 'kube-bench'),
+            None
+        )
+        if not container_status:
+            return 'pending'
+        if container_status.state.terminated:
+            return 'done' if container_status.state.terminated.exit_code == 0 else 'failed'
+        # initContainer 失败后会被重启，以上一次的失败结果为准
+        if container_status.last_state and container_status.last_state.terminated:
+            return 'failed'
+        if container_status.state.running:
+            return 'running'
+        return 'pending'
+
+    def _update_daemonset_tasks(self, v1, conn, cursor, cluster_id, cluster_config, main_task_id, tasks):
+        """通过一次 Pod 列表更新 DaemonSet 模式下各节点的扫描状态"""
+        pods = v1.list_namespaced_pod(
+            namespace='default',
+            label_selector=f'kube-bench-main-task={main_task_id}'
+        )
+        pods_by_node = {pod.spec.node_name: pod for pod in pods.items if pod.spec.node_name}
+        current_time = datetime.now()
+
+        for task in tasks:
+            try:
+                pod = pods_by_node.get(task['node_name'])
+                task_status = self._get_daemonset_pod_scan_status(pod) if pod else 'pending'
+                pending_since = self._pending_since(task, cluster_config)
+                if (task_status == 'pending' and
+                        (current_time - pending_since).total_seconds() > Config.SCAN_PENDING_TIMEOUT):
+                    print(f"[WARN]节点任务{task['node_task_id']}已经pending超时,标记扫描失败")
+                    task_status = 'failed'
+
+                pod_name = pod.metadata.name if pod else task['scanner']
+                if task_status == task['scan_status'] and pod_name == task['scanner']:
+                    continue
+
+                self._set_task_status(cursor, task['node_task_id'], task_status, scanner=pod_name, scheduled=pod is not None)
+                conn.commit()
+
+                if task_status == 'done':
+                    pod_logs = v1.read_namespaced_pod_log(
+                        name=pod_name,
+                        namespace='default',
+                        container='kube-bench',
+                        _preload_content=False,
+                    )
+                    pod_logs = pod_logs.data.decode('utf-8')
+                    if pod_logs:
+                        self.store_scan_result(cluster_id, main_task_id, task['node_task_id'], pod_logs)
+            except Exception as e:
+                print(f"Error updating daemonset task {task['node_task_id']}: {str(e)}")
+                if is_connectivity_error(e):
+                    raise ClusterUnreachableError(str(e))
+
+    def _delete_scan_daemonsets(self, cluster_id, main_task_id):
+        """删除主任务创建的扫描 DaemonSet"""
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT DISTINCT kube_bench_job
+            FROM cluster_node_tasks
+            WHERE cluster_id = %s AND main_task_id = %s AND scan_executor = 'daemonset'
+            """, (cluster_id, main_task_id))
+            daemonsets = [row['kube_bench_job'] for row in cursor.fetchall()]
+
+        if not daemonsets:
+            return
+
+        cluster_config = self.get_cluster_config(cluster_id)
+        apps_v1 = client.AppsV1Api(build_api_client(cluster_config))
+
+        for daemonset_name in daemonsets:
+            try:
+                apps_v1.delete_namespaced_daemon_set(
+                    name=daemonset_name,
+                    namespace='default',
+                    body=client.V1DeleteOptions(propagation_policy='Background')
+                )
+            except Exception as e:
+                print(f"Error deleting daemonset {daemonset_name}: {str(e)}")
+
+    def create_kube_bench_job(self, node_role: str, node_name: str, job_name: str,
+                              targets: list = None, checks: list = None) -> dict:
         """
-        根据节点角色创建对应的 kube-bench job
+        根据节点角色创建对应的 kube-bench job，指定 targets/checks 时只运行对应的部分检查
         """
         if node_role.lower() in ['master', 'control-plane']:
             job_yaml = KUBE_BENCH_MASTER_JOB
@@ -225,9 +962,21 @@ class KubernetesService:
             'kubernetes.io/hostname': node_name
         }
         job_dict['spec']['template']['spec']['containers'][0]['image'] = self.kube_bench_image
+
+        # 部分扫描：替换默认 targets，并限定检查项
+        command = job_dict['spec']['template']['spec']['containers'][0]['command']
+        if Config.KUBE_BENCH_OUTPUT_FORMAT == 'junit':
+            command[command.index('--json')] = '--junit'
+        if targets:
+            command[command.index('--targets') + 1] = ','.join(targets)
+        if checks:
+            command.extend(['--check', ','.join(checks)])
         
         # 生成唯一的 job 名称
         job_dict['metadata']['name'] = job_name
+
+        # Job 结束后由 Kubernetes 自动回收，后台回收线程会更早删除结果已入库的 Job
+        job_dict['spec']['ttlSecondsAfterFinished'] = Config.JOB_TTL_SECONDS_AFTER_FINISHED
         
         return job_dict
 
@@ -242,6 +991,10 @@ class KubernetesService:
                 SELECT DISTINCT main_task_id, MIN(task_created_at) as task_created_at
                 FROM cluster_node_tasks
                 WHERE cluster_id = %s
+                AND main_task_id NOT IN (
+                    SELECT main_task_id FROM deletion_jobs
+                    WHERE target_type = 'scan_task' AND status IN ('pending', 'running')
+                )
                 """
                 params = [cluster_id]
                 
@@ -266,11 +1019,15 @@ class KubernetesService:
                         node_ip,
                         node_role,
                         scan_status,
+                        scan_source,
+                        source_node_task_id,
+                        image_ready,
                         COUNT(*) as total,
                         SUM(CASE WHEN scan_status IN ('done', 'failed') THEN 1 ELSE 0 END) as completed
                     FROM cluster_node_tasks
                     WHERE cluster_id = %s AND main_task_id = %s
-                    GROUP BY node_task_id, node_name, node_ip, node_role, scan_status
+                    GROUP BY node_task_id, node_name, node_ip, node_role, scan_status,
+                             scan_source, source_node_task_id, image_ready
                     """
                     cursor.execute(query, (cluster_id, current_main_task_id))
                     tasks = cursor.fetchall()
@@ -283,8 +1040,11 @@ class KubernetesService:
                             'nodeRole': task['node_role'],
                             'status': task['scan_status'],
                             'progress': 100 if task['scan_status'] == 'done' else (
-                                0 if task['scan_status'] == 'pending' else 50
-                            )
+                                0 if task['scan_status'] in ('queued', 'pending') else 50
+                            ),
+                            'scanSource': task['scan_source'],
+                            'sourceNodeTaskId': task['source_node_task_id'],
+                            'imageReady': bool(task['image_ready'])
                         } for task in tasks]
                         
                         task_groups.append({
@@ -313,6 +1073,18 @@ class KubernetesService:
             """
             cursor.execute(query, (cluster_id, main_task_id))
             tasks = cursor.fetchall()
+
+            # 已归档的结果从归档文件中读取
+            archived = result_archive.load_archived_results([
+                task['node_task_id'] for task in tasks
+                if task['scan_status'] == 'done' and not task['scan_result']
+            ])
+            for task in tasks:
+                if task['node_task_id'] in archived:
+                    task['scan_result'] = archived[task['node_task_id']]['scan_result']
+                elif task['scan_result']:
+                    task['scan_result'] = json.loads(task['scan_result'])
+            rehydrate_scan_results([task['scan_result'] for task in tasks], cursor)
             
             return [{
                 'nodeTaskId': task['node_task_id'],
@@ -320,10 +1092,10 @@ class KubernetesService:
                 'nodeIp': task['node_ip'],
                 'status': task['scan_status'],
                 'progress': 100 if task['scan_status'] == 'done' else 0,
-                'results': json.loads(task['scan_result']) if task['scan_result'] else []
+                'results': task['scan_result'] or []
             } for task in tasks]
 
-    def get_node_scan_result(self, cluster_id, node_name):
+    def get_node_scan_result(self, cluster_id, node_name, result_filter=None):
         try:
             with get_connection() as conn:
                 cursor = conn.cursor(dictionary=True)
@@ -359,7 +1131,7 @@ class KubernetesService:
                 if result:
                     return {
                         "status": "done",
-                        "result": json.loads(result['scan_result']),
+                        "result": filter_scan_result(load_scan_result(result['scan_result'], cursor), result_filter),
                         "scan_time": result['inserted_at'].isoformat()
                     }
                 
@@ -382,8 +1154,29 @@ class KubernetesService:
             return None
         except Exception as e:
             print(f"Error getting pod name for job {job_name}: {str(e)}")
+            if is_connectivity_error(e):
+                raise ClusterUnreachableError(str(e))
             return None
 
+    def _set_task_status(self, cursor, node_task_id, task_status, scanner=None, scheduled=False):
+        """更新节点任务状态，并记录 Pod 调度、开始运行和结束的时间（只记录第一次）"""
+        cursor.execute("""
+        UPDATE cluster_node_tasks
+        SET scan_status = %s,
+            scanner = COALESCE(%s, scanner),
+            pod_scheduled_at = IF(%s, COALESCE(pod_scheduled_at, NOW()), pod_scheduled_at),
+            running_at = IF(%s, COALESCE(running_at, NOW()), running_at),
+            finished_at = IF(%s, COALESCE(finished_at, NOW()), finished_at)
+        WHERE node_task_id = %s
+        """, (
+            task_status,
+            scanner,
+            scheduled or task_status in ('running', 'done'),
+            task_status in ('running', 'done'),
+            task_status in ('done', 'failed'),
+            node_task_id
+        ))
+
     def update_scan_task_status(self, cluster_id, main_task_id):
         """更新指定主任务下所有节点的扫描状态"""
         try:
@@ -393,47 +1186,60 @@ class KubernetesService:
                 raise Exception("Cluster not found")
 
             # 配置 Kubernetes 客户端
-            configuration = client.Configuration()
-            configuration.host = cluster_config['api_server']
-            configuration.verify_ssl = False
-            configuration.api_key = {"authorization": "Bearer " + cluster_config['access_token']}
-            api_client = client.ApiClient(configuration)
+            api_client = build_api_client(cluster_config)
             v1 = client.CoreV1Api(api_client)
 
             # 获取该主任务下的所有节点任务
             with get_connection() as conn:
                 cursor = conn.cursor(dictionary=True)
                 query = """
-                SELECT node_task_id, scanner, scan_status, task_created_at
+                SELECT node_task_id, node_name, scanner, kube_bench_job, scan_executor,
+                       scan_status, task_created_at, admitted_at
                 FROM cluster_node_tasks
                 WHERE cluster_id = %s AND main_task_id = %s
-                AND scan_status NOT IN ('done', 'failed')  # 只获取未完成任务
+                AND scan_status NOT IN ('done', 'failed', 'queued')  # 只获取已放行的未完成任务
+                AND scan_source != 'sampled'  # 抽样节点没有自己的 Pod
                 """
                 cursor.execute(query, (cluster_id, main_task_id))
                 tasks = cursor.fetchall()
 
+                # DaemonSet 模式的任务通过一次 Pod 列表统一更新
+                daemonset_tasks = [task for task in tasks if task['scan_executor'] == 'daemonset']
+                if daemonset_tasks:
+                    self._update_daemonset_tasks(v1, conn, cursor, cluster_id, cluster_config, main_task_id, daemonset_tasks)
+                tasks = [task for task in tasks if task['scan_executor'] == 'job']
+
                 # 更新每个节点任务的状态
                 for task in tasks:
                     try:
                         print(f"[INFO]正在获取节点任务{task['node_task_id']}的状态")
                         current_time = datetime.now()
-                        pending_timeout = 300  # 5分钟超时（单位：秒）
+                        pending_timeout = Config.SCAN_PENDING_TIMEOUT
 
-                        # 检查 pending 状态是否超时
+                        # 检查 pending 状态是否超时（从任务被放行或集群恢复时开始计时）
+                        pending_since = self._pending_since(task, cluster_config)
                         if (task['scan_status'] == 'pending' and 
-                            (current_time - task['task_created_at']).total_seconds() > pending_timeout):
+                            (current_time - pending_since).total_seconds() > pending_timeout):
                             # 更新为失败状态
                             print(f"[WARN]节点任务{task['node_task_id']}已经pending超过5分钟,标记扫描失败")
-                            update_query = """
-                            UPDATE cluster_node_tasks
-                            SET scan_status = 'failed'
-                            WHERE node_task_id = %s
-                            """
-                            cursor.execute(update_query, (task['node_task_id'],))
+                            self._set_task_status(cursor, task['node_task_id'], 'failed')
                             conn.commit()
                             print(f"Task {task['node_task_id']} marked as failed due to pending timeout")
                             continue
 
+                        # Job 创建后 Pod 名称在监控时解析
+                        if not task['scanner']:
+                            pod_name = self.get_pod_name_by_job(v1, task['kube_bench_job'])
+                            if not pod_name:
+                                continue
+                            cursor.execute("""
+                            UPDATE cluster_node_tasks
+                            SET scanner = %s
+                            WHERE node_task_id = %s
+                            """, (pod_name, task['node_task_id']))
+                            conn.commit()
+                            task['scanner'] = pod_name
+
                         # 获取 pod 状态
                         try:
                             pod = v1.read_namespaced_pod(
@@ -452,12 +1258,10 @@ class KubernetesService:
                             }.get(pod_phase, 'failed')
 
                             # 更新数据库中的任务状态
-                            update_query = """
-                            UPDATE cluster_node_tasks
-                            SET scan_status = %s
-                            WHERE node_task_id = %s
-                            """
-                            cursor.execute(update_query, (task_status, task['node_task_id']))
+                            self._set_task_status(
+                                cursor, task['node_task_id'], task_status,
+                                scheduled=bool(pod.spec.node_name)
+                            )
                             conn.commit()
 
                             # 如果任务完成，获取并存储扫描结果
@@ -479,87 +1283,85 @@ class KubernetesService:
 
                         except Exception as e:
                             print(f"Error getting pod status: {str(e)}")
+                            # API Server 不可达时中止本轮，不把任务标记为失败
+                            if is_connectivity_error(e):
+                                raise ClusterUnreachableError(str(e))
                             # 如果无法获取 pod 状态，将任务标记为失败
-                            cursor.execute(update_query, ('failed', task['node_task_id']))
+                            self._set_task_status(cursor, task['node_task_id'], 'failed')
                             conn.commit()
 
+                    except ClusterUnreachableError:
+                        raise
                     except Exception as e:
                         print(f"Error updating task status: {str(e)}")
                         continue
 
+                # 代表节点已结束但没有产出结果时，沿用其结果的节点标记为失败
+                cursor.execute("""
+                UPDATE cluster_node_tasks d
+                JOIN cluster_node_tasks s ON s.node_task_id = d.source_node_task_id
+                SET d.scan_status = 'failed'
+                WHERE d.cluster_id = %s AND d.main_task_id = %s
+                AND d.scan_source = 'sampled' AND d.scan_status = 'pending'
+                AND s.scan_status IN ('done', 'failed')
+                """, (cluster_id, main_task_id))
+                conn.commit()
+
+        except ClusterUnreachableError:
+            raise
         except Exception as e:
             print(f"Error in update_scan_task_status: {str(e)}")
             raise Exception(f"Failed to update scan task status: {str(e)}")
 
-    def junit_to_json(self, junit_xml):
-        """将 JUnit XML 转换为 JSON 格式"""
-        try:
-            root = ET.fromstring(junit_xml)
-            result = {
-                'tests': []
-            }
-            
-            # 遍历所有测试用例
-            for test_suite in root.findall('.//testcase'):
-                test_case = {
-                    'test_number': test_suite.get('classname', ''),
-                    'test_desc': test_suite.get('name', ''),
-                    'test_info': [],
-                    'status': 'PASS'
-                }
-                
-                # 检查失败和错误
-                failure = test_suite.find('failure')
-                error = test_suite.find('error')
-                skipped = test_suite.find('skipped')
-                
-                if failure is not None:
-                    test_case['status'] = 'FAIL'
-                    test_case['test_info'].append(failure.text if failure.text else '')
-                    test_case['remediation'] = failure.get('message', '')
-                elif error is not None:
-                    test_case['status'] = 'FAIL'
-                    test_case['test_info'].append(error.text if error.text else '')
-                elif skipped is not None:
-                    test_case['status'] = 'WARN'
-                    test_case['test_info'].append(skipped.text if skipped.text else '')
-                
-                result['tests'].append(test_case)
-            
-            return result
-        except ET.ParseError as e:
-            print(f"Error parsing JUnit XML: {str(e)}")
-            return None
-
     def store_scan_result(self, cluster_id, main_task_id, node_task_id, pod_logs):
         """存储扫描结果到数据库"""
         try:
-            # 验证格式化 JSON
+            # 自动识别 JSON 或 JUnit 输出并解析为统一结构
             try:
-                print("Raw pod logs:")
-                # print(pod_logs)
-                json_logs = json.loads(pod_logs)
-                formatted_logs = json.dumps(json_logs)
-            except json.JSONDecodeError as e:
-                print(f"Invalid JSON in pod logs: {str(e)}")
-                formatted_logs = json.dumps({
+                json_logs, output_format = parse_kube_bench_output(pod_logs)
+                print(f"Parsed {output_format} output for node task {node_task_id}")
+            except ValueError as e:
+                print(f"Invalid kube-bench output in pod logs: {str(e)}")
+                json_logs = {
                     "raw_output": pod_logs,
-                    "error": "Invalid JSON format"
-                })
+                    "error": str(e)
+                }
 
             with get_connection() as conn:
                 cursor = conn.cursor(dictionary=True)
+
+                # 集群或主任务正在删除时丢弃结果；共享锁保证本事务提交前不会登记新的删除任务
+                if deletion_pending(cursor, cluster_id, main_task_id, lock=True):
+                    print(f"节点任务 {node_task_id} 所属的集群或扫描任务正在删除，丢弃扫描结果")
+                    conn.rollback()
+                    return
                 
                 # 获取任务信息
                 query = """
-                SELECT cluster_name, node_name, node_ip
+                SELECT cluster_name, node_name, node_ip, scan_targets, scan_checks
                 FROM cluster_node_tasks
                 WHERE node_task_id = %s
                 """
                 cursor.execute(query, (node_task_id,))
                 task_info = cursor.fetchone()
 
+                # 部分扫描的结果合并到该节点上一次的完整结果中
+                if task_info and (task_info['scan_targets'] or task_info['scan_checks']) and 'raw_output' not in json_logs:
+                    cursor.execute("""
+                    SELECT scan_result
+                    FROM cluster_scan_results
+                    WHERE cluster_id = %s AND node_name = %s
+                    ORDER BY inserted_at DESC
+                    LIMIT 1
+                    """, (cluster_id, task_info['node_name']))
+                    base_result = cursor.fetchone()
+                    if base_result:
+                        json_logs = merge_partial_result(load_scan_result(base_result['scan_result'], cursor), json_logs)
+
                 if task_info:
+                    # 检查项的重复文本存入检查项目录，结果中只保留引用
+                    formatted_logs = json.dumps(dehydrate_scan_result(cursor, json_logs))
+
                     # 插入扫描结果
                     insert_query = """
                     INSERT INTO cluster_scan_results (
@@ -577,6 +1379,14 @@ class KubernetesService:
                         node_task_id
                     )
                     cursor.execute(insert_query, values)
+                    cursor.execute("""
+                    UPDATE cluster_node_tasks
+                    SET result_stored_at = NOW()
+                    WHERE node_task_id = %s
+                    """, (node_task_id,))
+                    record_scan_duration(cursor, node_task_id)
+                    on_results_stored(conn, [node_task_id])
+                    self._attribute_sampled_results(conn, cursor, node_task_id)
                     conn.commit()
 
         except Exception as e:
@@ -588,6 +1398,21 @@ class KubernetesService:
         try:
             while not self.stop_monitoring.get(main_task_id, True):  # 检查停止标志
                 try:
+                    # 集群 API Server 不可达时暂停同步，恢复后自动继续
+                    if not self._cluster_available(cluster_id):
+                        print(f"集群 {cluster_id} API Server 不可达，跳过本轮同步 (主任务 {main_task_id})")
+                        time.sleep(interval)
+                        continue
+
+                    # 更新镜像预热进度，就绪节点的任务才能被放行
+                    try:
+                        self.update_image_warmup(cluster_id, main_task_id)
+                    except Exception as e:
+                        print(f"Error updating image warmup: {str(e)}")
+
+                    # 前一批任务结束后放行下一批
+                    self.admit_queued_tasks(cluster_id, main_task_id)
+
                     # 更新任务状态
                     self.update_scan_task_status(cluster_id, main_task_id)
                     
@@ -597,15 +1422,21 @@ class KubernetesService:
                         query = """
                         SELECT 
                             COUNT(*) as total,
-                            SUM(CASE WHEN scan_status IN ('done', 'failed') THEN 1 ELSE 0 END) as completed
+                            COALESCE(SUM(CASE WHEN scan_status IN ('done', 'failed') THEN 1 ELSE 0 END), 0) as completed
                         FROM cluster_node_tasks
                         WHERE cluster_id = %s AND main_task_id = %s
                         """
                         cursor.execute(query, (cluster_id, main_task_id))
                         result = cursor.fetchone()
+
+                        # 任务记录已被删除或正在删除（可能由其他进程发起，停止标志无法通知到这里）
+                        if result['total'] == 0 or deletion_pending(cursor, cluster_id, main_task_id):
+                            print(f"Scan task {main_task_id} is deleted, stop monitoring")
+                            break
                         
                         if result['total'] == result['completed']:
                             print(f"All tasks completed for main_task_id: {main_task_id}")
+                            self._delete_scan_daemonsets(cluster_id, main_task_id)
                             break
                         
                         # 获取当前态统计
@@ -623,8 +1454,13 @@ class KubernetesService:
                         for stat in status_stats:
                             print(f"- {stat['scan_status']}: {stat['count']}")
                         
-                    time.sleep(interval)
+                    cluster_health.record_success(cluster_id)
+                    # 根据历史扫描耗时调整下一次轮询间隔
+                    time.sleep(next_poll_interval(cluster_id, main_task_id, interval))
                     
+                except ClusterUnreachableError as e:
+                    cluster_health.record_failure(cluster_id, e)
+                    time.sleep(interval)
                 except Exception as e:
                     print(f"Error in monitoring iteration: {str(e)}")
                     time.sleep(interval)
@@ -653,59 +1489,15 @@ class KubernetesService:
             if not cluster_config:
                 raise Exception("Cluster not found")
 
-            # 配置 Kubernetes 客户端
-            configuration = client.Configuration()
-            configuration.host = cluster_config['api_server']
-            configuration.verify_ssl = False
-            configuration.api_key = {"authorization": "Bearer " + cluster_config['access_token']}
-            api_client = client.ApiClient(configuration)
-            batch_v1 = client.BatchV1Api(api_client)
-
-            with get_connection() as conn:
-                cursor = conn.cursor(dictionary=True)
-                
-                # 获取所有相关的 kube-bench jobs
-                query = """
-                SELECT kube_bench_job
-                FROM cluster_node_tasks
-                WHERE cluster_id = %s AND main_task_id = %s
-                """
-                cursor.execute(query, (cluster_id, main_task_id))
-                tasks = cursor.fetchall()
-
-                # 删除 Kubernetes jobs
-                for task in tasks:
-                    try:
-                        batch_v1.delete_namespaced_job(
-                            name=task['kube_bench_job'],
-                            namespace='default',
-                            body=client.V1DeleteOptions(
-                                propagation_policy='Background'
-                            )
-                        )
-                    except Exception as e:
-                        print(f"Error deleting job {task['kube_bench_job']}: {str(e)}")
-
-                # 删除扫描结果
-                delete_results_query = """
-                DELETE FROM cluster_scan_results
-                WHERE cluster_id = %s AND main_task_id = %s
-                """
-                cursor.execute(delete_results_query, (cluster_id, main_task_id))
-
-                # 删除任务记录
-                delete_tasks_query = """
-                DELETE FROM cluster_node_tasks
-                WHERE cluster_id = %s AND main_task_id = %s
-                """
-                cursor.execute(delete_tasks_query, (cluster_id, main_task_id))
-
-                conn.commit()
+            # Job 和数据库记录由后台删除任务分批清理
+            deletion_id = deletion_worker.enqueue('scan_task', cluster_id, main_task_id)
 
             # 清理线程相关资源
             self.stop_monitoring.pop(main_task_id, None)
             self.monitor_threads.pop(main_task_id, None)
 
+            return deletion_id
+
         except Exception as e:
             raise Exception(f"Failed to delete scan task: {str(e)}")
 
@@ -749,6 +1541,7 @@ class KubernetesService:
                             'status': status
                         })
                 
+                eta_seconds = estimate_eta(cluster_id, main_task_id)
                 return {
                     'mainTaskId': main_task_id,
                     'allTasksCompleted': result['total'] == result['completed'],
@@ -756,7 +1549,12 @@ class KubernetesService:
                         'All tasks completed' if result['total'] == result['completed']
                         else f"Progress: {result['completed']}/{result['total']} tasks completed"
                     ),
-                    'nodeStatuses': node_statuses
+                    'nodeStatuses': node_statuses,
+                    'etaSeconds': eta_seconds,
+                    'estimatedCompletionAt': (
+                        (datetime.now() + timedelta(seconds=eta_seconds)).isoformat()
+                        if eta_seconds is not None else None
+                    )
                 }
                 
         except Exception as e:
@@ -800,13 +1598,21 @@ class KubernetesService:
             
             if not cluster_info or not task_info:
                 raise Exception("No data found")
+
+            # 已归档的结果从归档文件中读取
+            if not task_info['scan_result']:
+                archived = result_archive.load_archived_result(node_task_id)
+                if not archived:
+                    raise Exception("No data found")
+                task_info['scan_result'] = json.dumps(archived['scan_result'])
+                task_info['inserted_at'] = archived['inserted_at']
             
             return {
                 'cluster': cluster_info,
                 'node_name': task_info['node_name'],
                 'node_ip': task_info['node_ip'],
                 'node_role': task_info['node_role'],
-                'scan_result': json.loads(task_info['scan_result']),
+                'scan_result': load_scan_result(task_info['scan_result'], cursor),
                 'scan_time': task_info['inserted_at'].isoformat()
             }
 
@@ -0,0 +1,207 @@
+from app.models.database import get_connection
+from app.utils.kube_client import build_api_client
+from app.utils.node_info import extract_node_info
+from app.services.cluster_health import cluster_health, is_connectivity_error
+from kubernetes import client
+from config import Config
+from datetime import datetime
+import threading
+import json
+import time
+
+# metadata-only 列表请求，只返回对象元数据，不反序列化完整的节点对象
+PARTIAL_OBJECT_METADATA_ACCEPT = 'application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1'
+
+
+def count_nodes(api_client):
+    """使用分页的 metadata-only 请求统计集群节点数量"""
+    count = 0
+    continue_token = None
+    while True:
+        query_params = [('limit', Config.NODE_LIST_PAGE_SIZE)]
+        if continue_token:
+            query_params.append(('continue', continue_token))
+        page = api_client.call_api(
+            '/api/v1/nodes', 'GET',
+            query_params=query_params,
+            header_params={'Accept': PARTIAL_OBJECT_METADATA_ACCEPT},
+            response_type='object',
+            auth_settings=['BearerToken'],
+            _return_http_data_only=True
+        )
+        count += len(page.get('items') or [])
+        continue_token = (page.get('metadata') or {}).get('continue')
+        if not continue_token:
+            return count
+
+
+class NodeInventory:
+    """集群节点清单：后台分页同步节点信息到数据库，扫描和集群列表直接读取清单"""
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            print("Node inventory sync started")
+
+    def _run(self):
+        while True:
+            try:
+                self.sync_all()
+            except Exception as e:
+                print(f"Error in node inventory sync: {str(e)}")
+            time.sleep(Config.NODE_INVENTORY_SYNC_INTERVAL)
+
+    def sync_all(self):
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT cluster_id FROM cluster_info")
+            cluster_ids = [row['cluster_id'] for row in cursor.fetchall()]
+
+        for cluster_id in cluster_ids:
+            try:
+                self.sync_cluster(cluster_id)
+            except Exception as e:
+                print(f"Error syncing node inventory for cluster {cluster_id}: {str(e)}")
+
+    def _claim_sync(self, cluster_id, force):
+        """在数据库中占用本轮同步，避免多个进程重复同步同一集群"""
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            query = """
+            UPDATE cluster_info
+            SET inventory_synced_at = NOW(), updated_at = updated_at
+            WHERE cluster_id = %s
+            """
+            params = [cluster_id]
+            if not force:
+                query += " AND (inventory_synced_at IS NULL OR inventory_synced_at < NOW() - INTERVAL %s SECOND)"
+                params.append(Config.NODE_INVENTORY_SYNC_INTERVAL)
+            cursor.execute(query, params)
+            conn.commit()
+            return cursor.rowcount == 1
+
+    def sync_cluster(self, cluster_id, force=False):
+        """分页列出集群节点并写入清单表，删除已不存在的节点，同时更新集群的节点数量"""
+        if not self._claim_sync(cluster_id, force):
+            return False
+
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT api_server, access_token
+            FROM cluster_info
+            WHERE cluster_id = %s
+            """, (cluster_id,))
+            cluster_config = cursor.fetchone()
+        if not cluster_config:
+            return False
+
+        api_client = build_api_client(cluster_config)
+        # 集群 API Server 不可达时跳过本轮同步，保留现有清单
+        if not cluster_health.available(cluster_id, api_client):
+            return False
+
+        v1 = client.CoreV1Api(api_client)
+        sync_started_at = datetime.now().replace(microsecond=0)
+        node_count = 0
+        continue_token = None
+        while True:
+            # 逐页处理，只保留提取后的字段，内存占用与页大小相关而与集群规模无关
+            kwargs = {'limit': Config.NODE_LIST_PAGE_SIZE}
+            if continue_token:
+                kwargs['_continue'] = continue_token
+            try:
+                page = v1.list_node(**kwargs)
+            except Exception as e:
+                if is_connectivity_error(e):
+                    cluster_health.record_failure(cluster_id, e)
+                raise
+            node_infos = [extract_node_info(node) for node in page.items]
+            self._upsert_nodes(cluster_id, node_infos)
+            node_count += len(node_infos)
+            continue_token = page.metadata._continue
+            if not continue_token:
+                break
+
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            DELETE FROM cluster_node_inventory
+            WHERE cluster_id = %s AND synced_at < %s
+            """, (cluster_id, sync_started_at))
+            cursor.execute("""
+            UPDATE cluster_info
+            SET node_count = %s, inventory_synced_at = NOW(), updated_at = updated_at
+            WHERE cluster_id = %s
+            """, (node_count, cluster_id))
+            conn.commit()
+
+        print(f"集群 {cluster_id} 节点清单同步完成, 共 {node_count} 个节点")
+        return True
+
+    def _upsert_nodes(self, cluster_id, node_infos):
+        if not node_infos:
+            return
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+            INSERT INTO cluster_node_inventory (
+                cluster_id, node_name, node_ip, node_role, kubelet_version, os_image,
+                kernel_version, container_runtime_version, labels, annotations,
+                node_fingerprint, node_pool, synced_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+            ON DUPLICATE KEY UPDATE
+                node_ip = VALUES(node_ip),
+                node_role = VALUES(node_role),
+                kubelet_version = VALUES(kubelet_version),
+                os_image = VALUES(os_image),
+                kernel_version = VALUES(kernel_version),
+                container_runtime_version = VALUES(container_runtime_version),
+                labels = VALUES(labels),
+                annotations = VALUES(annotations),
+                node_fingerprint = VALUES(node_fingerprint),
+                node_pool = VALUES(node_pool),
+                synced_at = VALUES(synced_at)
+            """, [(
+                cluster_id, node_info['node_name'], node_info['node_ip'], node_info['node_role'],
+                node_info['kubelet_version'], node_info['os_image'], node_info['kernel_version'],
+                node_info['container_runtime_version'], json.dumps(node_info['labels']),
+                json.dumps(node_info['annotations']), node_info['node_fingerprint'], node_info['node_pool']
+            ) for node_info in node_infos])
+            conn.commit()
+
+    def get_nodes(self, cluster_id):
+        """从清单读取集群节点；清单为空（从未同步或同步失败）时先同步一次"""
+        node_infos = self._read_nodes(cluster_id)
+        if not node_infos:
+            self.sync_cluster(cluster_id, force=True)
+            node_infos = self._read_nodes(cluster_id)
+        return node_infos
+
+    def _read_nodes(self, cluster_id):
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT node_name, node_ip, node_role, kubelet_version, os_image,
+                   kernel_version, container_runtime_version, labels, annotations,
+                   node_fingerprint, node_pool
+            FROM cluster_node_inventory
+            WHERE cluster_id = %s
+            ORDER BY node_name
+            """, (cluster_id,))
+            node_infos = cursor.fetchall()
+
+        for node_info in node_infos:
+            node_info['labels'] = json.loads(node_info['labels']) if node_info['labels'] else {}
+            node_info['annotations'] = json.loads(node_info['annotations']) if node_info['annotations'] else {}
+        return node_infos
+
+
+node_inventory = NodeInventory()
@@ -0,0 +1,260 @@
+from app.models.database import get_connection
+from app.services.check_catalog import rehydrate_scan_results
+from config import Config
+from datetime import datetime
+import threading
+import shutil
+import gzip
+import json
+import time
+import uuid
+import os
+
+
+class ResultArchive:
+    """
+    扫描结果保留策略：每个集群保留最近 N 次扫描以及保留期内的结果，更早的结果归档到本地 JSONL.gz 文件。
+    每条结果写成独立的 gzip 成员，索引表记录其所在文件、偏移和长度，按需读取单条结果时不需要解压整个文件
+    """
+
+    LOCK_NAME = 'kube_bench_result_archive'
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            print("Result archive started")
+
+    def _run(self):
+        while True:
+            try:
+                self.archive_once()
+            except Exception as e:
+                print(f"Error in result archive: {str(e)}")
+            time.sleep(Config.RETENTION_INTERVAL)
+
+    def archive_once(self):
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            # 只允许一个进程执行归档，避免同一结果被重复写入归档文件
+            cursor.execute("SELECT GET_LOCK(%s, 0) AS locked", (self.LOCK_NAME,))
+            if not cursor.fetchone()['locked']:
+                return
+            try:
+                cursor.execute("""
+                SELECT cluster_id, retention_keep_scans, retention_days
+                FROM cluster_info
+                """)
+                clusters = cursor.fetchall()
+                for cluster in clusters:
+                    try:
+                        self.archive_cluster(
+                            cluster['cluster_id'],
+                            cluster['retention_keep_scans'] or Config.RETENTION_KEEP_SCANS,
+                            cluster['retention_days'] or Config.RETENTION_DAYS
+                        )
+                    except Exception as e:
+                        print(f"Error archiving results for cluster {cluster['cluster_id']}: {str(e)}")
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (self.LOCK_NAME,))
+                cursor.fetchall()
+
+    def _get_expired_node_task_ids(self, cluster_id, keep_scans, retention_days):
+        """
+        超出保留范围的结果：不属于最近 keep_scans 次扫描、早于保留期，
+        且不是节点当前的最新结果（增量扫描和部分扫描合并依赖最新结果）
+        """
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT main_task_id
+            FROM cluster_scan_results
+            WHERE cluster_id = %s
+            GROUP BY main_task_id
+            ORDER BY MAX(inserted_at) DESC
+            LIMIT %s
+            """, (cluster_id, keep_scans))
+            keep_main_task_ids = [row['main_task_id'] for row in cursor.fetchall()]
+
+            query = """
+            SELECT r.node_task_id
+            FROM cluster_scan_results r
+            WHERE r.cluster_id = %s
+            AND r.inserted_at < NOW() - INTERVAL %s DAY
+            AND EXISTS (
+                SELECT 1 FROM cluster_scan_results n
+                WHERE n.cluster_id = r.cluster_id AND n.node_name = r.node_name
+                AND n.inserted_at > r.inserted_at
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM deletion_jobs d
+                WHERE d.cluster_id = r.cluster_id AND d.status IN ('pending', 'running')
+                AND (d.target_type = 'cluster' OR d.main_task_id = r.main_task_id)
+            )
+            """
+            params = [cluster_id, retention_days]
+            if keep_main_task_ids:
+                query += f" AND r.main_task_id NOT IN ({', '.join(['%s'] * len(keep_main_task_ids))})"
+                params.extend(keep_main_task_ids)
+            query += " ORDER BY r.inserted_at LIMIT %s"
+            params.append(Config.RETENTION_BATCH_SIZE)
+            cursor.execute(query, params)
+            return [row['node_task_id'] for row in cursor.fetchall()]
+
+    def archive_cluster(self, cluster_id, keep_scans, retention_days):
+        archived = 0
+        while True:
+            node_task_ids = self._get_expired_node_task_ids(cluster_id, keep_scans, retention_days)
+            if not node_task_ids:
+                break
+            self._archive_batch(cluster_id, node_task_ids)
+            archived += len(node_task_ids)
+            if len(node_task_ids) < Config.RETENTION_BATCH_SIZE:
+                break
+        if archived:
+            print(f"集群 {cluster_id} 归档 {archived} 条扫描结果")
+        return archived
+
+    def _archive_batch(self, cluster_id, node_task_ids):
+        """将一批结果写入新的归档文件，文件落盘后在同一事务中写入索引并删除原记录"""
+        placeholders = ', '.join(['%s'] * len(node_task_ids))
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"""
+            SELECT node_task_id, main_task_id, cluster_id, cluster_name, node_name, node_ip,
+                   scan_result, inserted_at
+            FROM cluster_scan_results
+            WHERE node_task_id IN ({placeholders})
+            """, node_task_ids)
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            # 归档文件保存还原后的完整结果，不依赖检查项目录
+            for row in rows:
+                row['scan_result'] = json.loads(row['scan_result'])
+            rehydrate_scan_results([row['scan_result'] for row in rows], cursor)
+
+            # 每个扫描主任务单独写归档文件，删除扫描任务时可以直接删除对应的文件
+            rows_by_main_task = {}
+            for row in rows:
+                rows_by_main_task.setdefault(row['main_task_id'], []).append(row)
+
+            index_values = []
+            for main_task_id, task_rows in rows_by_main_task.items():
+                task_dir = os.path.join(Config.RESULT_ARCHIVE_DIR, cluster_id, main_task_id)
+                os.makedirs(task_dir, exist_ok=True)
+                file_name = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.jsonl.gz"
+                relative_path = os.path.join(cluster_id, main_task_id, file_name)
+
+                offset = 0
+                with open(os.path.join(Config.RESULT_ARCHIVE_DIR, relative_path), 'wb') as archive_file:
+                    for row in task_rows:
+                        line = json.dumps({
+                            'node_task_id': row['node_task_id'],
+                            'main_task_id': row['main_task_id'],
+                            'cluster_id': row['cluster_id'],
+                            'cluster_name': row['cluster_name'],
+                            'node_name': row['node_name'],
+                            'node_ip': row['node_ip'],
+                            'inserted_at': row['inserted_at'].isoformat(),
+                            'scan_result': row['scan_result']
+                        }, ensure_ascii=False) + '\n'
+                        member = gzip.compress(line.encode('utf-8'))
+                        archive_file.write(member)
+                        index_values.append((
+                            row['node_task_id'], row['cluster_id'], row['main_task_id'],
+                            row['cluster_name'], row['node_name'], row['node_ip'], row['inserted_at'],
+                            relative_path, offset, len(member)
+                        ))
+                        offset += len(member)
+                    archive_file.flush()
+                    os.fsync(archive_file.fileno())
+
+            cursor.executemany("""
+            INSERT INTO scan_result_archive_index (
+                node_task_id, cluster_id, main_task_id, cluster_name, node_name, node_ip,
+                inserted_at, archive_file, byte_offset, byte_length
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, index_values)
+            cursor.execute(f"""
+            DELETE FROM cluster_scan_results
+            WHERE node_task_id IN ({placeholders})
+            """, [row['node_task_id'] for row in rows])
+            conn.commit()
+
+    def _read_member(self, archive_file, byte_offset, byte_length):
+        with open(os.path.join(Config.RESULT_ARCHIVE_DIR, archive_file), 'rb') as f:
+            f.seek(byte_offset)
+            return json.loads(gzip.decompress(f.read(byte_length)).decode('utf-8'))
+
+    def load_archived_results(self, node_task_ids):
+        """按节点任务ID从归档中读取结果，返回 {node_task_id: 结果记录}"""
+        if not node_task_ids:
+            return {}
+        placeholders = ', '.join(['%s'] * len(node_task_ids))
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"""
+            SELECT node_task_id, archive_file, byte_offset, byte_length
+            FROM scan_result_archive_index
+            WHERE node_task_id IN ({placeholders})
+            """, list(node_task_ids))
+            index_rows = cursor.fetchall()
+
+        results = {}
+        for row in index_rows:
+            try:
+                record = self._read_member(row['archive_file'], row['byte_offset'], row['byte_length'])
+                record['inserted_at'] = datetime.fromisoformat(record['inserted_at'])
+                results[row['node_task_id']] = record
+            except Exception as e:
+                print(f"Error reading archived result {row['node_task_id']}: {str(e)}")
+        return results
+
+    def load_archived_result(self, node_task_id):
+        return self.load_archived_results([node_task_id]).get(node_task_id)
+
+    def get_scan_task_archive_files(self, cluster_id, main_task_id):
+        """扫描主任务的结果所在的归档文件，删除索引记录前调用"""
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT DISTINCT archive_file
+            FROM scan_result_archive_index
+            WHERE cluster_id = %s AND main_task_id = %s
+            """, (cluster_id, main_task_id))
+            return [row['archive_file'] for row in cursor.fetchall()]
+
+    def delete_scan_task_archives(self, cluster_id, main_task_id, archive_files):
+        """
+        删除扫描主任务的归档文件（索引记录由删除任务清理）。早期的归档文件可能混有多个主任务的结果，
+        这类文件在不再被任何索引记录引用时才删除
+        """
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            for archive_file in archive_files:
+                cursor.execute("""
+                SELECT 1 FROM scan_result_archive_index
+                WHERE archive_file = %s
+                LIMIT 1
+                """, (archive_file,))
+                if cursor.fetchone():
+                    continue
+                try:
+                    os.remove(os.path.join(Config.RESULT_ARCHIVE_DIR, archive_file))
+                except FileNotFoundError:
+                    pass
+        shutil.rmtree(os.path.join(Config.RESULT_ARCHIVE_DIR, cluster_id, main_task_id), ignore_errors=True)
+
+    def delete_cluster_archives(self, cluster_id):
+        """删除集群的全部归档文件（索引记录由删除任务清理）"""
+        shutil.rmtree(os.path.join(Config.RESULT_ARCHIVE_DIR, cluster_id), ignore_errors=True)
+
+
+result_archive = ResultArchive()
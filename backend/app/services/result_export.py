@@ -0,0 +1,190 @@
+from app.models.database import get_connection
+from app.services.check_catalog import CATALOG_REF_FIELD, rehydrate_scan_results
+from config import Config
+from datetime import datetime
+import csv
+import gzip
+import io
+import json
+import os
+import zlib
+
+CSV_COLUMNS = [
+    'cluster_name', 'node_name', 'node_ip', 'main_task_id', 'node_task_id', 'inserted_at',
+    'control_id', 'control_text', 'section', 'test_number', 'status', 'test_desc', 'remediation'
+]
+
+
+def _build_conditions(filters, alias=''):
+    conditions = []
+    params = []
+    for column in ('cluster_id', 'main_task_id'):
+        if filters.get(column):
+            conditions.append(f"{alias}{column} = %s")
+            params.append(filters[column])
+    if filters.get('start_time'):
+        conditions.append(f"{alias}inserted_at >= %s")
+        params.append(filters['start_time'])
+    if filters.get('end_time'):
+        conditions.append(f"{alias}inserted_at < %s")
+        params.append(filters['end_time'])
+    return ' AND '.join(conditions) or '1 = 1', params
+
+
+def iter_result_rows(filters):
+    """
+    使用非缓冲游标逐批读取扫描结果，scan_result 保持为 JSON 字符串。
+    结果集再大内存中也只保留一批记录
+    """
+    where, params = _build_conditions(filters)
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True, buffered=False)
+    catalog_conn = None
+    try:
+        cursor.execute(f"""
+        SELECT cluster_id, cluster_name, node_name, node_ip, main_task_id, node_task_id,
+               inserted_at, scan_result
+        FROM cluster_scan_results
+        WHERE {where}
+        ORDER BY inserted_at, node_task_id
+        """, params)
+        while True:
+            rows = cursor.fetchmany(Config.EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            if catalog_conn is None and _has_catalog_refs(rows):
+                catalog_conn = get_connection()
+            if catalog_conn is not None:
+                _rehydrate_rows(rows, catalog_conn.cursor(dictionary=True))
+            for row in rows:
+                yield row
+    finally:
+        # 客户端中途断开时丢弃未读取的结果，连接才能归还连接池
+        try:
+            conn.consume_results()
+        except Exception:
+            pass
+        cursor.close()
+        conn.close()
+        if catalog_conn is not None:
+            catalog_conn.close()
+
+
+def _has_catalog_refs(rows):
+    return any(f'"{CATALOG_REF_FIELD}"' in row['scan_result'] for row in rows)
+
+
+def _rehydrate_rows(rows, catalog_cursor):
+    """
+    引用检查项目录的结果需要还原后再导出，每批只查询一次目录。
+    当前连接上的非缓冲结果集尚未读完，目录通过整个导出过程共用的另一个连接读取
+    """
+    dehydrated = [row for row in rows if f'"{CATALOG_REF_FIELD}"' in row['scan_result']]
+    if not dehydrated:
+        return
+    scan_results = [json.loads(row['scan_result']) for row in dehydrated]
+    rehydrate_scan_results(scan_results, catalog_cursor)
+    for row, scan_result in zip(dehydrated, scan_results):
+        row['scan_result'] = json.dumps(scan_result, ensure_ascii=False)
+
+
+def iter_archived_rows(filters):
+    """按文件和偏移顺序读取已归档的结果，同一文件只打开一次"""
+    where, params = _build_conditions(filters)
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True, buffered=False)
+    archive_file = None
+    current_path = None
+    try:
+        cursor.execute(f"""
+        SELECT archive_file, byte_offset, byte_length
+        FROM scan_result_archive_index
+        WHERE {where}
+        ORDER BY archive_file, byte_offset
+        """, params)
+        while True:
+            rows = cursor.fetchmany(Config.EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                if row['archive_file'] != current_path:
+                    if archive_file:
+                        archive_file.close()
+                    current_path = row['archive_file']
+                    archive_file = open(os.path.join(Config.RESULT_ARCHIVE_DIR, current_path), 'rb')
+                archive_file.seek(row['byte_offset'])
+                record = json.loads(gzip.decompress(archive_file.read(row['byte_length'])).decode('utf-8'))
+                record['inserted_at'] = datetime.fromisoformat(record['inserted_at'])
+                record['scan_result'] = json.dumps(record['scan_result'], ensure_ascii=False)
+                yield record
+    finally:
+        if archive_file:
+            archive_file.close()
+        try:
+            conn.consume_results()
+        except Exception:
+            pass
+        cursor.close()
+        conn.close()
+
+
+def _format_ndjson(row):
+    # scan_result 已经是 JSON 字符串，直接拼接避免再次解析和序列化
+    header = json.dumps({
+        'cluster_id': row['cluster_id'],
+        'cluster_name': row['cluster_name'],
+        'node_name': row['node_name'],
+        'node_ip': row['node_ip'],
+        'main_task_id': row['main_task_id'],
+        'node_task_id': row['node_task_id'],
+        'inserted_at': row['inserted_at'].isoformat()
+    }, ensure_ascii=False)
+    return header[:-1] + ', "scan_result": ' + row['scan_result'] + '}\n'
+
+
+def _format_csv(row):
+    """CSV 每个检查项一行"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    scan_result = json.loads(row['scan_result'])
+    for control in scan_result.get('Controls', []):
+        for test in control.get('tests', []):
+            for result in test.get('results', []):
+                writer.writerow([
+                    row['cluster_name'], row['node_name'], row['node_ip'], row['main_task_id'],
+                    row['node_task_id'], row['inserted_at'].isoformat(),
+                    control.get('id'), control.get('text'), test.get('section'),
+                    result.get('test_number'), result.get('status'), result.get('test_desc'),
+                    result.get('remediation')
+                ])
+    return buffer.getvalue()
+
+
+def stream_export(filters, export_format='ndjson', compress=False, include_archived=True):
+    """生成导出内容的数据块，可选 gzip 流式压缩"""
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def emit(text):
+        data = text.encode('utf-8')
+        return compressor.compress(data) if compressor else data
+
+    def generate():
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(CSV_COLUMNS)
+            yield emit(buffer.getvalue())
+
+        formatter = _format_csv if export_format == 'csv' else _format_ndjson
+        sources = [iter_result_rows(filters)]
+        if include_archived:
+            sources.append(iter_archived_rows(filters))
+        for source in sources:
+            for row in source:
+                chunk = emit(formatter(row))
+                if chunk:
+                    yield chunk
+
+        if compressor:
+            yield compressor.flush()
+
+    return generate()
@@ -0,0 +1,56 @@
+from app.services.check_catalog import rehydrate_scan_results
+import json
+
+# 扫描结果入库后依次调用的处理函数，签名为 hook(cursor, rows)，rows 中的 scan_result 已解析为字典。
+# 所有写入 cluster_scan_results 的路径（实际扫描、沿用、抽样）都通过 on_results_stored 触发，
+# 与结果写入处于同一事务。列表按 (顺序, 处理函数) 保存，调用顺序不依赖模块的导入顺序
+RESULT_INGEST_HOOKS = []
+
+# 各处理函数的调用顺序（从小到大）：全文索引最先写入 scan_check_results，
+# 汇总统计和扫描差异读取该表中的历史结果，合规趋势最后记录
+INGEST_ORDER_CHECK_INDEX = 10
+INGEST_ORDER_FLEET_ROLLUP = 20
+INGEST_ORDER_FINDING_MATRIX = 30
+INGEST_ORDER_DRIFT = 40
+INGEST_ORDER_COMPLIANCE_TREND = 50
+
+
+def register_ingest_hook(order):
+    """注册入库处理函数，order 取上面的顺序常量"""
+    def decorator(hook):
+        RESULT_INGEST_HOOKS.append((order, hook))
+        RESULT_INGEST_HOOKS.sort(key=lambda item: item[0])
+        return hook
+    return decorator
+
+
+def on_results_stored(conn, node_task_ids):
+    """读取刚写入的结果并调用各入库处理函数"""
+    if not node_task_ids or not RESULT_INGEST_HOOKS:
+        return
+    cursor = conn.cursor(dictionary=True)
+    placeholders = ', '.join(['%s'] * len(node_task_ids))
+    cursor.execute(f"""
+    SELECT r.cluster_id, r.main_task_id, r.node_task_id, r.node_name, r.inserted_at, r.scan_result
+    FROM cluster_scan_results r
+    WHERE r.node_task_id IN ({placeholders})
+    """, list(node_task_ids))
+    rows = cursor.fetchall()
+    for row in rows:
+        row['scan_result'] = json.loads(row['scan_result'])
+    # 解析失败的原始输出没有 Controls，不参与后续统计
+    rows = [row for row in rows if 'Controls' in row['scan_result']]
+    if not rows:
+        return
+    # 各处理函数需要完整的检查项文本；目录条目可能由本事务刚写入，不放入缓存
+    rehydrate_scan_results([row['scan_result'] for row in rows], cursor, cache=False)
+    for _, hook in RESULT_INGEST_HOOKS:
+        hook(cursor, rows)
+
+
+def iter_check_results(scan_result):
+    """遍历 kube-bench 结果中的每个检查项，返回 (control, test, result)"""
+    for control in scan_result.get('Controls', []):
+        for test in control.get('tests', []):
+            for result in test.get('results', []):
+                yield control, test, result
@@ -0,0 +1,224 @@
+from app.models.database import get_connection
+from croniter import croniter
+from config import Config
+from datetime import datetime, timedelta
+import threading
+import random
+import time
+import uuid
+
+
+def compute_next_run(cron_expr, jitter_seconds, base_time=None):
+    """计算下一次执行时间：cron 表达式的下一个时间点加上 [0, jitter_seconds) 内的随机偏移"""
+    next_run = croniter(cron_expr, base_time or datetime.now()).get_next(datetime)
+    if jitter_seconds:
+        next_run += timedelta(seconds=random.randint(0, jitter_seconds - 1))
+    return next_run
+
+
+class ScanScheduler:
+    """
+    定时扫描调度：按集群的 cron 表达式周期性创建扫描任务。开始时间在抖动窗口内随机分散，
+    并限制整个后端同时扫描的集群数量，到期但超出上限的计划顺延到有空闲名额时执行
+    """
+
+    LOCK_NAME = 'kube_bench_scan_scheduler'
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+        self._scan_service = None
+
+    def start(self, scan_service):
+        with self._lock:
+            self._scan_service = scan_service
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            print("Scan scheduler started")
+
+    def _run(self):
+        while True:
+            try:
+                self.run_due_schedules()
+            except Exception as e:
+                print(f"Error in scan scheduler: {str(e)}")
+            time.sleep(Config.SCHEDULER_INTERVAL)
+
+    def run_due_schedules(self):
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            # 多个进程都运行调度器，通过数据库命名锁保证同一时间只有一个进程触发扫描
+            cursor.execute("SELECT GET_LOCK(%s, 0) AS locked", (self.LOCK_NAME,))
+            if not cursor.fetchone()['locked']:
+                return
+            try:
+                self._trigger_due_schedules(conn, cursor)
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (self.LOCK_NAME,))
+                cursor.fetchall()
+
+    def _get_active_cluster_ids(self, cursor):
+        cursor.execute("""
+        SELECT DISTINCT cluster_id
+        FROM cluster_node_tasks
+        WHERE scan_status IN ('queued', 'pending', 'running')
+        """)
+        return {row['cluster_id'] for row in cursor.fetchall()}
+
+    def _trigger_due_schedules(self, conn, cursor):
+        active_cluster_ids = self._get_active_cluster_ids(cursor)
+        available = Config.SCHEDULER_MAX_CONCURRENT_CLUSTERS - len(active_cluster_ids)
+        if available <= 0:
+            return
+
+        cursor.execute("""
+        SELECT schedule_id, cluster_id, cron_expr, jitter_seconds, scan_mode, next_run_at
+        FROM scan_schedules
+        WHERE enabled = 1 AND next_run_at <= NOW()
+        ORDER BY next_run_at
+        """)
+        due_schedules = cursor.fetchall()
+
+        for schedule in due_schedules:
+            if available <= 0:
+                break
+
+            # 集群已有扫描在进行时不重复创建，直接推进到下一个周期
+            skip = schedule['cluster_id'] in active_cluster_ids
+
+            next_run_at = compute_next_run(schedule['cron_expr'], schedule['jitter_seconds'])
+            cursor.execute("""
+            UPDATE scan_schedules
+            SET next_run_at = %s, last_run_at = NOW()
+            WHERE schedule_id = %s AND next_run_at = %s
+            """, (next_run_at, schedule['schedule_id'], schedule['next_run_at']))
+            conn.commit()
+            if cursor.rowcount != 1 or skip:
+                continue
+
+            main_task_id = str(uuid.uuid4())
+            try:
+                self._scan_service.create_scan_task(
+                    schedule['cluster_id'],
+                    main_task_id,
+                    scan_mode=schedule['scan_mode']
+                )
+            except Exception as e:
+                print(f"Error running scheduled scan {schedule['schedule_id']}: {str(e)}")
+                continue
+
+            cursor.execute("""
+            UPDATE scan_schedules
+            SET last_main_task_id = %s
+            WHERE schedule_id = %s
+            """, (main_task_id, schedule['schedule_id']))
+            conn.commit()
+            active_cluster_ids.add(schedule['cluster_id'])
+            available -= 1
+            print(f"定时扫描已触发: 集群 {schedule['cluster_id']}, 主任务 {main_task_id}")
+
+    def create_schedule(self, data):
+        if not croniter.is_valid(data['cron_expr']):
+            raise Exception("Invalid cron expression")
+        jitter_seconds = int(data.get('jitter_seconds', Config.SCHEDULER_DEFAULT_JITTER))
+
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            if data.get('apply_to_all'):
+                cursor.execute("SELECT cluster_id FROM cluster_info")
+                cluster_ids = [row['cluster_id'] for row in cursor.fetchall()]
+            else:
+                cluster_ids = [data['cluster_id']]
+
+            schedule_ids = []
+            values = []
+            for cluster_id in cluster_ids:
+                schedule_id = str(uuid.uuid4())
+                schedule_ids.append(schedule_id)
+                values.append((
+                    schedule_id, cluster_id, data['cron_expr'], jitter_seconds,
+                    data.get('scan_mode', 'full'), 1 if data.get('enabled', True) else 0,
+                    compute_next_run(data['cron_expr'], jitter_seconds)
+                ))
+            if values:
+                cursor.executemany("""
+                INSERT INTO scan_schedules (
+                    schedule_id, cluster_id, cron_expr, jitter_seconds,
+                    scan_mode, enabled, next_run_at
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """, values)
+                conn.commit()
+
+        return {'schedule_ids': schedule_ids}
+
+    def update_schedule(self, data):
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT cron_expr, jitter_seconds
+            FROM scan_schedules
+            WHERE schedule_id = %s
+            """, (data['schedule_id'],))
+            schedule = cursor.fetchone()
+            if not schedule:
+                raise Exception("Schedule not found")
+
+            cron_expr = data.get('cron_expr', schedule['cron_expr'])
+            if not croniter.is_valid(cron_expr):
+                raise Exception("Invalid cron expression")
+            jitter_seconds = int(data.get('jitter_seconds', schedule['jitter_seconds']))
+
+            update_fields = ['cron_expr = %s', 'jitter_seconds = %s', 'next_run_at = %s']
+            values = [cron_expr, jitter_seconds, compute_next_run(cron_expr, jitter_seconds)]
+            if 'scan_mode' in data:
+                update_fields.append('scan_mode = %s')
+                values.append(data['scan_mode'])
+            if 'enabled' in data:
+                update_fields.append('enabled = %s')
+                values.append(1 if data['enabled'] else 0)
+            values.append(data['schedule_id'])
+
+            cursor.execute(f"""
+            UPDATE scan_schedules
+            SET {', '.join(update_fields)}
+            WHERE schedule_id = %s
+            """, values)
+            conn.commit()
+
+    def delete_schedule(self, schedule_id):
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM scan_schedules WHERE schedule_id = %s", (schedule_id,))
+            conn.commit()
+
+    def get_schedules(self, cluster_id=None):
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            query = """
+            SELECT schedule_id, cluster_id, cron_expr, jitter_seconds, scan_mode, enabled,
+                   next_run_at, last_run_at, last_main_task_id, created_at
+            FROM scan_schedules
+            """
+            params = []
+            if cluster_id:
+                query += " WHERE cluster_id = %s"
+                params.append(cluster_id)
+            query += " ORDER BY next_run_at"
+            cursor.execute(query, params)
+            return [{
+                'scheduleId': row['schedule_id'],
+                'clusterId': row['cluster_id'],
+                'cronExpr': row['cron_expr'],
+                'jitterSeconds': row['jitter_seconds'],
+                'scanMode': row['scan_mode'],
+                'enabled': bool(row['enabled']),
+                'nextRunAt': row['next_run_at'].isoformat() if row['next_run_at'] else None,
+                'lastRunAt': row['last_run_at'].isoformat() if row['last_run_at'] else None,
+                'lastMainTaskId': row['last_main_task_id'],
+                'createdAt': row['created_at'].isoformat() if row['created_at'] else None
+            } for row in cursor.fetchall()]
+
+
+scan_scheduler = ScanScheduler()
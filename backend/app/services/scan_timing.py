@@ -0,0 +1,158 @@
+from app.models.database import get_connection
+from config import Config
+from datetime import datetime, timedelta
+import math
+
+
+def record_scan_duration(cursor, node_task_id):
+    """
+    节点结果入库后，将本次扫描耗时计入所在集群和节点角色的滚动统计（指数加权平均和方差）。
+    只统计实际运行了 kube-bench 的任务
+    """
+    cursor.execute("""
+    SELECT cluster_id, node_role, task_created_at, admitted_at, running_at, finished_at
+    FROM cluster_node_tasks
+    WHERE node_task_id = %s AND scan_source = 'scanned' AND scan_executor != 'configz'
+    """, (node_task_id,))
+    task = cursor.fetchone()
+    if not task or not task['finished_at']:
+        return
+
+    started_at = task['admitted_at'] or task['task_created_at']
+    total = (task['finished_at'] - started_at).total_seconds()
+    pending = (task['running_at'] - started_at).total_seconds() if task['running_at'] else None
+    run = (task['finished_at'] - task['running_at']).total_seconds() if task['running_at'] else None
+
+    cursor.execute("""
+    SELECT sample_count, avg_pending_seconds, avg_run_seconds, avg_total_seconds, var_total_seconds
+    FROM scan_duration_stats
+    WHERE cluster_id = %s AND node_role = %s
+    FOR UPDATE
+    """, (task['cluster_id'], task['node_role']))
+    stats = cursor.fetchone()
+
+    if not stats:
+        cursor.execute("""
+        INSERT INTO scan_duration_stats (
+            cluster_id, node_role, sample_count, avg_pending_seconds,
+            avg_run_seconds, avg_total_seconds, var_total_seconds
+        ) VALUES (%s, %s, 1, %s, %s, %s, 0)
+        """, (task['cluster_id'], task['node_role'], pending, run, total))
+        return
+
+    # 样本较少时按算术平均累计，之后按固定权重衰减旧样本
+    alpha = max(Config.SCAN_DURATION_EWMA_ALPHA, 1.0 / (stats['sample_count'] + 1))
+
+    def ewma(average, value):
+        if value is None:
+            return average
+        if average is None:
+            return value
+        return average + alpha * (value - average)
+
+    delta = total - stats['avg_total_seconds']
+    cursor.execute("""
+    UPDATE scan_duration_stats
+    SET sample_count = sample_count + 1,
+        avg_pending_seconds = %s,
+        avg_run_seconds = %s,
+        avg_total_seconds = %s,
+        var_total_seconds = %s
+    WHERE cluster_id = %s AND node_role = %s
+    """, (
+        ewma(stats['avg_pending_seconds'], pending),
+        ewma(stats['avg_run_seconds'], run),
+        ewma(stats['avg_total_seconds'], total),
+        (1 - alpha) * (stats['var_total_seconds'] + alpha * delta * delta),
+        task['cluster_id'],
+        task['node_role']
+    ))
+
+
+def get_duration_stats(cluster_id):
+    """获取集群各节点角色的扫描耗时统计，样本数不足的角色不返回"""
+    with get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+        SELECT node_role, sample_count, avg_pending_seconds, avg_run_seconds,
+               avg_total_seconds, var_total_seconds
+        FROM scan_duration_stats
+        WHERE cluster_id = %s AND sample_count >= %s
+        """, (cluster_id, Config.SCAN_DURATION_MIN_SAMPLES))
+        return {row['node_role']: row for row in cursor.fetchall()}
+
+
+def _get_unfinished_tasks(cluster_id, main_task_id):
+    with get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+        SELECT node_role, scan_status, scan_executor, task_created_at, admitted_at
+        FROM cluster_node_tasks
+        WHERE cluster_id = %s AND main_task_id = %s
+        AND scan_status IN ('queued', 'pending', 'running')
+        AND scan_source = 'scanned' AND scan_executor != 'configz'
+        """, (cluster_id, main_task_id))
+        return cursor.fetchall()
+
+
+def next_poll_interval(cluster_id, main_task_id, default_interval):
+    """
+    根据各节点角色的历史耗时计算下一次轮询间隔：离预计完成时间越远轮询越稀疏，
+    接近预计完成时间时按最小间隔轮询。没有足够历史数据时使用默认间隔
+    """
+    stats = get_duration_stats(cluster_id)
+    tasks = [task for task in _get_unfinished_tasks(cluster_id, main_task_id) if task['scan_status'] != 'queued']
+    if not tasks:
+        return default_interval
+
+    now = datetime.now()
+    soonest = None
+    for task in tasks:
+        role_stats = stats.get(task['node_role'])
+        if not role_stats:
+            return default_interval
+        # 以平均耗时减去一个标准差作为最早可能完成的时间
+        expected = role_stats['avg_total_seconds'] - math.sqrt(role_stats['var_total_seconds'])
+        started_at = task['admitted_at'] or task['task_created_at']
+        remaining = (started_at + timedelta(seconds=expected) - now).total_seconds()
+        soonest = remaining if soonest is None else min(soonest, remaining)
+
+    interval = soonest / 2
+    return max(Config.MONITOR_MIN_INTERVAL, min(Config.MONITOR_MAX_INTERVAL, interval))
+
+
+def estimate_eta(cluster_id, main_task_id):
+    """
+    估算主任务剩余时间（秒）：运行中的任务按平均耗时计算剩余时间，
+    排队中的任务按集群并发上限分批估算。没有足够历史数据时返回 None
+    """
+    stats = get_duration_stats(cluster_id)
+    tasks = _get_unfinished_tasks(cluster_id, main_task_id)
+    if not tasks:
+        return 0
+    if any(task['node_role'] not in stats for task in tasks):
+        return None
+
+    with get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+        SELECT max_concurrent_jobs
+        FROM cluster_info
+        WHERE cluster_id = %s
+        """, (cluster_id,))
+        cluster = cursor.fetchone()
+    cluster_limit = (cluster and cluster['max_concurrent_jobs']) or Config.ROLLOUT_MAX_CONCURRENT_JOBS
+
+    now = datetime.now()
+    in_flight_remaining = 0
+    queued_seconds = 0
+    for task in tasks:
+        average = stats[task['node_role']]['avg_total_seconds']
+        if task['scan_status'] == 'queued':
+            queued_seconds += average
+            continue
+        started_at = task['admitted_at'] or task['task_created_at']
+        remaining = average - (now - started_at).total_seconds()
+        in_flight_remaining = max(in_flight_remaining, remaining, 0)
+
+    return int(in_flight_remaining + queued_seconds / cluster_limit)
@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+import yaml
+
+CLUSTER_REQUIRED_FIELDS = ['cluster_name', 'cluster_owner', 'api_server', 'business_name', 'access_token']
+
+
+def parse_cluster_csv(content):
+    """解析 CSV 格式的集群列表，首行为字段名（与单个注册接口的字段一致）"""
+    reader = csv.DictReader(io.StringIO(content))
+    return [
+        {key.strip(): (value or '').strip() for key, value in row.items() if key}
+        for row in reader
+    ]
+
+
+def parse_kubeconfig(content, defaults):
+    """
+    将 kubeconfig 中的每个 context 转换为一条集群记录，集群名称使用 context 名称。
+    只支持 Bearer Token 认证，负责人和业务名称取自请求中的默认值
+    """
+    kubeconfig = yaml.safe_load(content) or {}
+    clusters = {item['name']: item.get('cluster', {}) for item in kubeconfig.get('clusters') or []}
+    users = {item['name']: item.get('user', {}) for item in kubeconfig.get('users') or []}
+
+    entries = []
+    for context in kubeconfig.get('contexts') or []:
+        context_spec = context.get('context', {})
+        cluster = clusters.get(context_spec.get('cluster'), {})
+        user = users.get(context_spec.get('user'), {})
+        entries.append({
+            'cluster_name': context.get('name', ''),
+            'cluster_owner': defaults.get('cluster_owner', ''),
+            'business_name': defaults.get('business_name', ''),
+            'api_server': cluster.get('server', ''),
+            'access_token': user.get('token', ''),
+            'notes': defaults.get('notes', '')
+        })
+    return entries
+
+
+def parse_cluster_import(content, import_format, defaults=None):
+    """按格式（json、csv、kubeconfig）解析批量注册的集群列表"""
+    if import_format == 'csv':
+        return parse_cluster_csv(content)
+    if import_format == 'kubeconfig':
+        return parse_kubeconfig(content, defaults or {})
+    entries = json.loads(content) if isinstance(content, str) else content
+    if not isinstance(entries, list):
+        raise ValueError("JSON content must be a list of clusters")
+    return entries
@@ -0,0 +1,183 @@
+import json
+import re
+import xml.etree.ElementTree as ET
+from app.utils.scan_result import recount_scan_result
+
+# JUnit 输出中没有检查项分类的类型，按 CIS 基线的分类编号推断，用于快速扫描等按节点类型筛选的功能
+CIS_CONTROL_NODE_TYPES = {
+    '1': 'master',
+    '2': 'etcd',
+    '3': 'controlplane',
+    '4': 'node',
+    '5': 'policies'
+}
+
+# 每次送入解析器的字符数
+JUNIT_FEED_SIZE = 64 * 1024
+
+XML_DECLARATION = re.compile(r'<\?xml[^>]*\?>')
+XML_START = re.compile(r'<(\?xml|testsuites?[\s>])')
+
+
+def detect_output_format(output):
+    """根据首个有效字符判断 kube-bench 输出格式，返回 json、junit 或 None"""
+    stripped = output.lstrip()
+    if stripped.startswith('{'):
+        return 'json'
+    if stripped.startswith('<'):
+        return 'junit'
+    # kube-bench 的告警信息可能出现在结果之前
+    if '<testsuite' in output:
+        return 'junit'
+    return None
+
+
+def _iter_chunks(output):
+    if isinstance(output, (str, bytes)):
+        for start in range(0, len(output), JUNIT_FEED_SIZE):
+            yield output[start:start + JUNIT_FEED_SIZE]
+    else:
+        yield from output
+
+
+def _iter_testcases(output):
+    """
+    增量解析 JUnit XML，逐个返回 (testsuite 名称, testcase 元素)。
+    多个 target 的输出是多个并列的 testsuite 且没有根元素，因此外层补一个合成的根元素；
+    每个 testcase 处理完后立即清理，内存占用与单个检查项相关而与输出大小无关
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    parser.feed('<kube-bench>')
+    suite_name = ''
+    depth = 0
+    started = False
+    pending = ''
+    for chunk in _iter_chunks(output):
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode('utf-8')
+        pending += chunk
+        if not started:
+            # 跳过结果之前的非 XML 内容
+            match = XML_START.search(pending)
+            if not match:
+                pending = pending[-16:]
+                continue
+            pending = pending[match.start():]
+            started = True
+
+        # 未闭合的标签留到下一块，保证 XML 声明不会被分块截断
+        split = pending.rfind('<')
+        if split >= 0 and pending.find('>', split) < 0:
+            chunk, pending = pending[:split], pending[split:]
+        else:
+            chunk, pending = pending, ''
+        parser.feed(XML_DECLARATION.sub('', chunk))
+        for event, element in parser.read_events():
+            if event == 'start':
+                depth += 1
+                if element.tag == 'testsuite':
+                    suite_name = element.get('name', '')
+                continue
+            depth -= 1
+            if element.tag == 'testcase':
+                yield suite_name, element
+                element.clear()
+            elif element.tag == 'testsuite' or depth == 1:
+                element.clear()
+    parser.feed(pending + '</kube-bench>')
+    parser.close()
+
+
+def _testcase_to_result(testcase):
+    """优先使用 system-out 中 kube-bench 输出的完整检查项 JSON，缺失时从 testcase 属性还原"""
+    system_out = testcase.find('system-out')
+    if system_out is not None and system_out.text and system_out.text.strip():
+        try:
+            return json.loads(system_out.text)
+        except json.JSONDecodeError:
+            pass
+
+    check_id, _, test_desc = testcase.get('name', '').partition(' ')
+    result = {
+        'test_number': check_id,
+        'test_desc': test_desc,
+        'test_info': [],
+        'status': 'PASS'
+    }
+    failure = testcase.find('failure')
+    error = testcase.find('error')
+    skipped = testcase.find('skipped')
+    if failure is not None:
+        result['status'] = 'FAIL'
+        result['remediation'] = failure.get('message', '')
+        if failure.text:
+            result['test_info'].append(failure.text)
+    elif error is not None:
+        result['status'] = 'FAIL'
+        if error.text:
+            result['test_info'].append(error.text)
+    elif skipped is not None:
+        result['status'] = 'WARN'
+        if skipped.text:
+            result['test_info'].append(skipped.text)
+    return result
+
+
+def parse_junit_output(output):
+    """将 kube-bench 的 JUnit 输出转换为与 --json 输出一致的结构，output 可以是字符串或字符串块的迭代器"""
+    controls = []
+    controls_by_id = {}
+    tests_by_section = {}
+    for suite_name, testcase in _iter_testcases(output):
+        result = _testcase_to_result(testcase)
+        check_id = str(result.get('test_number', ''))
+        control_id = check_id.split('.')[0]
+        section = check_id.rsplit('.', 1)[0] if '.' in check_id else check_id
+
+        control = controls_by_id.get(control_id)
+        if control is None:
+            control = {
+                'id': control_id,
+                'version': '',
+                'text': suite_name,
+                'node_type': CIS_CONTROL_NODE_TYPES.get(control_id, ''),
+                'tests': []
+            }
+            controls.append(control)
+            controls_by_id[control_id] = control
+
+        test = tests_by_section.get((control_id, section))
+        if test is None:
+            test = {
+                'section': section,
+                'type': '',
+                'desc': testcase.get('classname', ''),
+                'results': []
+            }
+            control['tests'].append(test)
+            tests_by_section[(control_id, section)] = test
+        test['results'].append(result)
+
+    return recount_scan_result({'Controls': controls})
+
+
+def parse_kube_bench_output(output):
+    """
+    自动识别 JSON 或 JUnit 格式并解析为统一结构，返回 (结果, 格式)。
+    无法识别或解析失败时抛出 ValueError
+    """
+    output_format = detect_output_format(output)
+    if output_format == 'json':
+        try:
+            return json.loads(output), output_format
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON output: {str(e)}")
+    if output_format == 'junit':
+        try:
+            scan_result = parse_junit_output(output)
+        except ET.ParseError as e:
+            raise ValueError(f"Invalid JUnit output: {str(e)}")
+        if not scan_result['Controls']:
+            raise ValueError("JUnit output contains no test cases")
+        return scan_result, output_format
+    raise ValueError("Unrecognized kube-bench output format")
@@ -0,0 +1,31 @@
+from kubernetes import client
+from config import Config
+
+
+class TimeoutApiClient(client.ApiClient):
+    """未显式指定 _request_timeout 的请求使用默认的连接/读取超时，避免 API Server 不可达时长时间阻塞"""
+
+    def request(self, method, url, query_params=None, headers=None, post_params=None,
+                body=None, _preload_content=True, _request_timeout=None):
+        if _request_timeout is None:
+            _request_timeout = (Config.K8S_CONNECT_TIMEOUT, Config.K8S_READ_TIMEOUT)
+        return super().request(
+            method, url,
+            query_params=query_params,
+            headers=headers,
+            post_params=post_params,
+            body=body,
+            _preload_content=_preload_content,
+            _request_timeout=_request_timeout
+        )
+
+
+def build_api_client(cluster_config):
+    """根据集群配置（api_server、access_token）构建 Kubernetes ApiClient"""
+    configuration = client.Configuration()
+    configuration.host = cluster_config['api_server']
+    configuration.verify_ssl = False
+    configuration.api_key = {"authorization": "Bearer " + cluster_config['access_token']}
+    # 不在 urllib3 层重试，失败交给熔断器处理
+    configuration.retries = False
+    return TimeoutApiClient(configuration)
@@ -0,0 +1,196 @@
+import copy
+import re
+
+# 符合 CIS 基线要求的 TLS 加密套件
+STRONG_CIPHER_SUITES = {
+    'TLS_AES_128_GCM_SHA256',
+    'TLS_AES_256_GCM_SHA384',
+    'TLS_CHACHA20_POLY1305_SHA256',
+    'TLS_ECDHE_ECDSA_WITH_AES_128_GCM_SHA256',
+    'TLS_ECDHE_ECDSA_WITH_AES_256_GCM_SHA384',
+    'TLS_ECDHE_ECDSA_WITH_CHACHA20_POLY1305',
+    'TLS_ECDHE_ECDSA_WITH_CHACHA20_POLY1305_SHA256',
+    'TLS_ECDHE_RSA_WITH_AES_128_GCM_SHA256',
+    'TLS_ECDHE_RSA_WITH_AES_256_GCM_SHA384',
+    'TLS_ECDHE_RSA_WITH_CHACHA20_POLY1305',
+    'TLS_ECDHE_RSA_WITH_CHACHA20_POLY1305_SHA256',
+    'TLS_RSA_WITH_AES_256_GCM_SHA384',
+    'TLS_RSA_WITH_AES_128_GCM_SHA256',
+}
+
+
+def _get(config, *path, default=None):
+    for key in path:
+        if not isinstance(config, dict) or key not in config:
+            return default
+        config = config[key]
+    return config
+
+
+def _check_anonymous_auth(config):
+    value = _get(config, 'authentication', 'anonymous', 'enabled')
+    return value is False, value
+
+
+def _check_authorization_mode(config):
+    value = _get(config, 'authorization', 'mode')
+    return value is not None and value != 'AlwaysAllow', value
+
+
+def _check_client_ca_file(config):
+    value = _get(config, 'authentication', 'x509', 'clientCAFile')
+    return bool(value), value
+
+
+def _check_read_only_port(config):
+    # configz 中端口为 0 时字段可能被省略
+    value = _get(config, 'readOnlyPort', default=0)
+    return value == 0, value
+
+
+def _check_streaming_connection_idle_timeout(config):
+    value = _get(config, 'streamingConnectionIdleTimeout')
+    return value not in ('0', '0s', 0), value
+
+
+def _check_protect_kernel_defaults(config):
+    value = _get(config, 'protectKernelDefaults')
+    return value is True, value
+
+
+def _check_make_iptables_util_chains(config):
+    value = _get(config, 'makeIPTablesUtilChains', default=True)
+    return value is True, value
+
+
+def _check_tls_cert_file(config):
+    cert_file = _get(config, 'tlsCertFile')
+    key_file = _get(config, 'tlsPrivateKeyFile')
+    # 未配置证书文件但开启了服务端证书引导时同样视为通过
+    bootstrap = _get(config, 'serverTLSBootstrap') is True
+    return bool(cert_file and key_file) or bootstrap, {'tlsCertFile': cert_file, 'tlsPrivateKeyFile': key_file}
+
+
+def _check_rotate_certificates(config):
+    value = _get(config, 'rotateCertificates')
+    return value is not False, value
+
+
+def _check_rotate_server_certificate(config):
+    feature_gate = _get(config, 'featureGates', 'RotateKubeletServerCertificate')
+    bootstrap = _get(config, 'serverTLSBootstrap')
+    return feature_gate is not False and (feature_gate is True or bootstrap is True), {
+        'RotateKubeletServerCertificate': feature_gate,
+        'serverTLSBootstrap': bootstrap
+    }
+
+
+def _check_tls_cipher_suites(config):
+    value = _get(config, 'tlsCipherSuites') or []
+    return bool(value) and set(value) <= STRONG_CIPHER_SUITES, value
+
+
+# CIS 1.6 及 1.20 / 1.23 / 1.24 中可由 kubelet 配置判定的检查项编号
+_CIS_16_KUBELET_CHECKS = {
+    '4.2.1': ('--anonymous-auth', _check_anonymous_auth),
+    '4.2.2': ('--authorization-mode', _check_authorization_mode),
+    '4.2.3': ('--client-ca-file', _check_client_ca_file),
+    '4.2.4': ('--read-only-port', _check_read_only_port),
+    '4.2.5': ('--streaming-connection-idle-timeout', _check_streaming_connection_idle_timeout),
+    '4.2.6': ('--protect-kernel-defaults', _check_protect_kernel_defaults),
+    '4.2.7': ('--make-iptables-util-chains', _check_make_iptables_util_chains),
+    '4.2.10': ('--tls-cert-file', _check_tls_cert_file),
+    '4.2.11': ('--rotate-certificates', _check_rotate_certificates),
+    '4.2.12': ('RotateKubeletServerCertificate', _check_rotate_server_certificate),
+    '4.2.13': ('--tls-cipher-suites', _check_tls_cipher_suites),
+}
+
+# CIS 1.7 起移除了 --protect-kernel-defaults，之后的检查项编号依次前移
+_CIS_17_KUBELET_CHECKS = {
+    '4.2.1': ('--anonymous-auth', _check_anonymous_auth),
+    '4.2.2': ('--authorization-mode', _check_authorization_mode),
+    '4.2.3': ('--client-ca-file', _check_client_ca_file),
+    '4.2.4': ('--read-only-port', _check_read_only_port),
+    '4.2.5': ('--streaming-connection-idle-timeout', _check_streaming_connection_idle_timeout),
+    '4.2.6': ('--make-iptables-util-chains', _check_make_iptables_util_chains),
+    '4.2.9': ('--tls-cert-file', _check_tls_cert_file),
+    '4.2.10': ('--rotate-certificates', _check_rotate_certificates),
+    '4.2.11': ('RotateKubeletServerCertificate', _check_rotate_server_certificate),
+    '4.2.12': ('--tls-cipher-suites', _check_tls_cipher_suites),
+}
+
+# 可以仅通过 kubelet 配置（/configz）判定的检查项，按基线版本和检查项编号精确匹配，
+# 参数名用于核对检查描述，防止基线编号调整后误用规则；未列出的基线版本回退为完整扫描
+KUBELET_CONFIG_CHECKS = {
+    'cis-1.6': _CIS_16_KUBELET_CHECKS,
+    'cis-1.20': _CIS_16_KUBELET_CHECKS,
+    'cis-1.23': _CIS_16_KUBELET_CHECKS,
+    'cis-1.24': _CIS_16_KUBELET_CHECKS,
+    'cis-1.7': _CIS_17_KUBELET_CHECKS,
+    'cis-1.8': _CIS_17_KUBELET_CHECKS,
+    'cis-1.9': _CIS_17_KUBELET_CHECKS,
+}
+
+
+def _find_check(version, result):
+    rule = KUBELET_CONFIG_CHECKS.get(version, {}).get(str(result.get('test_number', '')))
+    if rule is None:
+        return None
+    flag, check = rule
+    if not re.search(r'(?<![\w-])' + re.escape(flag) + r'(?![\w-])', result.get('test_desc', '')):
+        return None
+    return check
+
+
+def _result_status(result, passed):
+    """与 kube-bench 的判定保持一致：人工检查项始终为 WARN，不计分的检查项未通过时为 WARN"""
+    if result.get('type') == 'manual':
+        return 'WARN'
+    if passed:
+        return 'PASS'
+    return 'FAIL' if result.get('scored', True) else 'WARN'
+
+
+def evaluate_kubelet_config(kubelet_config, base_result):
+    """
+    使用 kubelet 配置评估可由配置判定的检查项。检查项的编号、描述和修复建议取自该节点上一次的完整结果，
+    返回与 kube-bench JSON 输出结构一致的部分结果，以及评估过的检查项编号
+    """
+    partial_controls = []
+    evaluated = []
+    for control in base_result.get('Controls', []):
+        # 只评估节点（kubelet）相关的检查，避免与 API Server 的同名参数混淆
+        if control.get('node_type') != 'node':
+            continue
+        version = control.get('version', '')
+        partial_tests = []
+        for test in control.get('tests', []):
+            partial_results = []
+            for result in test.get('results', []):
+                check = _find_check(version, result)
+                if check is None:
+                    continue
+                passed, actual_value = check(kubelet_config)
+                item = copy.deepcopy(result)
+                item['status'] = _result_status(result, passed)
+                item['actual_value'] = str(actual_value)
+                item['test_info'] = [f'configz: {actual_value}']
+                partial_results.append(item)
+                evaluated.append(result.get('test_number'))
+            if partial_results:
+                partial_tests.append({
+                    'section': test.get('section'),
+                    'desc': test.get('desc'),
+                    'type': test.get('type', ''),
+                    'results': partial_results
+                })
+        if partial_tests:
+            partial_controls.append({
+                'id': control.get('id'),
+                'version': control.get('version'),
+                'text': control.get('text'),
+                'node_type': control.get('node_type'),
+                'tests': partial_tests
+            })
+
+    return {'Controls': partial_controls}, evaluated
@@ -0,0 +1,49 @@
+from config import Config
+import hashlib
+import json
+
+
+def extract_node_info(node):
+    """提取节点中与扫描相关的状态，并计算节点指纹和节点池标识"""
+    labels = node.metadata.labels or {}
+    annotations = node.metadata.annotations or {}
+    system_info = node.status.node_info
+    node_info = {
+        'node_name': node.metadata.name,
+        'node_ip': node.status.addresses[0].address,
+        'node_role': "master" if any(label in labels for label in ["node-role.kubernetes.io/master", "node-role.kubernetes.io/control-plane"]) else "worker",
+        'kubelet_version': system_info.kubelet_version if system_info else '',
+        'os_image': system_info.os_image if system_info else '',
+        'kernel_version': system_info.kernel_version if system_info else '',
+        'container_runtime_version': system_info.container_runtime_version if system_info else '',
+        'labels': {k: v for k, v in labels.items() if k.startswith(Config.FINGERPRINT_LABEL_PREFIXES)},
+        'annotations': {k: v for k, v in annotations.items() if k.startswith(Config.FINGERPRINT_ANNOTATION_PREFIXES)}
+    }
+    node_info['node_fingerprint'] = compute_node_fingerprint(node_info)
+    node_info['node_pool'] = compute_node_pool(node_info)
+    return node_info
+
+
+def compute_node_fingerprint(node_info):
+    """根据节点的扫描相关状态计算指纹，状态不变则指纹不变"""
+    payload = json.dumps({
+        'node_role': node_info['node_role'],
+        'kubelet_version': node_info['kubelet_version'],
+        'os_image': node_info['os_image'],
+        'kernel_version': node_info['kernel_version'],
+        'container_runtime_version': node_info['container_runtime_version'],
+        'labels': node_info['labels'],
+        'annotations': node_info['annotations']
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def compute_node_pool(node_info):
+    """计算节点池标识：角色、kubelet 版本、操作系统镜像和标签相同的节点属于同一个池"""
+    payload = json.dumps({
+        'node_role': node_info['node_role'],
+        'kubelet_version': node_info['kubelet_version'],
+        'os_image': node_info['os_image'],
+        'labels': node_info['labels']
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
@@ -0,0 +1,141 @@
+import copy
+
+STATUS_COUNT_FIELDS = {
+    'PASS': 'pass',
+    'FAIL': 'fail',
+    'WARN': 'warn',
+    'INFO': 'info'
+}
+
+
+def recount_scan_result(scan_result):
+    """根据各检查项的状态重新计算测试组、检查项和整体的统计数量"""
+    totals = {'total_pass': 0, 'total_fail': 0, 'total_warn': 0, 'total_info': 0}
+    for control in scan_result.get('Controls', []):
+        control_totals = {'total_pass': 0, 'total_fail': 0, 'total_warn': 0, 'total_info': 0}
+        for test in control.get('tests', []):
+            counts = {'pass': 0, 'fail': 0, 'warn': 0, 'info': 0}
+            for result in test.get('results', []):
+                field = STATUS_COUNT_FIELDS.get(result.get('status'))
+                if field:
+                    counts[field] += 1
+            test.update(counts)
+            for field, count in counts.items():
+                control_totals[f'total_{field}'] += count
+        control.update(control_totals)
+        for field, count in control_totals.items():
+            totals[field] += count
+    scan_result['Totals'] = totals
+    return scan_result
+
+
+def merge_partial_result(base_result, partial_result):
+    """
+    将部分扫描（指定 targets 或检查项）的结果合并到该节点上一次的完整结果中：
+    部分结果中出现的检查项覆盖原结果，其余检查项保持不变
+    """
+    merged = copy.deepcopy(base_result)
+    controls = merged.setdefault('Controls', [])
+    controls_by_id = {control.get('id'): control for control in controls}
+
+    for partial_control in partial_result.get('Controls', []):
+        control = controls_by_id.get(partial_control.get('id'))
+        if control is None:
+            control = copy.deepcopy(partial_control)
+            controls.append(control)
+            controls_by_id[control.get('id')] = control
+            continue
+
+        tests_by_section = {test.get('section'): test for test in control.setdefault('tests', [])}
+        for partial_test in partial_control.get('tests', []):
+            test = tests_by_section.get(partial_test.get('section'))
+            if test is None:
+                test = copy.deepcopy(partial_test)
+                control['tests'].append(test)
+                tests_by_section[test.get('section')] = test
+                continue
+
+            results = test.setdefault('results', [])
+            index_by_number = {result.get('test_number'): i for i, result in enumerate(results)}
+            for partial_item in partial_test.get('results', []):
+                index = index_by_number.get(partial_item.get('test_number'))
+                if index is None:
+                    results.append(copy.deepcopy(partial_item))
+                else:
+                    results[index] = copy.deepcopy(partial_item)
+
+    return recount_scan_result(merged)
+
+
+def _split_list(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def parse_result_filter(params):
+    """从请求参数解析结果筛选条件，列表参数支持数组或逗号分隔的字符串；没有任何条件时返回 None"""
+    result_filter = {
+        'statuses': [status.upper() for status in _split_list(params.get('status'))],
+        'control_ids': _split_list(params.get('control_id')),
+        'sections': _split_list(params.get('section')),
+        'check_prefix': (params.get('check_prefix') or '').strip(),
+        'fields': _split_list(params.get('fields')),
+        'exclude_fields': _split_list(params.get('exclude_fields'))
+    }
+    if not any(result_filter.values()):
+        return None
+    return result_filter
+
+
+def filter_scan_result(scan_result, result_filter):
+    """
+    按状态、检查项/测试组编号和检查ID前缀筛选 kube-bench 结果，并按字段投影检查项。
+    不包含任何匹配检查项的测试组和检查项会被移除；Totals 和各级计数保持原值，反映节点的整体结果
+    """
+    if not result_filter:
+        return scan_result
+
+    statuses = set(result_filter.get('statuses') or [])
+    control_ids = set(result_filter.get('control_ids') or [])
+    sections = set(result_filter.get('sections') or [])
+    check_prefix = result_filter.get('check_prefix') or ''
+    fields = set(result_filter.get('fields') or [])
+    exclude_fields = set(result_filter.get('exclude_fields') or [])
+    if fields:
+        # 编号和状态始终保留，便于前端定位检查项
+        fields |= {'test_number', 'status'}
+
+    filtered_controls = []
+    for control in scan_result.get('Controls', []):
+        if control_ids and str(control.get('id')) not in control_ids:
+            continue
+        filtered_tests = []
+        for test in control.get('tests', []):
+            if sections and str(test.get('section')) not in sections:
+                continue
+            filtered_results = []
+            for result in test.get('results', []):
+                if statuses and result.get('status') not in statuses:
+                    continue
+                if check_prefix and not str(result.get('test_number', '')).startswith(check_prefix):
+                    continue
+                if fields:
+                    result = {key: value for key, value in result.items() if key in fields}
+                elif exclude_fields:
+                    result = {key: value for key, value in result.items() if key not in exclude_fields}
+                filtered_results.append(result)
+            if filtered_results:
+                filtered_test = {key: value for key, value in test.items() if key != 'results'}
+                filtered_test['results'] = filtered_results
+                filtered_tests.append(filtered_test)
+        if filtered_tests:
+            filtered_control = {key: value for key, value in control.items() if key != 'tests'}
+            filtered_control['tests'] = filtered_tests
+            filtered_controls.append(filtered_control)
+
+    filtered = {key: value for key, value in scan_result.items() if key != 'Controls'}
+    filtered['Controls'] = filtered_controls
+    return filtered
@@ -6,6 +6,107 @@ class Config:
     MYSQL_USER = os.getenv('MYSQL_USER', 'root')
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', '7q6K!LkLB!cGJqU#')
     MYSQL_DB = os.getenv('MYSQL_DB', 'kube_bench') 
+    # 每个进程的数据库连接池大小（mysql-connector 上限为 32）。连接池耗尽时直接报错而不是等待，
+    # 需要容纳各后台线程、扫描监控线程和请求线程（导出时每个请求占用两个连接）
+    MYSQL_POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', 20))
+
+    # 节点任务处于 pending 状态的超时时间（秒）
+    SCAN_PENDING_TIMEOUT = int(os.getenv('SCAN_PENDING_TIMEOUT', 300))
+
+    # 增量扫描：节点指纹未变化且上次结果未超过该时长（秒）时沿用上次结果
+    INCREMENTAL_MAX_RESULT_AGE = int(os.getenv('INCREMENTAL_MAX_RESULT_AGE', 7 * 24 * 3600))
+    # 参与节点指纹计算的标签/注解前缀（逗号分隔）
+    FINGERPRINT_LABEL_PREFIXES = tuple(p for p in os.getenv(
+        'FINGERPRINT_LABEL_PREFIXES',
+        'node-role.kubernetes.io/,kubernetes.io/os,kubernetes.io/arch,'
+        'node.kubernetes.io/instance-type,eks.amazonaws.com/nodegroup,'
+        'cloud.google.com/gke-nodepool,kubernetes.azure.com/agentpool,'
+        'alibabacloud.com/nodepool-id'
+    ).split(',') if p)
+    FINGERPRINT_ANNOTATION_PREFIXES = tuple(p for p in os.getenv(
+        'FINGERPRINT_ANNOTATION_PREFIXES',
+        'kubeadm.alpha.kubernetes.io/cri-socket'
+    ).split(',') if p)
+
+    # 抽样扫描：每个节点池扫描的代表节点数量
+    SAMPLE_REPRESENTATIVES_PER_POOL = int(os.getenv('SAMPLE_REPRESENTATIVES_PER_POOL', 1))
+    # 抽样扫描：节点超过该时长（秒）未实际扫描时强制扫描，保证全量轮换覆盖
+    SAMPLE_FULL_COVERAGE_AGE = int(os.getenv('SAMPLE_FULL_COVERAGE_AGE', 30 * 24 * 3600))
+
+    # 分批扫描：每个集群/每个节点池同时运行的扫描 Job 数量上限（可按集群单独设置）
+    ROLLOUT_MAX_CONCURRENT_JOBS = int(os.getenv('ROLLOUT_MAX_CONCURRENT_JOBS', 20))
+    ROLLOUT_MAX_CONCURRENT_JOBS_PER_POOL = int(os.getenv('ROLLOUT_MAX_CONCURRENT_JOBS_PER_POOL', 10))
+
+    # 镜像预热：等待节点镜像就绪的最长时间（秒），超时后直接放行扫描任务
+    WARMUP_TIMEOUT = int(os.getenv('WARMUP_TIMEOUT', 900))
+
+    # 快速扫描：并发读取 kubelet 配置的线程数
+    FAST_SCAN_MAX_WORKERS = int(os.getenv('FAST_SCAN_MAX_WORKERS', 20))
+
+    # Job 回收：结束后自动删除的 TTL（秒），后台回收的间隔、每批数量和每秒删除数
+    JOB_TTL_SECONDS_AFTER_FINISHED = int(os.getenv('JOB_TTL_SECONDS_AFTER_FINISHED', 24 * 3600))
+    REAPER_INTERVAL = int(os.getenv('REAPER_INTERVAL', 300))
+    REAPER_BATCH_SIZE = int(os.getenv('REAPER_BATCH_SIZE', 50))
+    REAPER_DELETE_QPS = float(os.getenv('REAPER_DELETE_QPS', 5))
+
+    # 节点清单：分页列出节点的每页数量和后台同步间隔（秒）
+    NODE_LIST_PAGE_SIZE = int(os.getenv('NODE_LIST_PAGE_SIZE', 200))
+    NODE_INVENTORY_SYNC_INTERVAL = int(os.getenv('NODE_INVENTORY_SYNC_INTERVAL', 600))
+
+    # Kubernetes API 请求的连接/读取超时（秒）
+    K8S_CONNECT_TIMEOUT = int(os.getenv('K8S_CONNECT_TIMEOUT', 5))
+    K8S_READ_TIMEOUT = int(os.getenv('K8S_READ_TIMEOUT', 60))
+
+    # 集群熔断：连续失败次数阈值，以及指数退避的初始和最大等待时间（秒）
+    CLUSTER_FAILURE_THRESHOLD = int(os.getenv('CLUSTER_FAILURE_THRESHOLD', 3))
+    CLUSTER_BACKOFF_BASE = int(os.getenv('CLUSTER_BACKOFF_BASE', 10))
+    CLUSTER_BACKOFF_MAX = int(os.getenv('CLUSTER_BACKOFF_MAX', 600))
+
+    # 自适应轮询：轮询间隔上下限（秒），扫描耗时统计的衰减权重和参与估算的最少样本数
+    MONITOR_MIN_INTERVAL = int(os.getenv('MONITOR_MIN_INTERVAL', 3))
+    MONITOR_MAX_INTERVAL = int(os.getenv('MONITOR_MAX_INTERVAL', 60))
+    SCAN_DURATION_EWMA_ALPHA = float(os.getenv('SCAN_DURATION_EWMA_ALPHA', 0.2))
+    SCAN_DURATION_MIN_SAMPLES = int(os.getenv('SCAN_DURATION_MIN_SAMPLES', 3))
+
+    # 定时扫描：调度检查间隔（秒）、默认开始时间抖动窗口（秒）和全局同时扫描的集群数量上限
+    SCHEDULER_INTERVAL = int(os.getenv('SCHEDULER_INTERVAL', 30))
+    SCHEDULER_DEFAULT_JITTER = int(os.getenv('SCHEDULER_DEFAULT_JITTER', 1800))
+    SCHEDULER_MAX_CONCURRENT_CLUSTERS = int(os.getenv('SCHEDULER_MAX_CONCURRENT_CLUSTERS', 5))
+
+    # 批量扫描：同时扫描的集群数量上限和放行检查间隔（秒）
+    FLEET_SCAN_MAX_CONCURRENT_CLUSTERS = int(os.getenv('FLEET_SCAN_MAX_CONCURRENT_CLUSTERS', 5))
+    FLEET_SCAN_ADMISSION_INTERVAL = int(os.getenv('FLEET_SCAN_ADMISSION_INTERVAL', 15))
+
+    # 批量注册集群：并发探测数量和每批插入的行数
+    BULK_IMPORT_MAX_WORKERS = int(os.getenv('BULK_IMPORT_MAX_WORKERS', 20))
+    BULK_IMPORT_BATCH_SIZE = int(os.getenv('BULK_IMPORT_BATCH_SIZE', 100))
+
+    # 后台删除：每批删除的行数、批次间停顿（秒）、并发删除 Job 的线程数、轮询间隔和任务失活判定时间（秒）
+    DELETION_CHUNK_SIZE = int(os.getenv('DELETION_CHUNK_SIZE', 1000))
+    DELETION_CHUNK_PAUSE = float(os.getenv('DELETION_CHUNK_PAUSE', 0.05))
+    DELETION_JOB_WORKERS = int(os.getenv('DELETION_JOB_WORKERS', 5))
+    DELETION_POLL_INTERVAL = int(os.getenv('DELETION_POLL_INTERVAL', 10))
+    DELETION_STALE_TIMEOUT = int(os.getenv('DELETION_STALE_TIMEOUT', 300))
+
+    # 结果保留策略：每个集群保留最近的扫描次数和保留天数（集群未单独设置时使用），
+    # 超出范围的结果归档到 RESULT_ARCHIVE_DIR；归档检查间隔（秒）和每批归档的结果数量
+    RETENTION_KEEP_SCANS = int(os.getenv('RETENTION_KEEP_SCANS', 10))
+    RETENTION_DAYS = int(os.getenv('RETENTION_DAYS', 90))
+    RESULT_ARCHIVE_DIR = os.getenv('RESULT_ARCHIVE_DIR', './archive')
+    RETENTION_INTERVAL = int(os.getenv('RETENTION_INTERVAL', 3600))
+    RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', 500))
+
+    # 结果导出：非缓冲游标每次读取的行数
+    EXPORT_FETCH_SIZE = int(os.getenv('EXPORT_FETCH_SIZE', 100))
+
+    # 合规趋势：未指定粒度时自动选择的最大点数
+    TREND_MAX_POINTS = int(os.getenv('TREND_MAX_POINTS', 500))
+
+    # 检查项目录：每个进程缓存的目录条目数量上限
+    CHECK_CATALOG_CACHE_SIZE = int(os.getenv('CHECK_CATALOG_CACHE_SIZE', 20000))
+
+    # kube-bench 输出格式：json 或 junit，入库时自动识别，两种格式解析为相同的结构
+    KUBE_BENCH_OUTPUT_FORMAT = os.getenv('KUBE_BENCH_OUTPUT_FORMAT', 'json')
 
 # kube-bench job templates
 KUBE_BENCH_MASTER_JOB = """
@@ -1,7 +1,12 @@
 from flask import Flask
 from flask_cors import CORS
 from app.routes.cluster import cluster_bp
-from app.routes.scan import scan_bp
+from app.routes.scan import scan_bp, k8s_service, fleet_scan_service
+from app.services.job_reaper import job_reaper
+from app.services.node_inventory import node_inventory
+from app.services.scan_scheduler import scan_scheduler
+from app.services.deletion_worker import deletion_worker
+from app.services.result_archive import result_archive
 
 app = Flask(__name__)
 CORS(app, resources={
@@ -16,5 +21,13 @@ CORS(app, resources={
 app.register_blueprint(cluster_bp, url_prefix='/api/v1')
 app.register_blueprint(scan_bp, url_prefix='/api/v1')
 
+# 启动后台任务
+job_reaper.start()
+node_inventory.start()
+scan_scheduler.start(k8s_service)
+fleet_scan_service.start()
+deletion_worker.start()
+result_archive.start()
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5002) 
\ No newline at end of file
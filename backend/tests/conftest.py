@@ -0,0 +1,12 @@
+import sys
+import types
+
+
+def _no_database(*args, **kwargs):
+    raise RuntimeError("tests must not connect to MySQL; patch get_connection in the module under test")
+
+
+# app.models.database 在导入时就会创建连接池，测试中替换为不连接数据库的模块
+database = types.ModuleType('app.models.database')
+database.get_connection = _no_database
+sys.modules.setdefault('app.models.database', database)
@@ -0,0 +1,180 @@
+from app.services import finding_matrix
+
+
+class FakeMatrixStore:
+    """只实现 finding_matrix 用到的语句的内存数据库"""
+
+    def __init__(self):
+        self.matrix_headers = set()
+        self.nodes = {}
+        self.checks = {}
+
+
+class FakeCursor:
+    def __init__(self, store):
+        self.store = store
+        self.rows = []
+
+    def execute(self, query, params=()):
+        sql = ' '.join(query.split())
+        params = list(params)
+        store = self.store
+        self.rows = []
+        if sql.startswith('INSERT IGNORE INTO scan_matrix '):
+            store.matrix_headers.add(params[1])
+        elif sql.startswith('SELECT main_task_id FROM scan_matrix '):
+            self.rows = [{'main_task_id': params[0]}]
+        elif sql.startswith('SELECT node_index, node_task_id FROM scan_matrix_nodes'):
+            node = store.nodes.get(params[0], {}).get(params[1])
+            self.rows = [dict(node)] if node else []
+        elif sql.startswith('SELECT COALESCE(MAX(node_index) + 1, 0)'):
+            indexes = [node['node_index'] for node in store.nodes.get(params[0], {}).values()]
+            self.rows = [{'next_index': max(indexes) + 1 if indexes else 0}]
+        elif sql.startswith('INSERT INTO scan_matrix_nodes'):
+            nodes = store.nodes.setdefault(params[1], {})
+            assert params[3] not in nodes
+            assert params[2] not in {node['node_index'] for node in nodes.values()}
+            nodes[params[3]] = {'node_index': params[2], 'node_task_id': None}
+        elif sql.startswith('SELECT check_id, fail_bits, warn_bits FROM scan_finding_matrix'):
+            check_ids = set(params[1:]) if 'IN (' in sql else None
+            self.rows = [
+                {'check_id': check_id, 'fail_bits': row['fail_bits'], 'warn_bits': row['warn_bits']}
+                for (main_task_id, check_id), row in store.checks.items()
+                if main_task_id == params[0] and (check_ids is None or check_id in check_ids)
+            ]
+        elif sql.startswith('UPDATE scan_matrix_nodes SET node_task_id'):
+            store.nodes[params[1]][params[2]]['node_task_id'] = params[0]
+        elif sql.startswith('SELECT node_index, node_name FROM scan_matrix_nodes'):
+            self.rows = sorted(
+                ({'node_index': node['node_index'], 'node_name': name}
+                 for name, node in store.nodes.get(params[1], {}).items()),
+                key=lambda row: row['node_index']
+            )
+        elif sql.startswith('SELECT check_id, fail_bits AS bits') or sql.startswith('SELECT check_id, warn_bits AS bits'):
+            column = 'fail_bits' if 'fail_bits AS bits' in sql else 'warn_bits'
+            self.rows = [
+                {'check_id': check_id, 'bits': row[column]}
+                for (main_task_id, check_id), row in sorted(store.checks.items())
+                if main_task_id == params[1]
+            ]
+        else:
+            raise AssertionError(f'unexpected query: {sql}')
+
+    def executemany(self, query, values):
+        sql = ' '.join(query.split())
+        assert sql.startswith('INSERT INTO scan_finding_matrix')
+        for cluster_id, main_task_id, check_id, fail_bits, warn_bits in values:
+            self.store.checks[(main_task_id, check_id)] = {'fail_bits': fail_bits, 'warn_bits': warn_bits}
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def __init__(self, store):
+        self.store = store
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self.store)
+
+
+def _result_row(node_name, node_task_id, failing, warning=()):
+    results = [{'test_number': check_id, 'status': 'FAIL'} for check_id in failing]
+    results += [{'test_number': check_id, 'status': 'WARN'} for check_id in warning]
+    results.append({'test_number': '9.9.9', 'status': 'PASS'})
+    return {
+        'cluster_id': 'cluster',
+        'main_task_id': 'main',
+        'node_task_id': node_task_id,
+        'node_name': node_name,
+        'inserted_at': None,
+        'scan_result': {'Controls': [{'id': '4', 'tests': [{'section': '4.1', 'results': results}]}]}
+    }
+
+
+def _failing_checks(index):
+    return ['4.1.1'] if index % 2 else ['4.1.1', '4.2.%d' % (index % 3)]
+
+
+def _read_matrix(store, monkeypatch, status='FAIL'):
+    monkeypatch.setattr(finding_matrix, 'get_connection', lambda: FakeConnection(store))
+    return finding_matrix.get_finding_matrix('cluster', 'main', status)
+
+
+def test_set_bit_pads_and_clears():
+    bits = finding_matrix.set_bit(b'', 9, True)
+    assert bits == b'\x00\x02'
+    bits = finding_matrix.set_bit(bits, 0, True)
+    assert finding_matrix._bit_indexes(bits) == [0, 9]
+    assert finding_matrix._bit_indexes(finding_matrix.set_bit(bits, 9, False)) == [0]
+    assert finding_matrix.set_bit(b'\x01', 20, False) == b'\x01'
+
+
+def test_incremental_scan_ingests_nodes_one_at_a_time():
+    store = FakeMatrixStore()
+    cursor = FakeCursor(store)
+    node_names = [f'node-{index:02d}' for index in reversed(range(12))]
+    for index, node_name in enumerate(node_names):
+        finding_matrix.update_finding_matrix(
+            cursor, [_result_row(node_name, f'task-{index}', _failing_checks(index))]
+        )
+
+    indexes = sorted(node['node_index'] for node in store.nodes['main'].values())
+    assert indexes == list(range(12))
+    assert len(store.checks[('main', '4.1.1')]['fail_bits']) == 2
+
+
+def test_incremental_and_fast_scan_matrix_covers_every_node(monkeypatch):
+    store = FakeMatrixStore()
+    cursor = FakeCursor(store)
+    node_names = [f'node-{index:02d}' for index in range(20)]
+
+    # 快速扫描先逐个入库部分节点，之后创建的节点任务（排队扫描、沿用结果）成批入库
+    for index in range(3):
+        finding_matrix.update_finding_matrix(
+            cursor, [_result_row(node_names[index], f'task-{index}', _failing_checks(index))]
+        )
+    finding_matrix.update_finding_matrix(cursor, [
+        _result_row(node_names[index], f'task-{index}', _failing_checks(index))
+        for index in range(3, 20)
+    ])
+
+    matrix = _read_matrix(store, monkeypatch)
+    assert matrix['nodeCount'] == 20
+    checks_by_node = {node['nodeName']: node['checks'] for node in matrix['nodes']}
+    for index, node_name in enumerate(node_names):
+        assert checks_by_node[node_name] == sorted(_failing_checks(index))
+
+    check_4_1_1 = next(check for check in matrix['checks'] if check['checkId'] == '4.1.1')
+    assert check_4_1_1['nodeCount'] == 20
+    assert sum(profile['nodeCount'] for profile in matrix['profiles']) == 20
+    assert sorted(profile['nodeCount'] for profile in matrix['profiles']) == [3, 3, 4, 10]
+
+
+def test_replaced_result_clears_previous_bits(monkeypatch):
+    store = FakeMatrixStore()
+    cursor = FakeCursor(store)
+    for index in range(10):
+        finding_matrix.update_finding_matrix(
+            cursor, [_result_row(f'node-{index}', f'task-{index}', ['4.1.1', '4.1.2'], warning=['4.1.3'])]
+        )
+    finding_matrix.update_finding_matrix(cursor, [_result_row('node-9', 'task-retry', ['4.1.2'])])
+
+    matrix = _read_matrix(store, monkeypatch)
+    checks_by_node = {node['nodeName']: node['checks'] for node in matrix['nodes']}
+    assert checks_by_node['node-9'] == ['4.1.2']
+    assert checks_by_node['node-8'] == ['4.1.1', '4.1.2']
+
+    warnings = _read_matrix(store, monkeypatch, 'WARN')
+    check_4_1_3 = next(check for check in warnings['checks'] if check['checkId'] == '4.1.3')
+    assert 'node-9' not in check_4_1_3['nodes']
+    assert check_4_1_3['nodeCount'] == 9
@@ -0,0 +1,81 @@
+from app.utils.kubelet_checks import evaluate_kubelet_config
+
+
+def _base_result(version, results):
+    return {
+        'Controls': [{
+            'id': '4',
+            'version': version,
+            'text': 'Worker Node Security Configuration',
+            'node_type': 'node',
+            'tests': [{'section': '4.2', 'desc': 'Kubelet', 'type': '', 'results': results}]
+        }]
+    }
+
+
+def _result(test_number, test_desc, scored=True, check_type=''):
+    return {
+        'test_number': test_number,
+        'test_desc': test_desc,
+        'type': check_type,
+        'scored': scored,
+        'status': 'WARN'
+    }
+
+
+def _statuses(partial_result):
+    return {
+        result['test_number']: result['status']
+        for control in partial_result['Controls']
+        for test in control['tests']
+        for result in test['results']
+    }
+
+
+def test_rules_follow_benchmark_numbering():
+    config = {'protectKernelDefaults': False, 'makeIPTablesUtilChains': True}
+    cis16 = _base_result('cis-1.6', [
+        _result('4.2.6', 'Ensure that the --protect-kernel-defaults argument is set to true'),
+        _result('4.2.7', 'Ensure that the --make-iptables-util-chains argument is set to true'),
+    ])
+    cis17 = _base_result('cis-1.7', [
+        _result('4.2.6', 'Ensure that the --make-iptables-util-chains argument is set to true'),
+    ])
+
+    partial, evaluated = evaluate_kubelet_config(config, cis16)
+    assert evaluated == ['4.2.6', '4.2.7']
+    assert _statuses(partial) == {'4.2.6': 'FAIL', '4.2.7': 'PASS'}
+
+    partial, evaluated = evaluate_kubelet_config(config, cis17)
+    assert _statuses(partial) == {'4.2.6': 'PASS'}
+
+
+def test_rule_skipped_when_description_does_not_match():
+    # 编号相同但描述不是该参数时不评估，也不按子串匹配相近的参数名
+    base = _base_result('cis-1.7', [
+        _result('4.2.1', 'Ensure that the --anonymous-auth-extra argument is set to false'),
+        _result('4.2.2', 'Ensure that the --read-only-port argument is set to 0'),
+    ])
+    partial, evaluated = evaluate_kubelet_config({}, base)
+    assert evaluated == []
+    assert partial == {'Controls': []}
+
+
+def test_unknown_benchmark_is_not_evaluated():
+    base = _base_result('eks-1.2.0', [
+        _result('4.2.1', 'Ensure that the --anonymous-auth argument is set to false'),
+    ])
+    assert evaluate_kubelet_config({}, base)[1] == []
+
+
+def test_manual_and_unscored_status_preserved():
+    config = {'readOnlyPort': 10255, 'rotateCertificates': True}
+    base = _base_result('cis-1.7', [
+        _result('4.2.4', 'Verify that the --read-only-port argument is set to 0', check_type='manual'),
+        _result('4.2.5', 'Ensure that the --streaming-connection-idle-timeout argument is not set to 0',
+                scored=False),
+        _result('4.2.10', 'Ensure that the --rotate-certificates argument is not set to false',
+                check_type='manual'),
+    ])
+    partial, _ = evaluate_kubelet_config(dict(config, streamingConnectionIdleTimeout='0s'), base)
+    assert _statuses(partial) == {'4.2.4': 'WARN', '4.2.5': 'WARN', '4.2.10': 'WARN'}
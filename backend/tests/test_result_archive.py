@@ -0,0 +1,123 @@
+import json
+import os
+from datetime import datetime
+
+from app.services import result_archive as result_archive_module
+from app.services.result_archive import ResultArchive
+
+
+class FakeArchiveStore:
+    """只实现归档写入和删除用到的语句的内存数据库"""
+
+    def __init__(self, rows):
+        self.results = {row['node_task_id']: row for row in rows}
+        self.index = {}
+
+
+class FakeCursor:
+    def __init__(self, store):
+        self.store = store
+        self.rows = []
+
+    def execute(self, query, params=()):
+        sql = ' '.join(query.split())
+        params = list(params)
+        store = self.store
+        if sql.startswith('SELECT node_task_id, main_task_id, cluster_id, cluster_name'):
+            self.rows = [dict(store.results[node_task_id]) for node_task_id in params if node_task_id in store.results]
+        elif sql.startswith('DELETE FROM cluster_scan_results'):
+            for node_task_id in params:
+                store.results.pop(node_task_id, None)
+        elif sql.startswith('SELECT DISTINCT archive_file FROM scan_result_archive_index'):
+            self.rows = [
+                {'archive_file': archive_file}
+                for archive_file in sorted({
+                    row[7] for row in store.index.values() if row[1] == params[0] and row[2] == params[1]
+                })
+            ]
+        elif sql.startswith('SELECT node_task_id, archive_file, byte_offset, byte_length'):
+            self.rows = [
+                {'node_task_id': row[0], 'archive_file': row[7], 'byte_offset': row[8], 'byte_length': row[9]}
+                for node_task_id, row in store.index.items() if node_task_id in params
+            ]
+        elif sql.startswith('SELECT 1 FROM scan_result_archive_index WHERE archive_file'):
+            self.rows = [{'1': 1}] if any(row[7] == params[0] for row in store.index.values()) else []
+        else:
+            raise AssertionError(f"unexpected query: {sql}")
+
+    def executemany(self, query, values):
+        assert ' '.join(query.split()).startswith('INSERT INTO scan_result_archive_index')
+        for row in values:
+            self.store.index[row[0]] = row
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+
+class FakeConnection:
+    def __init__(self, store):
+        self.store = store
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self.store)
+
+    def commit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+def _result(node_task_id, main_task_id):
+    return {
+        'node_task_id': node_task_id, 'main_task_id': main_task_id, 'cluster_id': 'cluster-1',
+        'cluster_name': 'prod', 'node_name': f'node-{node_task_id}', 'node_ip': '10.0.0.1',
+        'scan_result': json.dumps({'Controls': []}), 'inserted_at': datetime(2026, 1, 1)
+    }
+
+
+def test_deleting_scan_task_removes_its_archive_files(tmp_path, monkeypatch):
+    store = FakeArchiveStore([_result('a1', 'main-a'), _result('a2', 'main-a'), _result('b1', 'main-b')])
+    monkeypatch.setattr(result_archive_module, 'get_connection', lambda: FakeConnection(store))
+    monkeypatch.setattr(result_archive_module, 'rehydrate_scan_results', lambda scan_results, cursor=None: scan_results)
+    monkeypatch.setattr(result_archive_module.Config, 'RESULT_ARCHIVE_DIR', str(tmp_path))
+    archive = ResultArchive()
+
+    archive._archive_batch('cluster-1', ['a1', 'a2', 'b1'])
+    files_a = archive.get_scan_task_archive_files('cluster-1', 'main-a')
+    files_b = archive.get_scan_task_archive_files('cluster-1', 'main-b')
+    assert len(files_a) == 1 and len(files_b) == 1 and files_a != files_b
+    assert archive.load_archived_result('b1')['node_name'] == 'node-b1'
+
+    # 删除任务先删除索引记录，再删除归档文件
+    for node_task_id in ('a1', 'a2'):
+        store.index.pop(node_task_id)
+    archive.delete_scan_task_archives('cluster-1', 'main-a', files_a)
+
+    assert not os.path.exists(tmp_path / files_a[0])
+    assert not os.path.exists(tmp_path / 'cluster-1' / 'main-a')
+    assert os.path.exists(tmp_path / files_b[0])
+
+
+def test_shared_legacy_file_kept_until_unreferenced(tmp_path, monkeypatch):
+    store = FakeArchiveStore([])
+    legacy_file = os.path.join('cluster-1', 'legacy.jsonl.gz')
+    (tmp_path / 'cluster-1').mkdir()
+    (tmp_path / legacy_file).write_bytes(b'')
+    store.index['b1'] = ('b1', 'cluster-1', 'main-b', '', '', '', None, legacy_file, 0, 0)
+    monkeypatch.setattr(result_archive_module, 'get_connection', lambda: FakeConnection(store))
+    monkeypatch.setattr(result_archive_module.Config, 'RESULT_ARCHIVE_DIR', str(tmp_path))
+    archive = ResultArchive()
+
+    archive.delete_scan_task_archives('cluster-1', 'main-a', [legacy_file])
+    assert os.path.exists(tmp_path / legacy_file)
+
+    store.index.clear()
+    archive.delete_scan_task_archives('cluster-1', 'main-b', [legacy_file])
+    assert not os.path.exists(tmp_path / legacy_file)
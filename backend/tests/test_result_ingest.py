@@ -0,0 +1,17 @@
+import importlib
+
+from app.services import result_ingest
+
+
+def test_hooks_run_in_declared_order_regardless_of_import_order():
+    for module in ['compliance_trend', 'drift_detection', 'finding_matrix', 'fleet_rollup', 'check_search']:
+        importlib.import_module(f'app.services.{module}')
+
+    hooks = [hook.__module__ for _, hook in result_ingest.RESULT_INGEST_HOOKS]
+    assert hooks == [
+        'app.services.check_search',
+        'app.services.fleet_rollup',
+        'app.services.finding_matrix',
+        'app.services.drift_detection',
+        'app.services.compliance_trend',
+    ]
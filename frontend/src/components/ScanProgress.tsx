@@ -91,7 +91,7 @@ const ScanProgress = ({ taskGroups, clusterId, onDelete }: ScanProgressProps) =>
     );
     const mainTaskId = taskGroup?.mainTaskId || '';
 
-    if (nodeTask.status === 'running' || nodeTask.status === 'pending') {
+    if (nodeTask.status === 'running' || nodeTask.status === 'pending' || nodeTask.status === 'queued') {
       setResultDialog({
         open: true,
         nodeName: nodeTask.nodeName,
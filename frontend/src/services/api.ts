@@ -43,7 +43,7 @@ export const clusterApi = {
   },
 
   deleteCluster: async (clusterId: string) => {
-    const response = await api.post<ApiResponse<void>>('/clusterdelete', {
+    const response = await api.post<ApiResponse<{ deletion_id: string }>>('/clusterdelete', {
       cluster_id: clusterId
     });
     return response.data;
@@ -101,20 +101,28 @@ export const scanApi = {
     return response.data.data;
   },
 
-  getNodeScanResult: async (clusterId: string, nodeName: string) => {
+  getNodeScanResult: async (clusterId: string, nodeName: string, filters?: {
+    status?: string[];
+    control_id?: string[];
+    section?: string[];
+    check_prefix?: string;
+    fields?: string[];
+    exclude_fields?: string[];
+  }) => {
     const response = await api.post<ApiResponse<{
       status: string;
       result?: any;
       scan_time?: string;
     }>>('/nodescanresultsearch', {
       cluster_id: clusterId,
-      node_name: nodeName
+      node_name: nodeName,
+      ...filters
     });
     return response.data.data;
   },
 
   deleteScanTask: async (clusterId: string, mainTaskId: string) => {
-    const response = await api.post<ApiResponse<void>>('/scantaskdelete', {
+    const response = await api.post<ApiResponse<{ deletion_id: string }>>('/scantaskdelete', {
       cluster_id: clusterId,
       main_task_id: mainTaskId
     });
@@ -130,6 +138,8 @@ export const scanApi = {
         nodeName: string;
         status: string;
       }>;
+      etaSeconds: number | null;
+      estimatedCompletionAt: string | null;
     }>>(`/scantaskwatch?cluster_id=${clusterId}&main_task_id=${mainTaskId}`);
     return response.data.data;
   }
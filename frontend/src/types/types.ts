@@ -16,7 +16,7 @@ export interface NodeTask {
   nodeName: string;
   nodeIp: string;
   nodeRole: string;
-  status: 'pending' | 'running' | 'done' | 'failed';
+  status: 'queued' | 'pending' | 'running' | 'done' | 'failed';
   progress: number;
   results: any[];
 }
@@ -45,7 +45,7 @@ export interface NodeScanStatus {
   nodeName: string;
   nodeIp: string;
   nodeRole: string;
-  status: 'pending' | 'running' | 'done' | 'failed';
+  status: 'queued' | 'pending' | 'running' | 'done' | 'failed';
   progress: number;
   results?: any[];
 }
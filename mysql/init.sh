@@ -24,6 +24,10 @@ set -e
   # 执行 mysql 命令，将 init.sql 文件中的 SQL 脚本执行到 MySQL 数据库中
   echo "Executing SQL scripts..."
   mysql -h "localhost" -u "root" -p"${MYSQL_ROOT_PASSWORD}" </docker-entrypoint-initdb.d/init.sql
+
+  # 为已存在的表补充新增的列和索引（可重复执行）
+  echo "Executing schema migrations..."
+  mysql -h "localhost" -u "root" -p"${MYSQL_ROOT_PASSWORD}" </docker-entrypoint-initdb.d/migrate.sql
 ) &
 
 exec docker-entrypoint.sh mysqld
\ No newline at end of file
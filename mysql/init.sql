@@ -12,11 +12,261 @@ CREATE TABLE IF NOT EXISTS cluster_info (
     business_name VARCHAR(255) NOT NULL COMMENT '集群业务名称',
     access_token TEXT NOT NULL COMMENT '访问令牌',
     node_count INT NOT NULL COMMENT '集群节点数量',
+    max_concurrent_jobs INT DEFAULT NULL COMMENT '同时运行的扫描 Job 上限，为空使用全局默认值',
+    max_concurrent_jobs_per_pool INT DEFAULT NULL COMMENT '每个节点池同时运行的扫描 Job 上限，为空使用全局默认值',
+    retention_keep_scans INT DEFAULT NULL COMMENT '数据库中保留的最近扫描次数，为空使用全局默认值',
+    retention_days INT DEFAULT NULL COMMENT '数据库中保留扫描结果的天数，为空使用全局默认值',
     notes TEXT COMMENT '备注',
+    inventory_synced_at DATETIME DEFAULT NULL COMMENT '节点清单最近同步时间',
+    api_status ENUM('healthy', 'unreachable') NOT NULL DEFAULT 'healthy' COMMENT 'API Server 连通状态',
+    api_status_changed_at DATETIME DEFAULT NULL COMMENT 'API Server 连通状态变化时间',
     created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='存储集群信息';
 
+-- 集群节点清单表（后台同步）
+CREATE TABLE IF NOT EXISTS cluster_node_inventory (
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID，UUID，关联到集群信息表',
+    node_name VARCHAR(255) NOT NULL COMMENT '集群节点名称',
+    node_ip VARCHAR(45) NOT NULL COMMENT '集群节点IP地址',
+    node_role VARCHAR(255) NOT NULL COMMENT '集群节点角色',
+    kubelet_version VARCHAR(64) NOT NULL DEFAULT '' COMMENT 'kubelet 版本',
+    os_image VARCHAR(255) NOT NULL DEFAULT '' COMMENT '操作系统镜像',
+    kernel_version VARCHAR(255) NOT NULL DEFAULT '' COMMENT '内核版本',
+    container_runtime_version VARCHAR(255) NOT NULL DEFAULT '' COMMENT '容器运行时版本',
+    labels JSON COMMENT '参与指纹计算的节点标签',
+    annotations JSON COMMENT '参与指纹计算的节点注解',
+    node_fingerprint CHAR(64) NOT NULL COMMENT '节点扫描相关状态指纹',
+    node_pool CHAR(16) NOT NULL COMMENT '节点池标识',
+    synced_at DATETIME NOT NULL COMMENT '最近同步时间',
+    PRIMARY KEY (cluster_id, node_name),
+    FOREIGN KEY (cluster_id) REFERENCES cluster_info(cluster_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='集群节点清单';
+
+-- 定时扫描计划表
+CREATE TABLE IF NOT EXISTS scan_schedules (
+    schedule_id CHAR(36) NOT NULL PRIMARY KEY COMMENT '扫描计划ID，UUID',
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID，UUID，关联到集群信息表',
+    cron_expr VARCHAR(64) NOT NULL COMMENT 'cron 表达式',
+    jitter_seconds INT NOT NULL DEFAULT 0 COMMENT '开始时间随机抖动窗口（秒）',
+    scan_mode VARCHAR(16) NOT NULL DEFAULT 'full' COMMENT '扫描模式：full、incremental、sample 或 fast',
+    enabled TINYINT(1) NOT NULL DEFAULT 1 COMMENT '是否启用',
+    next_run_at DATETIME NOT NULL COMMENT '下一次执行时间（已包含抖动）',
+    last_run_at DATETIME DEFAULT NULL COMMENT '最近一次执行时间',
+    last_main_task_id CHAR(36) DEFAULT NULL COMMENT '最近一次创建的扫描主任务ID',
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    INDEX idx_enabled_next_run (enabled, next_run_at),
+    INDEX idx_cluster (cluster_id),
+    FOREIGN KEY (cluster_id) REFERENCES cluster_info(cluster_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='定时扫描计划';
+
+-- 批量扫描表
+CREATE TABLE IF NOT EXISTS fleet_scans (
+    fleet_scan_id CHAR(36) NOT NULL PRIMARY KEY COMMENT '批量扫描ID，UUID',
+    filters JSON NOT NULL COMMENT '集群筛选条件',
+    scan_options JSON NOT NULL COMMENT '扫描参数',
+    cluster_count INT NOT NULL COMMENT '包含的集群数量',
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='批量扫描';
+
+-- 批量扫描包含的集群及其扫描主任务
+CREATE TABLE IF NOT EXISTS fleet_scan_clusters (
+    fleet_scan_id CHAR(36) NOT NULL COMMENT '批量扫描ID',
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID，UUID，关联到集群信息表',
+    main_task_id CHAR(36) NOT NULL COMMENT '该集群的扫描主任务ID',
+    status ENUM('pending', 'running', 'done', 'failed') NOT NULL DEFAULT 'pending' COMMENT '子任务状态：等待放行、扫描中、已完成、创建失败',
+    error TEXT DEFAULT NULL COMMENT '创建失败原因',
+    admitted_at DATETIME DEFAULT NULL COMMENT '放行（创建扫描任务）时间',
+    finished_at DATETIME DEFAULT NULL COMMENT '所有节点任务到达终态的时间',
+    PRIMARY KEY (fleet_scan_id, cluster_id),
+    INDEX idx_main_task (main_task_id),
+    INDEX idx_status (status),
+    FOREIGN KEY (fleet_scan_id) REFERENCES fleet_scans(fleet_scan_id) ON DELETE CASCADE,
+    FOREIGN KEY (cluster_id) REFERENCES cluster_info(cluster_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='批量扫描的集群子任务';
+
+-- 检查项目录表：按基线版本、检查项编号和文本内容去重保存检查项的描述、审计命令和修复建议
+CREATE TABLE IF NOT EXISTS check_catalog (
+    catalog_key CHAR(40) NOT NULL PRIMARY KEY COMMENT '条目标识（基线版本、检查项编号和文本内容的 SHA1）',
+    benchmark_version VARCHAR(32) NOT NULL COMMENT '基线版本',
+    check_id VARCHAR(32) NOT NULL COMMENT '检查项编号',
+    content JSON NOT NULL COMMENT '检查项文本字段',
+    search_text TEXT COMMENT '参与全文检索的文本（描述和修复建议）',
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    INDEX idx_version_check (benchmark_version, check_id),
+    FULLTEXT INDEX ft_search_text (search_text) WITH PARSER ngram
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='检查项目录';
+
+-- 检查项结果表（入库时由节点结果展开，用于全文检索和统计）
+CREATE TABLE IF NOT EXISTS scan_check_results (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY COMMENT '自增ID',
+    node_task_id CHAR(36) NOT NULL COMMENT '集群节点任务ID',
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID',
+    main_task_id CHAR(36) NOT NULL COMMENT '扫描主任务ID',
+    node_name VARCHAR(255) NOT NULL COMMENT '集群节点名称',
+    control_id VARCHAR(16) NOT NULL COMMENT '检查项分类编号',
+    section VARCHAR(32) NOT NULL COMMENT '测试组编号',
+    check_id VARCHAR(32) NOT NULL COMMENT '检查项编号',
+    status VARCHAR(8) NOT NULL COMMENT '检查结果：PASS、FAIL、WARN 或 INFO',
+    catalog_key CHAR(40) DEFAULT NULL COMMENT '检查项目录条目（描述和修复建议）',
+    test_info TEXT COMMENT '测试信息',
+    inserted_at DATETIME NOT NULL COMMENT '结果入库时间',
+    INDEX idx_node_task (node_task_id),
+    INDEX idx_cluster_check (cluster_id, check_id, status),
+    INDEX idx_main_task_status (main_task_id, status),
+    INDEX idx_cluster_node_time (cluster_id, node_name, inserted_at),
+    INDEX idx_catalog_key (catalog_key),
+    FULLTEXT INDEX ft_test_info (test_info) WITH PARSER ngram
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='检查项结果（全文检索）';
+
+-- 节点最新结果汇总表（入库时增量维护）
+CREATE TABLE IF NOT EXISTS node_latest_result (
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID',
+    node_name VARCHAR(255) NOT NULL COMMENT '集群节点名称',
+    node_task_id CHAR(36) NOT NULL COMMENT '最新结果的节点任务ID',
+    main_task_id CHAR(36) NOT NULL COMMENT '最新结果的扫描主任务ID',
+    inserted_at DATETIME NOT NULL COMMENT '最新结果入库时间',
+    pass_count INT NOT NULL DEFAULT 0 COMMENT 'PASS 检查项数量',
+    fail_count INT NOT NULL DEFAULT 0 COMMENT 'FAIL 检查项数量',
+    warn_count INT NOT NULL DEFAULT 0 COMMENT 'WARN 检查项数量',
+    info_count INT NOT NULL DEFAULT 0 COMMENT 'INFO 检查项数量',
+    PRIMARY KEY (cluster_id, node_name),
+    INDEX idx_cluster_main_task (cluster_id, main_task_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='节点最新结果汇总';
+
+-- 检查项汇总表：按集群和检查项统计各状态的节点数量（基于节点最新结果，入库时增量维护）
+CREATE TABLE IF NOT EXISTS check_status_rollup (
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID',
+    check_id VARCHAR(32) NOT NULL COMMENT '检查项编号',
+    pass_nodes INT NOT NULL DEFAULT 0 COMMENT 'PASS 节点数量',
+    fail_nodes INT NOT NULL DEFAULT 0 COMMENT 'FAIL 节点数量',
+    warn_nodes INT NOT NULL DEFAULT 0 COMMENT 'WARN 节点数量',
+    info_nodes INT NOT NULL DEFAULT 0 COMMENT 'INFO 节点数量',
+    PRIMARY KEY (cluster_id, check_id),
+    INDEX idx_check_fail (check_id, fail_nodes)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='检查项汇总';
+
+-- 检查项×节点矩阵表头：每个扫描主任务一行，入库时锁定以串行化节点下标分配和位图更新
+CREATE TABLE IF NOT EXISTS scan_matrix (
+    main_task_id CHAR(36) NOT NULL PRIMARY KEY COMMENT '扫描主任务ID',
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID',
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    INDEX idx_cluster_main_task (cluster_id, main_task_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='检查项×节点矩阵表头';
+
+-- 检查项×节点矩阵的节点下标表（按入库顺序分配）
+CREATE TABLE IF NOT EXISTS scan_matrix_nodes (
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID',
+    main_task_id CHAR(36) NOT NULL COMMENT '扫描主任务ID',
+    node_index INT NOT NULL COMMENT '节点在位图中的下标',
+    node_name VARCHAR(255) NOT NULL COMMENT '集群节点名称',
+    node_task_id CHAR(36) DEFAULT NULL COMMENT '已写入矩阵的节点任务ID',
+    PRIMARY KEY (main_task_id, node_name),
+    UNIQUE KEY uk_main_task_index (main_task_id, node_index),
+    INDEX idx_cluster_main_task (cluster_id, main_task_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='检查项×节点矩阵节点下标';
+
+-- 检查项×节点矩阵表：每个检查项一行，按节点下标保存位图（随节点增加变长）
+CREATE TABLE IF NOT EXISTS scan_finding_matrix (
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID',
+    main_task_id CHAR(36) NOT NULL COMMENT '扫描主任务ID',
+    check_id VARCHAR(32) NOT NULL COMMENT '检查项编号',
+    fail_bits BLOB NOT NULL COMMENT 'FAIL 节点位图',
+    warn_bits BLOB NOT NULL COMMENT 'WARN 节点位图',
+    PRIMARY KEY (main_task_id, check_id),
+    INDEX idx_cluster_main_task (cluster_id, main_task_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='检查项×节点矩阵';
+
+-- 扫描差异表：入库时与节点上一次扫描结果对比得到的检查项变化
+CREATE TABLE IF NOT EXISTS scan_drift (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY COMMENT '自增ID',
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID',
+    main_task_id CHAR(36) NOT NULL COMMENT '扫描主任务ID',
+    node_task_id CHAR(36) NOT NULL COMMENT '集群节点任务ID',
+    node_name VARCHAR(255) NOT NULL COMMENT '集群节点名称',
+    previous_main_task_id CHAR(36) NOT NULL COMMENT '上一次扫描的主任务ID',
+    previous_node_task_id CHAR(36) NOT NULL COMMENT '上一次扫描的节点任务ID',
+    check_id VARCHAR(32) NOT NULL COMMENT '检查项编号',
+    change_type ENUM('new_failure', 'fixed', 'status_changed', 'added', 'removed') NOT NULL COMMENT '变化类型',
+    previous_status VARCHAR(8) DEFAULT NULL COMMENT '上一次的检查结果',
+    current_status VARCHAR(8) DEFAULT NULL COMMENT '本次的检查结果',
+    inserted_at DATETIME NOT NULL COMMENT '本次结果入库时间',
+    INDEX idx_cluster_main_task (cluster_id, main_task_id, change_type),
+    INDEX idx_node_task (node_task_id),
+    INDEX idx_cluster_node_time (cluster_id, node_name, inserted_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='扫描差异';
+
+-- 合规样本表：每个节点结果一条，入库时写入
+CREATE TABLE IF NOT EXISTS compliance_samples (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY COMMENT '自增ID',
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID',
+    node_name VARCHAR(255) NOT NULL COMMENT '集群节点名称',
+    main_task_id CHAR(36) NOT NULL COMMENT '扫描主任务ID',
+    node_task_id CHAR(36) NOT NULL COMMENT '集群节点任务ID',
+    sampled_at DATETIME NOT NULL COMMENT '结果入库时间',
+    pass_count INT NOT NULL DEFAULT 0 COMMENT 'PASS 检查项数量',
+    fail_count INT NOT NULL DEFAULT 0 COMMENT 'FAIL 检查项数量',
+    warn_count INT NOT NULL DEFAULT 0 COMMENT 'WARN 检查项数量',
+    info_count INT NOT NULL DEFAULT 0 COMMENT 'INFO 检查项数量',
+    score DECIMAL(5,2) DEFAULT NULL COMMENT '合规率（PASS 占 PASS/FAIL/WARN 的百分比）',
+    UNIQUE KEY uk_node_task (node_task_id),
+    INDEX idx_cluster_main_task (cluster_id, main_task_id),
+    INDEX idx_cluster_node_time (cluster_id, node_name, sampled_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='合规样本';
+
+-- 合规趋势汇总表：按小时、天、周下采样，node_name 为空字符串表示集群级别
+CREATE TABLE IF NOT EXISTS compliance_rollups (
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID',
+    node_name VARCHAR(255) NOT NULL DEFAULT '' COMMENT '集群节点名称，空字符串表示集群级别',
+    granularity ENUM('hour', 'day', 'week') NOT NULL COMMENT '下采样粒度',
+    bucket_start DATETIME NOT NULL COMMENT '时间桶起始时间',
+    sample_count INT NOT NULL DEFAULT 0 COMMENT '样本数量',
+    pass_sum BIGINT NOT NULL DEFAULT 0 COMMENT 'PASS 数量合计',
+    fail_sum BIGINT NOT NULL DEFAULT 0 COMMENT 'FAIL 数量合计',
+    warn_sum BIGINT NOT NULL DEFAULT 0 COMMENT 'WARN 数量合计',
+    info_sum BIGINT NOT NULL DEFAULT 0 COMMENT 'INFO 数量合计',
+    scored_count INT NOT NULL DEFAULT 0 COMMENT '有合规率的样本数量',
+    score_sum DECIMAL(14,2) NOT NULL DEFAULT 0 COMMENT '合规率合计',
+    PRIMARY KEY (cluster_id, node_name, granularity, bucket_start)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='合规趋势汇总';
+
+-- 已归档扫描结果索引表
+CREATE TABLE IF NOT EXISTS scan_result_archive_index (
+    node_task_id CHAR(36) NOT NULL PRIMARY KEY COMMENT '集群节点任务ID',
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID',
+    main_task_id CHAR(36) NOT NULL COMMENT '扫描主任务ID',
+    cluster_name VARCHAR(255) NOT NULL COMMENT '集群名称',
+    node_name VARCHAR(255) NOT NULL COMMENT '集群节点名称',
+    node_ip VARCHAR(45) NOT NULL COMMENT '集群节点IP地址',
+    inserted_at DATETIME NOT NULL COMMENT '结果原入库时间',
+    archive_file VARCHAR(512) NOT NULL COMMENT '归档文件路径（相对归档目录）',
+    byte_offset BIGINT NOT NULL COMMENT '结果在归档文件中的起始偏移',
+    byte_length INT NOT NULL COMMENT '结果压缩后的长度',
+    archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '归档时间',
+    INDEX idx_cluster_node (cluster_id, node_name, inserted_at),
+    INDEX idx_cluster_main_task (cluster_id, main_task_id),
+    INDEX idx_archive_file (archive_file)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='已归档扫描结果索引';
+
+-- 后台删除任务表（不关联集群外键，集群记录由删除任务最后删除）
+CREATE TABLE IF NOT EXISTS deletion_jobs (
+    deletion_id CHAR(36) NOT NULL PRIMARY KEY COMMENT '删除任务ID，UUID',
+    target_type ENUM('scan_task', 'cluster') NOT NULL COMMENT '删除对象类型',
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID',
+    main_task_id CHAR(36) DEFAULT NULL COMMENT '扫描主任务ID（删除扫描任务时）',
+    status ENUM('pending', 'running', 'done', 'failed') NOT NULL DEFAULT 'pending' COMMENT '删除状态',
+    jobs_total INT NOT NULL DEFAULT 0 COMMENT '需要删除的 kube-bench Job 数量',
+    jobs_deleted INT NOT NULL DEFAULT 0 COMMENT '已删除的 kube-bench Job 数量',
+    rows_deleted BIGINT NOT NULL DEFAULT 0 COMMENT '已删除的数据库记录数量',
+    error TEXT DEFAULT NULL COMMENT '失败原因',
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '最近进展时间',
+    finished_at DATETIME DEFAULT NULL COMMENT '结束时间',
+    INDEX idx_status (status, created_at),
+    INDEX idx_cluster (cluster_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='后台删除任务';
+
 -- 集群节点扫描任务管理表
 CREATE TABLE IF NOT EXISTS cluster_node_tasks (
     cluster_id CHAR(36) NOT NULL COMMENT '集群ID，UUID，关联到集群信息表',
@@ -25,14 +275,47 @@ CREATE TABLE IF NOT EXISTS cluster_node_tasks (
     node_role VARCHAR(255) NOT NULL COMMENT '集群节点角色',
     node_ip VARCHAR(45) NOT NULL COMMENT '集群节点IP地址',
     scanner VARCHAR(255) NOT NULL COMMENT 'kube-bench Pod名称',   
-    kube_bench_job VARCHAR(255) NOT NULL COMMENT 'kube-bench job名称',
-    scan_status ENUM('pending', 'running', 'done', 'failed') NOT NULL COMMENT '集群节点扫描状态',
+    kube_bench_job VARCHAR(255) NOT NULL COMMENT 'kube-bench job名称（DaemonSet 模式下为 DaemonSet 名称）',
+    scan_status ENUM('queued', 'pending', 'running', 'done', 'failed') NOT NULL COMMENT '集群节点扫描状态',
     main_task_id CHAR(36) NOT NULL COMMENT '扫描主任务ID',
     node_task_id CHAR(36) NOT NULL PRIMARY KEY COMMENT '集群节点任务ID',
     task_created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '任务创建时间',
+    admitted_at DATETIME DEFAULT NULL COMMENT '任务放行（创建 Job）时间',
+    pod_scheduled_at DATETIME DEFAULT NULL COMMENT 'kube-bench Pod 调度到节点的时间',
+    running_at DATETIME DEFAULT NULL COMMENT 'kube-bench 开始运行的时间',
+    finished_at DATETIME DEFAULT NULL COMMENT '扫描结束（完成或失败）的时间',
+    result_stored_at DATETIME DEFAULT NULL COMMENT '扫描结果入库时间',
+    node_fingerprint CHAR(64) DEFAULT NULL COMMENT '节点扫描相关状态指纹',
+    node_pool CHAR(16) DEFAULT NULL COMMENT '节点池标识',
+    scan_executor VARCHAR(16) NOT NULL DEFAULT 'job' COMMENT '扫描执行方式：job、daemonset 或 configz（快速扫描）',
+    image_ready TINYINT(1) NOT NULL DEFAULT 1 COMMENT 'kube-bench 镜像是否已在节点就绪（镜像预热）',
+    scan_targets VARCHAR(255) DEFAULT NULL COMMENT '部分扫描的 kube-bench targets，为空表示完整扫描',
+    scan_checks TEXT DEFAULT NULL COMMENT '部分扫描的检查项ID列表（逗号分隔）',
+    job_reaped TINYINT(1) NOT NULL DEFAULT 0 COMMENT 'kube-bench Job 是否已回收',
+    scan_source VARCHAR(32) NOT NULL DEFAULT 'scanned' COMMENT '结果来源：scanned 实际扫描，carried 沿用上次结果，sampled 沿用代表节点结果',
+    source_node_task_id CHAR(36) DEFAULT NULL COMMENT '结果来源的节点任务ID',
+    INDEX idx_cluster_main_task (cluster_id, main_task_id),
+    INDEX idx_cluster_node (cluster_id, node_name, task_created_at),
+    INDEX idx_source_node_task (source_node_task_id),
+    INDEX idx_cluster_status (cluster_id, scan_status),
+    INDEX idx_job_reaped (job_reaped, scan_status),
     FOREIGN KEY (cluster_id) REFERENCES cluster_info(cluster_id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='管理集群节点的扫描任务';
 
+-- 扫描耗时统计表（按集群和节点角色滚动统计）
+CREATE TABLE IF NOT EXISTS scan_duration_stats (
+    cluster_id CHAR(36) NOT NULL COMMENT '集群ID，UUID，关联到集群信息表',
+    node_role VARCHAR(255) NOT NULL COMMENT '集群节点角色',
+    sample_count INT NOT NULL DEFAULT 0 COMMENT '样本数量',
+    avg_pending_seconds DOUBLE DEFAULT NULL COMMENT '放行到开始运行的平均耗时（秒）',
+    avg_run_seconds DOUBLE DEFAULT NULL COMMENT 'kube-bench 运行的平均耗时（秒）',
+    avg_total_seconds DOUBLE NOT NULL COMMENT '放行到扫描结束的平均耗时（秒）',
+    var_total_seconds DOUBLE NOT NULL DEFAULT 0 COMMENT '放行到扫描结束耗时的方差',
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    PRIMARY KEY (cluster_id, node_role),
+    FOREIGN KEY (cluster_id) REFERENCES cluster_info(cluster_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='扫描耗时统计';
+
 -- 集群节点扫描结果表
 CREATE TABLE IF NOT EXISTS cluster_scan_results (
     cluster_id CHAR(36) NOT NULL COMMENT '集群ID，UUID，关联到集群信息表',
@@ -44,6 +327,7 @@ CREATE TABLE IF NOT EXISTS cluster_scan_results (
     node_task_id CHAR(36) NOT NULL COMMENT '集群节点任务ID',
     inserted_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '入库时间',
     PRIMARY KEY (node_task_id),
+    INDEX idx_cluster_node (cluster_id, node_name, inserted_at),
     FOREIGN KEY (cluster_id) REFERENCES cluster_info(cluster_id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='存储集群节点的扫描结果';
 
@@ -0,0 +1,222 @@
+-- 已有部署的表结构升级：init.sql 中的 CREATE TABLE IF NOT EXISTS 不会修改已存在的表，
+-- 这里为已存在的表补充后续新增的列和索引。所有步骤先检查 information_schema，可以在每次启动时重复执行
+USE kube_bench;
+
+DELIMITER //
+
+DROP PROCEDURE IF EXISTS add_column_if_missing //
+CREATE PROCEDURE add_column_if_missing(IN p_table VARCHAR(64), IN p_column VARCHAR(64), IN p_definition TEXT)
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND COLUMN_NAME = p_column
+    ) THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' ADD COLUMN ', p_column, ' ', p_definition);
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END //
+
+DROP PROCEDURE IF EXISTS drop_column_if_exists //
+CREATE PROCEDURE drop_column_if_exists(IN p_table VARCHAR(64), IN p_column VARCHAR(64))
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND COLUMN_NAME = p_column
+    ) THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' DROP COLUMN ', p_column);
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END //
+
+-- 列类型与期望不同时才修改，避免每次启动都重建表
+DROP PROCEDURE IF EXISTS modify_column_if_different //
+CREATE PROCEDURE modify_column_if_different(IN p_table VARCHAR(64), IN p_column VARCHAR(64),
+                                            IN p_column_type TEXT, IN p_definition TEXT)
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND COLUMN_NAME = p_column
+          AND COLUMN_TYPE != p_column_type
+    ) THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' MODIFY COLUMN ', p_column, ' ', p_definition);
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END //
+
+-- p_definition 为完整的索引定义，例如 INDEX idx_name (col1, col2)
+DROP PROCEDURE IF EXISTS add_index_if_missing //
+CREATE PROCEDURE add_index_if_missing(IN p_table VARCHAR(64), IN p_index VARCHAR(64), IN p_definition TEXT)
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND INDEX_NAME = p_index
+    ) THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' ADD ', p_definition);
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END //
+
+DROP PROCEDURE IF EXISTS drop_index_if_exists //
+CREATE PROCEDURE drop_index_if_exists(IN p_table VARCHAR(64), IN p_index VARCHAR(64))
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND INDEX_NAME = p_index
+    ) THEN
+        SET @ddl = CONCAT('ALTER TABLE ', p_table, ' DROP INDEX ', p_index);
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END //
+
+-- 批量扫描子任务状态由 created 改为 running/done：先扩展枚举并转换旧值，再收窄为新的枚举
+DROP PROCEDURE IF EXISTS migrate_fleet_scan_status //
+CREATE PROCEDURE migrate_fleet_scan_status()
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'fleet_scan_clusters' AND COLUMN_NAME = 'status'
+          AND COLUMN_TYPE LIKE '%''created''%'
+    ) THEN
+        ALTER TABLE fleet_scan_clusters
+            MODIFY COLUMN status ENUM('pending', 'created', 'running', 'done', 'failed') NOT NULL DEFAULT 'pending';
+        UPDATE fleet_scan_clusters SET status = 'running' WHERE status = 'created';
+        ALTER TABLE fleet_scan_clusters
+            MODIFY COLUMN status ENUM('pending', 'running', 'done', 'failed') NOT NULL DEFAULT 'pending'
+            COMMENT '子任务状态：等待放行、扫描中、已完成、创建失败';
+    END IF;
+END //
+
+-- 检查项结果表改为引用检查项目录：旧记录的描述和修复建议写入目录后删除这两列
+DROP PROCEDURE IF EXISTS migrate_scan_check_results_catalog //
+CREATE PROCEDURE migrate_scan_check_results_catalog()
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'scan_check_results' AND COLUMN_NAME = 'test_desc'
+    ) THEN
+        INSERT IGNORE INTO check_catalog (catalog_key, benchmark_version, check_id, content, search_text)
+        SELECT DISTINCT SHA1(CONCAT_WS(CHAR(31), 'legacy', check_id, IFNULL(test_desc, ''), IFNULL(remediation, ''))),
+               'legacy', check_id,
+               JSON_OBJECT('test_desc', IFNULL(test_desc, ''), 'remediation', IFNULL(remediation, '')),
+               CONCAT(IFNULL(test_desc, ''), '\n', IFNULL(remediation, ''))
+        FROM scan_check_results
+        WHERE catalog_key IS NULL;
+
+        UPDATE scan_check_results
+        SET catalog_key = SHA1(CONCAT_WS(CHAR(31), 'legacy', check_id, IFNULL(test_desc, ''), IFNULL(remediation, '')))
+        WHERE catalog_key IS NULL;
+
+        CALL drop_index_if_exists('scan_check_results', 'ft_check_text');
+        CALL drop_column_if_exists('scan_check_results', 'test_desc');
+        CALL drop_column_if_exists('scan_check_results', 'remediation');
+    END IF;
+END //
+
+DELIMITER ;
+
+-- 集群信息表
+CALL add_column_if_missing('cluster_info', 'max_concurrent_jobs',
+    "INT DEFAULT NULL COMMENT '同时运行的扫描 Job 上限，为空使用全局默认值' AFTER node_count");
+CALL add_column_if_missing('cluster_info', 'max_concurrent_jobs_per_pool',
+    "INT DEFAULT NULL COMMENT '每个节点池同时运行的扫描 Job 上限，为空使用全局默认值' AFTER max_concurrent_jobs");
+CALL add_column_if_missing('cluster_info', 'retention_keep_scans',
+    "INT DEFAULT NULL COMMENT '数据库中保留的最近扫描次数，为空使用全局默认值' AFTER max_concurrent_jobs_per_pool");
+CALL add_column_if_missing('cluster_info', 'retention_days',
+    "INT DEFAULT NULL COMMENT '数据库中保留扫描结果的天数，为空使用全局默认值' AFTER retention_keep_scans");
+CALL add_column_if_missing('cluster_info', 'inventory_synced_at',
+    "DATETIME DEFAULT NULL COMMENT '节点清单最近同步时间' AFTER notes");
+CALL add_column_if_missing('cluster_info', 'api_status',
+    "ENUM('healthy', 'unreachable') NOT NULL DEFAULT 'healthy' COMMENT 'API Server 连通状态' AFTER inventory_synced_at");
+CALL add_column_if_missing('cluster_info', 'api_status_changed_at',
+    "DATETIME DEFAULT NULL COMMENT 'API Server 连通状态变化时间' AFTER api_status");
+
+-- 集群节点扫描任务管理表
+CALL modify_column_if_different('cluster_node_tasks', 'scan_status',
+    "enum('queued','pending','running','done','failed')",
+    "ENUM('queued', 'pending', 'running', 'done', 'failed') NOT NULL COMMENT '集群节点扫描状态'");
+CALL add_column_if_missing('cluster_node_tasks', 'admitted_at',
+    "DATETIME DEFAULT NULL COMMENT '任务放行（创建 Job）时间' AFTER task_created_at");
+CALL add_column_if_missing('cluster_node_tasks', 'pod_scheduled_at',
+    "DATETIME DEFAULT NULL COMMENT 'kube-bench Pod 调度到节点的时间' AFTER admitted_at");
+CALL add_column_if_missing('cluster_node_tasks', 'running_at',
+    "DATETIME DEFAULT NULL COMMENT 'kube-bench 开始运行的时间' AFTER pod_scheduled_at");
+CALL add_column_if_missing('cluster_node_tasks', 'finished_at',
+    "DATETIME DEFAULT NULL COMMENT '扫描结束（完成或失败）的时间' AFTER running_at");
+CALL add_column_if_missing('cluster_node_tasks', 'result_stored_at',
+    "DATETIME DEFAULT NULL COMMENT '扫描结果入库时间' AFTER finished_at");
+CALL add_column_if_missing('cluster_node_tasks', 'node_fingerprint',
+    "CHAR(64) DEFAULT NULL COMMENT '节点扫描相关状态指纹' AFTER result_stored_at");
+CALL add_column_if_missing('cluster_node_tasks', 'node_pool',
+    "CHAR(16) DEFAULT NULL COMMENT '节点池标识' AFTER node_fingerprint");
+CALL add_column_if_missing('cluster_node_tasks', 'scan_executor',
+    "VARCHAR(16) NOT NULL DEFAULT 'job' COMMENT '扫描执行方式：job、daemonset 或 configz（快速扫描）' AFTER node_pool");
+CALL add_column_if_missing('cluster_node_tasks', 'image_ready',
+    "TINYINT(1) NOT NULL DEFAULT 1 COMMENT 'kube-bench 镜像是否已在节点就绪（镜像预热）' AFTER scan_executor");
+CALL add_column_if_missing('cluster_node_tasks', 'scan_targets',
+    "VARCHAR(255) DEFAULT NULL COMMENT '部分扫描的 kube-bench targets，为空表示完整扫描' AFTER image_ready");
+CALL add_column_if_missing('cluster_node_tasks', 'scan_checks',
+    "TEXT DEFAULT NULL COMMENT '部分扫描的检查项ID列表（逗号分隔）' AFTER scan_targets");
+CALL add_column_if_missing('cluster_node_tasks', 'job_reaped',
+    "TINYINT(1) NOT NULL DEFAULT 0 COMMENT 'kube-bench Job 是否已回收' AFTER scan_checks");
+CALL add_column_if_missing('cluster_node_tasks', 'scan_source',
+    "VARCHAR(32) NOT NULL DEFAULT 'scanned' COMMENT '结果来源：scanned 实际扫描，carried 沿用上次结果，sampled 沿用代表节点结果' AFTER job_reaped");
+CALL add_column_if_missing('cluster_node_tasks', 'source_node_task_id',
+    "CHAR(36) DEFAULT NULL COMMENT '结果来源的节点任务ID' AFTER scan_source");
+CALL add_index_if_missing('cluster_node_tasks', 'idx_cluster_main_task',
+    'INDEX idx_cluster_main_task (cluster_id, main_task_id)');
+CALL add_index_if_missing('cluster_node_tasks', 'idx_cluster_node',
+    'INDEX idx_cluster_node (cluster_id, node_name, task_created_at)');
+CALL add_index_if_missing('cluster_node_tasks', 'idx_source_node_task',
+    'INDEX idx_source_node_task (source_node_task_id)');
+CALL add_index_if_missing('cluster_node_tasks', 'idx_cluster_status',
+    'INDEX idx_cluster_status (cluster_id, scan_status)');
+CALL add_index_if_missing('cluster_node_tasks', 'idx_job_reaped',
+    'INDEX idx_job_reaped (job_reaped, scan_status)');
+
+-- 集群节点扫描结果表
+CALL add_index_if_missing('cluster_scan_results', 'idx_cluster_node',
+    'INDEX idx_cluster_node (cluster_id, node_name, inserted_at)');
+
+-- 已归档扫描结果索引
+CALL add_index_if_missing('scan_result_archive_index', 'idx_archive_file',
+    'INDEX idx_archive_file (archive_file)');
+
+-- 批量扫描的集群子任务
+CALL migrate_fleet_scan_status();
+CALL add_column_if_missing('fleet_scan_clusters', 'admitted_at',
+    "DATETIME DEFAULT NULL COMMENT '放行（创建扫描任务）时间' AFTER error");
+CALL add_column_if_missing('fleet_scan_clusters', 'finished_at',
+    "DATETIME DEFAULT NULL COMMENT '所有节点任务到达终态的时间' AFTER admitted_at");
+CALL add_index_if_missing('fleet_scan_clusters', 'idx_status', 'INDEX idx_status (status)');
+
+-- 检查项目录表
+CALL add_column_if_missing('check_catalog', 'search_text',
+    "TEXT COMMENT '参与全文检索的文本（描述和修复建议）' AFTER content");
+UPDATE check_catalog
+SET search_text = CONCAT(
+    IFNULL(JSON_UNQUOTE(JSON_EXTRACT(content, '$.test_desc')), ''), '\n',
+    IFNULL(JSON_UNQUOTE(JSON_EXTRACT(content, '$.remediation')), '')
+)
+WHERE search_text IS NULL;
+CALL add_index_if_missing('check_catalog', 'ft_search_text',
+    'FULLTEXT INDEX ft_search_text (search_text) WITH PARSER ngram');
+
+-- 检查项结果表
+CALL add_column_if_missing('scan_check_results', 'catalog_key',
+    "CHAR(40) DEFAULT NULL COMMENT '检查项目录条目（描述和修复建议）' AFTER status");
+CALL migrate_scan_check_results_catalog();
+CALL add_index_if_missing('scan_check_results', 'idx_cluster_node_time',
+    'INDEX idx_cluster_node_time (cluster_id, node_name, inserted_at)');
+CALL add_index_if_missing('scan_check_results', 'idx_catalog_key', 'INDEX idx_catalog_key (catalog_key)');
+CALL add_index_if_missing('scan_check_results', 'ft_test_info',
+    'FULLTEXT INDEX ft_test_info (test_info) WITH PARSER ngram');